@@ -1,9 +1,9 @@
 from django.contrib import admin
-from app.models import Record, Category
+from app.models import Record, Category, UserBalance, CategoryRollup, RecordChange, RecurringRule, ExchangeRate
 
 # Register your models here.
 class RecordAdmin(admin.ModelAdmin):
-    list_display = ("id", "type", "date", "item", "category", "volume", "cost", "user")
+    list_display = ("id", "type", "date", "item", "category", "volume", "cost", "currency", "user")
     sortable_by = ("id", "date", "category", "user")
     list_filter = ("type", "user", "category")
 
@@ -12,6 +12,32 @@ class CategoryAdmin(admin.ModelAdmin):
     list_filter = ("user",)
     search_fields = ("name", "user__username")
 
+class UserBalanceAdmin(admin.ModelAdmin):
+    list_display = ("user", "currency", "record_count")
+    search_fields = ("user__username",)
+
+class CategoryRollupAdmin(admin.ModelAdmin):
+    list_display = ("user", "category", "currency", "net", "record_count")
+    list_filter = ("user",)
+
+class RecordChangeAdmin(admin.ModelAdmin):
+    list_display = ("id", "operation", "record_id", "user", "created_at")
+    list_filter = ("operation", "user")
+
+class RecurringRuleAdmin(admin.ModelAdmin):
+    list_display = ("item", "cost", "frequency", "interval", "next_date", "end_date", "user")
+    list_filter = ("frequency", "user")
+    search_fields = ("item", "user__username")
+
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ("currency", "rate", "date")
+    search_fields = ("currency",)
+
 # Register the models with their custom admin classes
 admin.site.register(Record, RecordAdmin)
-admin.site.register(Category, CategoryAdmin)
\ No newline at end of file
+admin.site.register(Category, CategoryAdmin)
+admin.site.register(UserBalance, UserBalanceAdmin)
+admin.site.register(CategoryRollup, CategoryRollupAdmin)
+admin.site.register(RecordChange, RecordChangeAdmin)
+admin.site.register(RecurringRule, RecurringRuleAdmin)
+admin.site.register(ExchangeRate, ExchangeRateAdmin)
\ No newline at end of file
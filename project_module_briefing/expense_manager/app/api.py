@@ -0,0 +1,75 @@
+import hashlib
+from decimal import Decimal
+from urllib.parse import urlencode
+from app.summary import CENTS
+from app.versions import RECORDS, aget_version
+
+API_FIELDS = ("id", "type", "date", "item", "category", "volume", "cost", "currency")
+# Model fields that have to be loaded to output each API field.
+FIELD_COLUMNS = {"category": "category__name"}
+
+
+def parse_fields(fields_param):
+    """Return the API fields requested by a ``fields`` parameter, all of them when it is empty.
+
+    Raises ``ValueError`` naming any unknown field.
+    """
+    if not fields_param:
+        return API_FIELDS
+    fields = tuple(dict.fromkeys(name.strip() for name in fields_param.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown) or fields_param}")
+    return fields
+
+
+def sparse_queryset(queryset, fields, sort_field):
+    """Load only the columns needed for ``fields`` and for the keyset cursor of ``sort_field``."""
+    columns = {"id", sort_field} | {FIELD_COLUMNS.get(name, name) for name in fields}
+    if "category__name" in columns:
+        queryset = queryset.select_related("category")
+    return queryset.only(*columns)
+
+
+def serialize_record(record, fields):
+    data = {}
+    for name in fields:
+        if name == "category":
+            data[name] = record.category.name if record.category_id else None
+        elif name == "date":
+            data[name] = record.date.isoformat()
+        elif name == "cost":
+            data[name] = str(record.cost)
+        elif name == "currency":
+            data[name] = record.currency_id
+        else:
+            data[name] = getattr(record, name)
+    return data
+
+
+def page_link(request, cursor_name, cursor):
+    """Absolute URL of the same listing positioned at ``cursor``, or ``None``."""
+    if cursor is None:
+        return None
+    params = {key: value for key, value in request.GET.items() if key not in ("after", "before")}
+    params[cursor_name] = cursor
+    return request.build_absolute_uri(f"{request.path}?{urlencode(params)}")
+
+
+async def records_etag(user, query_string):
+    """Strong ETag of a records listing: the user's records version plus the query string.
+
+    Only the cache is read, so a poll that matches it is answered without
+    touching the records table.
+    """
+    version = await aget_version(RECORDS, user.pk)
+    return hashlib.sha256(f"{user.pk}:{version}:{query_string}".encode()).hexdigest()[:32]
+
+
+def serialize_summary(summary):
+    """Summary as JSON, with amounts as strings in cents so no precision is lost."""
+    return {
+        "total_amount": str(Decimal(summary["total_amount"]).quantize(CENTS)),
+        "category_spending": {name: str(net) for name, net in summary["category_spending"].items()},
+        "currency": summary["currency"],
+    }
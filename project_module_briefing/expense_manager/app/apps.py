@@ -5,3 +5,6 @@ class AppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app"
 
+    def ready(self):
+        # Connect the rollup, version, search index, change journal, exchange rate and query timing signal receivers.
+        from app import changes, currencies, instrumentation, search, summary, versions  # noqa: F401
@@ -0,0 +1,102 @@
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from app.categories import delete_orphan_categories
+from app.changes import log_selected_changes
+from app.models import Record, RecordChange, signed_amount
+from app.summary import apply_deltas, to_cents
+from app.versions import RECORDS, bump_version
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def selected_groups(user_id, ids):
+    """Cost and count of the selected records of the user per ``(category_id, currency_id, type)``."""
+    return list(
+        Record.objects.filter(user_id=user_id, pk__in=ids)
+        .order_by()
+        .values("category_id", "currency_id", "type")
+        .annotate(cost=Sum("cost"), record_count=Count("id"))
+        .values_list("category_id", "currency_id", "type", "cost", "record_count")
+    )
+
+
+def rollup_deltas(user_id, groups, changes=None):
+    """The rollup deltas of removing ``groups`` of records, or of applying ``changes`` to them.
+
+    Deltas are merged per category and currency, so the number of rollup
+    updates depends on how many of them the records span rather than how many
+    records there are.
+    """
+    nets = {}
+    for category_id, currency_id, record_type, cost, record_count in groups:
+        cost = to_cents(cost)
+        net, count = nets.get((category_id, currency_id), (0, 0))
+        nets[category_id, currency_id] = (net - signed_amount(record_type, cost), count - record_count)
+        if changes is not None:
+            new_category_id = changes.get("category_id", category_id)
+            new_type = changes.get("type", record_type)
+            net, count = nets.get((new_category_id, currency_id), (0, 0))
+            nets[new_category_id, currency_id] = (net + signed_amount(new_type, cost), count + record_count)
+    return [
+        (user_id, category_id, currency_id, net, count)
+        for (category_id, currency_id), (net, count) in nets.items()
+        if net or count
+    ]
+
+
+def bulk_delete_records(user, ids):
+    """Delete the records of ``user`` among ``ids`` in one statement, returning how many were deleted.
+
+    Ids of other users' records are ignored. Like the purge, this sends no
+    per-record signals: the deletions are journaled in one statement, the
+    rollups moved by one delta per category, the records version is bumped
+    once and unused categories are cleaned up once.
+    """
+    user_id = getattr(user, "pk", user)
+    ids = list(ids)
+    if not ids:
+        return 0
+    placeholders = ", ".join(["%s"] * len(ids))
+
+    with transaction.atomic():
+        groups = selected_groups(user_id, ids)
+        log_selected_changes(user_id, ids, RecordChange.DELETE)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {_table(Record)} WHERE user_id = %s AND id IN ({placeholders})",
+                [user_id, *ids],
+            )
+            count = cursor.rowcount
+        if count:
+            apply_deltas(rollup_deltas(user_id, groups))
+            bump_version(RECORDS, user_id)
+            delete_orphan_categories(user_id)
+    return count
+
+
+def bulk_update_records(user, ids, **changes):
+    """Set ``changes`` on the records of ``user`` among ``ids`` in one statement, returning how many changed.
+
+    ``changes`` may set the ``type`` and the ``category_id``, which has to be
+    one of the user's categories or ``None``. As with ``bulk_delete_records``
+    the journal, rollups, versions and categories are kept up to date once per
+    call, and ``updated_at`` is set so the cached table rows are rendered again.
+    """
+    user_id = getattr(user, "pk", user)
+    ids = list(ids)
+    if not ids or not changes:
+        return 0
+
+    with transaction.atomic():
+        groups = selected_groups(user_id, ids)
+        count = Record.objects.filter(user_id=user_id, pk__in=ids).update(**changes, updated_at=timezone.now())
+        if count:
+            log_selected_changes(user_id, ids, RecordChange.UPDATE)
+            apply_deltas(rollup_deltas(user_id, groups, changes))
+            bump_version(RECORDS, user_id)
+            if "category_id" in changes:
+                delete_orphan_categories(user_id)
+    return count
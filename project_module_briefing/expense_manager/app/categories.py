@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from app.models import Category, CategoryRollup, Record, RecurringRule
+from app.summary import invalidate_summary
+from app.versions import CATEGORIES, RECORDS, bump_version, get_version
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def category_choices(user):
+    """``(id, name)`` pairs of the user's categories, cached until one of them is created, renamed or deleted."""
+    user_id = getattr(user, "pk", user)
+    key = f"categories:{user_id}:{get_version(CATEGORIES, user_id)}"
+    choices = cache.get(key)
+    if choices is None:
+        choices = list(Category.objects.filter(user_id=user_id).values_list("id", "name"))
+        cache.set(key, choices, settings.CATEGORY_CACHE_TIMEOUT)
+    return choices
+
+
+def delete_orphan_categories(*users):
+    """Delete the categories of ``users`` that no record or recurring rule uses any more, returning how many went.
+
+    This is a set-based anti-join delete, so it costs the same however many
+    records were removed before it and however many categories they left
+    unused. Call it once per request or batch that may have left categories
+    unused, rather than once per deleted record.
+
+    Unused categories have no records to move to the uncategorized rollup, so
+    instead of ``QuerySet.delete()``, which runs the rollup fold for each one,
+    their empty rollups and then the categories go in one statement each. The
+    versions the per-category signals would have bumped are bumped once.
+    """
+    user_ids = {getattr(user, "pk", user) for user in users}
+    if not user_ids:
+        return 0
+    categories, records, rollups = _table(Category), _table(Record), _table(CategoryRollup)
+    rules = _table(RecurringRule)
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    # A rule's category is kept for the records it will create; raw SQL would not null it anyway.
+    orphans = (
+        f"SELECT id FROM {categories} WHERE user_id IN ({placeholders}) "
+        f"AND NOT EXISTS (SELECT 1 FROM {records} WHERE {records}.category_id = {categories}.id) "
+        f"AND NOT EXISTS (SELECT 1 FROM {rules} WHERE {rules}.category_id = {categories}.id)"
+    )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {rollups} WHERE category_id IN ({orphans})", list(user_ids))
+        cursor.execute(f"DELETE FROM {categories} WHERE id IN ({orphans})", list(user_ids))
+        count = cursor.rowcount
+        if count:
+            invalidate_summary(*user_ids)
+            bump_version(RECORDS, *user_ids)
+            bump_version(CATEGORIES, *user_ids)
+    return count
@@ -0,0 +1,166 @@
+from dataclasses import dataclass, field
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, Max, OuterRef
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from app.api import API_FIELDS, serialize_record
+from app.models import Category, Record, RecordChange, deleting_users
+
+# Entries that stand for records which no longer exist.
+TOMBSTONES = (RecordChange.DELETE, RecordChange.PURGE, RecordChange.COMPACTED)
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def log_changes(records, operation):
+    """Journal ``operation`` for each of ``records``, e.g. the saved records of a ``bulk_create``."""
+    RecordChange.objects.bulk_create(
+        RecordChange(user_id=record.user_id, record_id=record.pk, operation=operation) for record in records
+    )
+
+
+def log_matching_changes(operation, condition, params):
+    """Journal ``operation`` for every record matching the SQL ``condition``, in one ``INSERT ... SELECT``.
+
+    The entries are written without loading the records, however many match.
+    """
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {_table(RecordChange)} (user_id, record_id, operation, created_at) "
+            f"SELECT user_id, id, %s, %s FROM {_table(Record)} WHERE {condition}",
+            [operation, now, *params],
+        )
+
+
+def log_selected_changes(user_id, ids, operation):
+    """Journal ``operation`` for the records of ``user_id`` among ``ids``."""
+    placeholders = ", ".join(["%s"] * len(ids))
+    log_matching_changes(operation, f"user_id = %s AND id IN ({placeholders})", [user_id, *ids])
+
+
+def log_purge(user_id):
+    RecordChange.objects.create(user_id=user_id, operation=RecordChange.PURGE)
+
+
+@receiver(post_save, sender=Record)
+def log_record_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        operation = RecordChange.CREATE if created else RecordChange.UPDATE
+        RecordChange.objects.create(user_id=instance.user_id, record_id=instance.pk, operation=operation)
+
+
+@receiver(post_delete, sender=Record)
+def log_record_delete(sender, instance, origin=None, **kwargs):
+    # A deleted user's journal goes with them; an entry would only point at the deleted user.
+    if not deleting_users(origin):
+        RecordChange.objects.create(user_id=instance.user_id, record_id=instance.pk, operation=RecordChange.DELETE)
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def log_category_records(sender, instance, created=False, raw=False, origin=None, **kwargs):
+    """Renaming or deleting a category changes how each of its records is synced."""
+    if not created and not raw and not deleting_users(origin):
+        log_matching_changes(RecordChange.UPDATE, "category_id = %s", [instance.pk])
+
+
+def settled(changes):
+    """Leave out the entries of the last ``CHANGES_SETTLE_SECONDS``, which an uncommitted lower sequence may still precede.
+
+    A client's cursor moves past everything it was sent, so an entry that
+    commits after a higher one was served would never reach it.
+    """
+    if not settings.CHANGES_SETTLE_SECONDS:
+        return changes
+    return changes.filter(created_at__lt=timezone.now() - timedelta(seconds=settings.CHANGES_SETTLE_SECONDS))
+
+
+@dataclass
+class ChangePage:
+    changes: list = field(default_factory=list)
+    sequence: int = 0
+    has_more: bool = False
+
+
+async def achanges_since(user, since, limit=None):
+    """Return the changes of ``user``'s records after sequence ``since``, or ``None`` if they were compacted away.
+
+    Only the last change of each record in the page is returned, and nothing
+    before a purge, so the response grows with how many records changed rather
+    than how often. Created and updated records come with their current
+    fields; a record deleted since it was journaled is returned as deleted.
+    A client that gets ``None`` has to download all of its records again.
+    Entries are only served once they have ``settled``.
+    """
+    limit = limit or settings.CHANGES_PAGE_SIZE
+    changes = RecordChange.objects.filter(user=user, id__gt=since)
+    if await changes.filter(operation=RecordChange.COMPACTED).aexists():
+        return None
+
+    entries = [entry async for entry in settled(changes).order_by("id").values_list("id", "record_id", "operation")[:limit + 1]]
+    page = ChangePage(sequence=since, has_more=len(entries) > limit)
+    entries = entries[:limit]
+    if entries:
+        page.sequence = entries[-1][0]
+
+    purged, latest = None, {}
+    for sequence, record_id, operation in entries:
+        if operation == RecordChange.PURGE:
+            purged, latest = sequence, {}
+        else:
+            latest[record_id] = (sequence, operation)
+
+    upserted = [record_id for record_id, (_, operation) in latest.items() if operation != RecordChange.DELETE]
+    records = {
+        record.pk: record
+        async for record in Record.objects.filter(user=user, pk__in=upserted).select_related("category")
+    }
+    if purged is not None:
+        page.changes.append({"sequence": purged, "operation": RecordChange.PURGE})
+    for record_id, (sequence, operation) in sorted(latest.items(), key=lambda item: item[1][0]):
+        if record_id not in records:
+            operation = RecordChange.DELETE
+        change = {"sequence": sequence, "operation": operation, "id": record_id}
+        if operation != RecordChange.DELETE:
+            change["record"] = serialize_record(records[record_id], API_FIELDS)
+        page.changes.append(change)
+    return page
+
+
+async def alatest_sequence(user):
+    """The sequence of the user's latest settled change, which a client starts syncing from after a full download.
+
+    Changes the download already included may be sent again, which leaves the client in the same state.
+    """
+    return (await settled(RecordChange.objects.filter(user=user)).aaggregate(sequence=Max("id")))["sequence"] or 0
+
+
+def compact_changes(before):
+    """Remove the journal entries no client can need any more, returning how many went.
+
+    Entries superseded by a later change of the same record, and everything
+    before a user's purge, go whatever their age: a client behind them gets
+    the later entry instead. Deletions and purges journaled before ``before``
+    go too, except each user's latest, which stays as a ``compacted`` marker
+    telling clients behind it to download their records again.
+    """
+    later_change = RecordChange.objects.filter(
+        user_id=OuterRef("user_id"), record_id=OuterRef("record_id"), id__gt=OuterRef("id")
+    )
+    later_purge = RecordChange.objects.filter(user_id=OuterRef("user_id"), operation=RecordChange.PURGE, id__gt=OuterRef("id"))
+    old_tombstones = RecordChange.objects.filter(operation__in=TOMBSTONES, created_at__lt=before)
+    markers = old_tombstones.order_by().values("user_id").annotate(last=Max("id")).values_list("last", flat=True)
+
+    with transaction.atomic():
+        removed, _ = RecordChange.objects.filter(Exists(later_change)).delete()
+        removed += RecordChange.objects.filter(Exists(later_purge)).delete()[0]
+        marker_ids = list(markers)
+        RecordChange.objects.filter(id__in=marker_ids).update(operation=RecordChange.COMPACTED, record_id=None)
+        removed += old_tombstones.exclude(id__in=marker_ids).delete()[0]
+    return removed
@@ -0,0 +1,173 @@
+import csv
+from contextvars import ContextVar
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from app.models import ExchangeRate, UserBalance
+from app.versions import ALL_USERS, RATES, bump_version, get_version
+
+# The rates read while handling the current request. A context variable, like
+# the request stats, so the sync_to_async threads of an async view share it.
+request_memo = ContextVar("request_memo", default=None)
+
+
+class ExchangeRateMiddleware:
+    """Give every request its own memo, so however many totals, forms and
+    reports a page converts, the rates and base currencies are read once."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = request_memo.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            request_memo.reset(token)
+
+    async def __acall__(self, request):
+        token = request_memo.set({})
+        try:
+            return await self.get_response(request)
+        finally:
+            request_memo.reset(token)
+
+
+def rates_cache_key(version):
+    return f"exchange-rates:{version}"
+
+
+def exchange_rates():
+    """``{currency: rate}`` of every known currency, memoized per request and cached until rates are loaded."""
+    memo = request_memo.get()
+    if memo is not None and "rates" in memo:
+        return memo["rates"]
+    key = rates_cache_key(get_version(RATES, ALL_USERS))
+    rates = cache.get(key)
+    if rates is None:
+        rates = dict(ExchangeRate.objects.values_list("currency", "rate"))
+        cache.set(key, rates, None)
+    if memo is not None:
+        memo["rates"] = rates
+    return rates
+
+
+def base_currency(user):
+    """The currency the user's totals are shown in, memoized per request."""
+    user_id = getattr(user, "pk", user)
+    memo = request_memo.get()
+    if memo is not None and ("currency", user_id) in memo:
+        return memo["currency", user_id]
+    currency = UserBalance.objects.filter(pk=user_id).values_list("currency_id", flat=True).first()
+    currency = currency or settings.DEFAULT_CURRENCY
+    if memo is not None:
+        memo["currency", user_id] = currency
+    return currency
+
+
+def converted(amount, base_rate):
+    """``amount`` of each row, in its ``currency``, converted to the currency worth ``base_rate`` per euro.
+
+    The row's rate comes from joining the rates table, so a grouped query
+    converts every row as it sums them. Everything is cast to floats, as
+    SQLite keeps whole decimals as integers and would divide them as such.
+    """
+    return Cast(amount, FloatField()) * Value(float(base_rate)) / Cast(F("currency__rate"), FloatField())
+
+
+def parse_date(value):
+    value = value.strip()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, "%d %B %Y").date()
+
+
+def parse_rates(lines):
+    """Read ECB reference rates: a ``Date`` column then one column of euro rates per currency.
+
+    Both the daily ``eurofxref.csv`` and the historical ``eurofxref-hist.csv``
+    work; the historical file lists the latest day first, so each currency
+    keeps its first rate. Returns unsaved ``ExchangeRate`` objects, with the
+    euro itself at 1. Raises ``ValueError`` if the file has no rates.
+    """
+    rows = csv.reader(lines, skipinitialspace=True)
+    header = [name.strip().upper() for name in next(rows, [])]
+    if not header or header[0] != "DATE":
+        raise ValueError("Exchange rates file must start with a Date column")
+
+    rates = {}
+    for row in rows:
+        if not row or not row[0].strip():
+            continue
+        try:
+            day = parse_date(row[0])
+        except ValueError:
+            raise ValueError(f"invalid date '{row[0]}'")
+        for currency, value in zip(header[1:], row[1:]):
+            if not currency or currency in rates:
+                continue
+            try:
+                rate = Decimal(value.strip())
+            except InvalidOperation:
+                # The historical file has N/A for the days a currency was not quoted.
+                continue
+            if rate.is_finite() and rate > 0:
+                rates[currency] = ExchangeRate(currency=currency, rate=rate, date=day)
+    if not rates:
+        raise ValueError("Exchange rates file has no rates")
+    rates.setdefault("EUR", ExchangeRate(currency="EUR", rate=Decimal(1), date=max(rate.date for rate in rates.values())))
+    return list(rates.values())
+
+
+def read_rates_file(path=None):
+    with open(path or settings.EXCHANGE_RATES_FILE, encoding="utf-8-sig", newline="") as lines:
+        return parse_rates(lines)
+
+
+def load_exchange_rates(path=None):
+    """Replace the rates of the currencies in the ECB file at ``path`` (default: ``EXCHANGE_RATES_FILE``).
+
+    Currencies missing from the file keep their last rate, since records may
+    still be in them. Every cached summary is converted again afterwards.
+    Returns how many rates were loaded.
+    """
+    rates = read_rates_file(path)
+    with transaction.atomic():
+        ExchangeRate.objects.bulk_create(
+            rates, update_conflicts=True, unique_fields=["currency"], update_fields=["rate", "date"]
+        )
+        bump_version(RATES, ALL_USERS)
+    return len(rates)
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def bump_rates_version(sender, raw=False, **kwargs):
+    """A rate edited by hand, e.g. in the admin, changes every converted total."""
+    if not raw:
+        bump_version(RATES, ALL_USERS)
+
+
+@receiver(post_migrate)
+def load_rates_after_migrate(sender, using, **kwargs):
+    """Fill an empty rates table from ``EXCHANGE_RATES_FILE``; records need a rate for their default currency.
+
+    The app has no migrations, so this runs after ``migrate`` like the search index.
+    """
+    if sender.name == "app" and not ExchangeRate.objects.using(using).exists():
+        ExchangeRate.objects.using(using).bulk_create(read_rates_file())
@@ -0,0 +1,83 @@
+import csv
+import json
+from django.conf import settings
+from app.importer import CSV_COLUMNS
+from app.pagination import sort_ordering
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "json": ("application/x-ndjson", "ndjson"),
+}
+EXPORT_COLUMNS = ("id",) + CSV_COLUMNS
+EXPORT_FIELDS = ("id", "type", "date", "item", "category__name", "volume", "cost", "currency")
+
+
+class Echo:
+    """File-like object whose ``write`` hands the line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(queryset, sort_field, descending, named=False):
+    return queryset.order_by(*sort_ordering(sort_field, descending)).values_list(*EXPORT_FIELDS, named=named)
+
+
+def export_row(row):
+    pk, record_type, date, item, category, volume, cost, currency = row
+    return pk, record_type, date.isoformat(), item, category, volume, str(cost), currency
+
+
+def export_rows(queryset, sort_field, descending, chunk_size=None):
+    """Yield one tuple of ``EXPORT_FIELDS`` per record, fetched from the database a chunk at a time."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    for row in export_queryset(queryset, sort_field, descending).iterator(chunk_size=chunk_size):
+        yield export_row(row)
+
+
+async def aexport_rows(queryset, sort_field, descending, chunk_size=None):
+    """Async version of ``export_rows`` for views running on the event loop."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    # Plain values_list() runs its query as soon as it is iterated, which aiterator()
+    # does on the event loop; the named variant defers it to the worker thread.
+    rows = export_queryset(queryset, sort_field, descending, named=True)
+    async for row in rows.aiterator(chunk_size=chunk_size):
+        yield export_row(row)
+
+
+def csv_writer():
+    return csv.writer(Echo())
+
+
+def ndjson_line(row):
+    return json.dumps(dict(zip(EXPORT_COLUMNS, row)), separators=(",", ":")) + "\n"
+
+
+def iter_csv(rows):
+    """Yield a CSV document line by line, header first; its columns can be imported back."""
+    writer = csv_writer()
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(rows):
+    """Yield one JSON object per line; costs stay strings so no precision is lost."""
+    for row in rows:
+        yield ndjson_line(row)
+
+
+def iter_export(rows, export_format):
+    return iter_ndjson(rows) if export_format == "json" else iter_csv(rows)
+
+
+async def aiter_export(rows, export_format):
+    """Async version of ``iter_export`` over the async ``rows`` of ``aexport_rows``."""
+    if export_format == "json":
+        async for row in rows:
+            yield ndjson_line(row)
+    else:
+        writer = csv_writer()
+        yield writer.writerow(EXPORT_COLUMNS)
+        async for row in rows:
+            yield writer.writerow(row)
@@ -1,10 +1,62 @@
 from django import forms
-from app.models import Record, Category
+from django.conf import settings
+from app.models import Record, Category, ExchangeRate, RecurringRule
+from app.categories import category_choices
+from app.currencies import exchange_rates
+from app.normalization import capitalize_words
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
+class CategoryChoiceField(forms.ModelChoiceField):
+    """Category dropdown that renders and validates from a cached ``(id, name)`` list, without querying."""
+    categories = {}
+    user_id = None
+
+    def set_categories(self, user_id, choices):
+        self.user_id = user_id
+        self.categories = dict(choices)
+        self.widget.choices = [("", self.empty_label), *choices]
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, Category):
+            return value
+        try:
+            pk = int(value)
+        except (TypeError, ValueError):
+            pk = None
+        if pk not in self.categories:
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return Category.from_db(self.queryset.db, ["id", "user_id", "name"], [pk, self.user_id, self.categories[pk]])
+
+class CurrencyChoiceField(forms.ModelChoiceField):
+    """Currency dropdown that renders and validates from the request's exchange rates, without querying."""
+    rates = {}
+
+    def set_rates(self, rates):
+        self.rates = rates
+        self.widget.choices = [(currency, currency) for currency in sorted(rates)]
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, ExchangeRate):
+            return value
+        if value not in self.rates:
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return ExchangeRate.from_db(self.queryset.db, ["currency", "rate"], [value, self.rates[value]])
+
 class RecordForm(forms.ModelForm):
-    category = forms.ModelChoiceField(
+    category = CategoryChoiceField(
         queryset=Category.objects.none(),
         required=False,
         empty_label="No Category",
@@ -43,51 +95,58 @@ class RecordForm(forms.ModelForm):
         widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Cost'}),
         label="Cost"
     )
+    currency = CurrencyChoiceField(
+        queryset=ExchangeRate.objects.none(),
+        required=False,
+        initial=settings.DEFAULT_CURRENCY,
+        empty_label=None,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label="Currency"
+    )
+    repeat = forms.ChoiceField(
+        choices=[('', 'Does Not Repeat'), *RecurringRule.FREQUENCY_CHOICES],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label="Repeat"
+    )
 
     class Meta:
         model = Record
-        fields = ['type', 'date', 'item', 'volume', 'cost', 'category']
+        fields = ['type', 'date', 'item', 'volume', 'cost', 'currency', 'category']
         widgets = {
             'type': forms.RadioSelect(attrs={'class': 'form-check-input'}),
         }
 
     def __init__(self, *args, user=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.user = user
+        self.fields["currency"].set_rates(exchange_rates())
+        if self.instance.recurring_rule_id:
+            self.fields["repeat"].initial = self.instance.recurring_rule.frequency
         
         if user:
             self.fields["category"].queryset = Category.objects.filter(user=user)
+            self.fields["category"].set_categories(user.pk, category_choices(user))
+
+    def _get_validation_exclusions(self):
+        # The category and currency were already checked against the user's cached
+        # lists, so the model doesn't need to look them up again.
+        exclude = super()._get_validation_exclusions()
+        exclude.update(('category', 'currency'))
+        return exclude
+
+    def clean_currency(self):
+        # A post without a currency keeps the record's, which for a new record is the default one.
+        return self.cleaned_data['currency'] or self.fields['currency'].to_python(self.instance.currency_id)
 
     def clean(self):
         cleaned_data = super().clean()
         category = cleaned_data.get('category')
         new_category = cleaned_data.get('new_category')
-        if 'item' in cleaned_data and cleaned_data['item']:
-            words = cleaned_data['item'].split()
-            capitalized_words = []
-            for word in words:
-                if not word:
-                    continue
-                elif word.isupper():
-                    capitalized_words.append(word)
-                elif word[0].islower():
-                    capitalized_words.append(word[0].upper() + word[1:])
-                else:
-                    capitalized_words.append(word)
-            cleaned_data['item'] = ' '.join(capitalized_words)
-
+        if cleaned_data.get('item'):
+            cleaned_data['item'] = capitalize_words(cleaned_data['item'])
         if new_category:
-            words = new_category.split()
-            capitalized_words = []
-            for word in words:
-                if not word:
-                    continue
-                elif word.isupper():
-                    capitalized_words.append(word)
-                elif word[0].islower():
-                    capitalized_words.append(word[0].upper() + word[1:])
-                else:
-                    capitalized_words.append(word)
-            cleaned_data['new_category'] = ' '.join(capitalized_words)
+            cleaned_data['new_category'] = capitalize_words(new_category)
         
         return cleaned_data
 
@@ -99,4 +158,124 @@ class RecordForm(forms.ModelForm):
         
         if commit:
             record.save()
-        return record
\ No newline at end of file
+        return record
+
+class RecordIdsField(forms.Field):
+    """List of record ids, as posted by the checkboxes of the records table."""
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        if not isinstance(value, (list, tuple)):
+            raise forms.ValidationError("Enter a list of record ids.", code="invalid_list")
+        try:
+            return sorted({int(pk) for pk in value})
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Enter a list of record ids.", code="invalid_list")
+
+    def validate(self, value):
+        super().validate(value)
+        if len(value) > settings.BULK_ACTION_MAX_RECORDS:
+            raise forms.ValidationError(
+                "Select at most %(max)d records at a time.",
+                code="too_many",
+                params={"max": settings.BULK_ACTION_MAX_RECORDS},
+            )
+
+class BulkRecordsForm(forms.Form):
+    records = RecordIdsField(error_messages={'required': "Select the records to change."})
+    action = forms.ChoiceField(
+        choices=[('update', 'Update'), ('delete', 'Delete')],
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label="Action"
+    )
+    type = forms.ChoiceField(
+        choices=[('', 'Keep Type'), ('Expense', 'Expense'), ('Income', 'Income')],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label="Type"
+    )
+    category = CategoryChoiceField(
+        queryset=Category.objects.none(),
+        required=False,
+        empty_label="Keep Category",
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    uncategorize = forms.BooleanField(required=False, label="Remove Category")
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+
+        if user:
+            self.fields["category"].queryset = Category.objects.filter(user=user)
+            self.fields["category"].set_categories(user.pk, category_choices(user))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('category') and cleaned_data.get('uncategorize'):
+            raise forms.ValidationError("Choose a category or remove it, not both.")
+        if cleaned_data.get('action') == 'update' and not self.changes():
+            raise forms.ValidationError("Choose a type or category to change.")
+        return cleaned_data
+
+    def changes(self):
+        """The fields an update sets on every selected record."""
+        changes = {}
+        if self.cleaned_data.get('type'):
+            changes['type'] = self.cleaned_data['type']
+        if self.cleaned_data.get('category'):
+            changes['category_id'] = self.cleaned_data['category'].pk
+        elif self.cleaned_data.get('uncategorize'):
+            changes['category_id'] = None
+        return changes
+
+class BaseCurrencyForm(forms.Form):
+    currency = forms.ChoiceField(
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label="Show Totals In"
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["currency"].choices = [(currency, currency) for currency in sorted(exchange_rates())]
+
+class ImportRecordsForm(forms.Form):
+    file = forms.FileField(
+        label="File",
+        help_text="CSV with type, date, item, category, volume, cost and optional currency columns, or an OFX bank statement.",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.ofx,.qfx'})
+    )
+    format = forms.ChoiceField(
+        choices=[('', 'Detect from file name'), ('csv', 'CSV'), ('ofx', 'OFX')],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label="Format"
+    )
+
+class ReportFilterForm(forms.Form):
+    period = forms.ChoiceField(
+        choices=[('month', 'Monthly'), ('week', 'Weekly')],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label="Period"
+    )
+    start = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        label="From"
+    )
+    end = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        label="To"
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and start > end:
+            raise forms.ValidationError("The start date must not be after the end date.")
+        cleaned_data['period'] = cleaned_data.get('period') or 'month'
+        return cleaned_data
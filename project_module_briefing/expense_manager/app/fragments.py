@@ -0,0 +1,65 @@
+from functools import cache as memoize
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils.safestring import mark_safe
+from app.versions import CATEGORIES, get_version
+
+ROW_TEMPLATE = "app/record_row.html"
+# Reversed in place of a record id, then swapped for the real one.
+URL_PLACEHOLDER = 2_147_483_647
+
+
+@memoize
+def url_parts(name, urlconf, script_prefix):
+    """The text before and after the id in the URL of ``name``, reversed once per URL configuration."""
+    prefix, suffix = reverse(name, urlconf=urlconf, args=[URL_PLACEHOLDER]).split(str(URL_PLACEHOLDER))
+    return prefix, suffix
+
+
+def record_url_parts(name):
+    """``url_parts`` of ``name`` for the current request, so each row's URL is a concatenation instead of a ``reverse``."""
+    return url_parts(name, get_urlconf(), get_script_prefix())
+
+
+def row_cache_key(record, categories_version):
+    """Cache key of a record's table row, which changes whenever the row's content can.
+
+    The record's ``updated_at`` covers its own fields, and the user's category
+    version the category name it shows, which a rename changes without saving
+    the record.
+    """
+    updated = int(record.updated_at.timestamp() * 1_000_000)
+    return f"record-row:{record.pk}:{updated}:{categories_version}"
+
+
+def render_record_rows(records):
+    """The ``<tr>`` of every record, joined, reusing the cached rows and rendering only the missing ones.
+
+    The cached rows come back in a single ``get_many`` and the new ones are
+    stored with a single ``set_many``, so a page costs two cache round trips
+    whatever its size.
+    """
+    versions = {}
+    keys = []
+    for record in records:
+        if record.user_id not in versions:
+            versions[record.user_id] = get_version(CATEGORIES, record.user_id)
+        keys.append(row_cache_key(record, versions[record.user_id]))
+
+    rows = cache.get_many(keys)
+    missing = {}
+    if len(rows) < len(keys):
+        template = get_template(ROW_TEMPLATE)
+        edit_prefix, edit_suffix = record_url_parts("edit_record")
+        delete_prefix, delete_suffix = record_url_parts("delete_record")
+        for key, record in zip(keys, records):
+            if key not in rows:
+                rows[key] = missing[key] = template.render({
+                    "record": record,
+                    "edit_url": f"{edit_prefix}{record.pk}{edit_suffix}",
+                    "delete_url": f"{delete_prefix}{record.pk}{delete_suffix}",
+                })
+        cache.set_many(missing, settings.RECORD_ROW_CACHE_TIMEOUT)
+    return mark_safe("".join(rows[key] for key in keys))
@@ -0,0 +1,213 @@
+import csv
+import html
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import transaction
+from app.changes import log_changes
+from app.currencies import exchange_rates
+from app.models import Category, Record, RecordChange
+from app.normalization import capitalize_words
+from app.summary import CENTS, rebuild_rollups
+from app.versions import RECORDS, bump_version
+
+IMPORT_FORMATS = ("csv", "ofx")
+CSV_COLUMNS = ("type", "date", "item", "category", "volume", "cost", "currency")
+MAX_COST = Decimal("100000000")
+MAX_REPORTED_ERRORS = 20
+OFX_CHUNK_SIZE = 64 * 1024
+
+
+def detect_format(filename):
+    """Guess the import format from a file name, defaulting to CSV."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return "ofx" if extension in (".ofx", ".qfx") else "csv"
+
+
+def iter_csv_rows(lines):
+    """Yield ``(line number, row)`` for each data row of a CSV with a header line."""
+    reader = csv.DictReader(lines)
+    missing = {"type", "date", "item", "cost"} - {name.strip().lower() for name in reader.fieldnames or ()}
+    if missing:
+        raise ValueError(f"CSV is missing the column(s): {', '.join(sorted(missing))}")
+    for row in reader:
+        yield reader.line_num, {(key or "").strip().lower(): value for key, value in row.items()}
+
+
+def _ofx_tags(stream):
+    """Yield ``(TAG, value)`` pairs of an OFX document, reading it a chunk at a time.
+
+    Works for both the SGML flavour, where leaf tags are never closed, and the
+    XML flavour, whose closing leaf tags simply come through as empty values.
+    """
+    buffer = ""
+    while True:
+        chunk = stream.read(OFX_CHUNK_SIZE)
+        buffer += chunk
+        parts = buffer.split("<")
+        buffer = parts.pop() if chunk else ""
+        for part in parts:
+            tag, separator, value = part.partition(">")
+            if separator:
+                yield tag.strip().upper(), html.unescape(value.strip())
+        if not chunk:
+            return
+
+
+def iter_ofx_rows(stream):
+    """Yield ``(transaction number, row)`` for each ``STMTTRN`` of an OFX statement.
+
+    Positive amounts are incomes and negative ones expenses, in the currency
+    of their statement; OFX has no categories, so imported transactions are
+    left uncategorized.
+    """
+    transaction_number = 0
+    current = None
+    currency = ""
+    for tag, value in _ofx_tags(stream):
+        if tag == "CURDEF":
+            currency = value
+        elif tag == "STMTTRN":
+            current = {}
+        elif tag == "/STMTTRN" and current is not None:
+            transaction_number += 1
+            amount = current.get("TRNAMT", "")
+            yield transaction_number, {
+                "type": "Expense" if amount.startswith("-") else "Income",
+                "date": current.get("DTPOSTED", "")[:8],
+                "item": current.get("NAME") or current.get("MEMO", ""),
+                "category": "",
+                "volume": "1",
+                "cost": amount.lstrip("+-"),
+                "currency": currency,
+            }
+            current = None
+        elif current is not None and not tag.startswith("/"):
+            current[tag] = value
+
+
+def iter_rows(stream, file_format):
+    """Yield ``(position, row)`` pairs from a text stream in ``file_format``."""
+    if file_format == "ofx":
+        return iter_ofx_rows(stream)
+    return iter_csv_rows(stream)
+
+
+def parse_date(value):
+    value = value.strip()
+    if len(value) == 8 and value.isdigit():
+        return datetime.strptime(value, "%Y%m%d").date()
+    return date.fromisoformat(value)
+
+
+def clean_row(row, currencies=None):
+    """Validate a raw import row the way RecordForm would, returning the record fields.
+
+    A row without a currency is in ``DEFAULT_CURRENCY``; one with a currency
+    missing from ``currencies``, when given, is invalid. Raises ``ValueError``
+    describing the first problem found.
+    """
+    record_type = (row.get("type") or "").strip().capitalize()
+    if record_type not in ("Expense", "Income"):
+        raise ValueError(f"unknown type '{row.get('type')}'")
+
+    try:
+        record_date = parse_date(row.get("date") or "")
+    except ValueError:
+        raise ValueError(f"invalid date '{row.get('date')}'")
+
+    try:
+        cost = Decimal((row.get("cost") or "").strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid cost '{row.get('cost')}'")
+    if not cost.is_finite() or cost < 0 or cost >= MAX_COST:
+        raise ValueError(f"invalid cost '{row.get('cost')}'")
+
+    item = capitalize_words(row.get("item") or "")
+    volume = (row.get("volume") or "").strip()
+    category = capitalize_words(row.get("category") or "")
+    for name, value in (("item", item), ("volume", volume)):
+        if not value:
+            raise ValueError(f"{name} is required")
+    for name, value in (("item", item), ("volume", volume), ("category", category)):
+        if len(value) > 20:
+            raise ValueError(f"{name} '{value}' is longer than 20 characters")
+
+    currency = (row.get("currency") or "").strip().upper() or settings.DEFAULT_CURRENCY
+    if currencies is not None and currency not in currencies:
+        raise ValueError(f"unknown currency '{row.get('currency')}'")
+
+    return {
+        "type": record_type,
+        "date": record_date,
+        "item": item,
+        "category": category,
+        "volume": volume,
+        "cost": cost.quantize(CENTS),
+        "currency_id": currency,
+    }
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def rows_per_second(self):
+        rows = self.created + self.skipped
+        return rows / self.elapsed if self.elapsed else float(rows)
+
+
+def import_records(user, rows, batch_size=None):
+    """Insert the ``(position, row)`` pairs of ``rows`` as records of ``user``.
+
+    Rows are consumed lazily and written with ``bulk_create`` every
+    ``batch_size`` records, so memory stays bounded whatever the input size.
+    Invalid rows are skipped and reported in the result. Each distinct category
+    name costs at most one lookup. Every batch is journaled with one more
+    ``bulk_create``, and the rollups are rebuilt and the records version bumped
+    once at the end, because ``bulk_create`` does not send ``post_save``.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    result = ImportResult()
+    start = time.perf_counter()
+
+    with transaction.atomic():
+        category_ids = dict(Category.objects.filter(user=user).values_list("name", "id"))
+        currencies = exchange_rates()
+        batch = []
+        for position, row in rows:
+            try:
+                fields = clean_row(row, currencies)
+            except ValueError as error:
+                result.skipped += 1
+                if len(result.errors) < MAX_REPORTED_ERRORS:
+                    result.errors.append(f"Row {position}: {error}")
+                continue
+
+            category_name = fields.pop("category")
+            if category_name and category_name not in category_ids:
+                category_ids[category_name] = Category.objects.get_or_create(user=user, name=category_name)[0].id
+            batch.append(Record(user=user, category_id=category_ids.get(category_name), **fields))
+
+            if len(batch) >= batch_size:
+                Record.objects.bulk_create(batch)
+                log_changes(batch, RecordChange.CREATE)
+                result.created += len(batch)
+                batch = []
+
+        if batch:
+            Record.objects.bulk_create(batch)
+            log_changes(batch, RecordChange.CREATE)
+            result.created += len(batch)
+        rebuild_rollups(user)
+        bump_version(RECORDS, user.pk)
+
+    result.elapsed = time.perf_counter() - start
+    return result
@@ -0,0 +1,153 @@
+import math
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PERCENTILES = (50, 95, 99)
+MAX_SQL_LENGTH = 500
+
+# Stats of the request being handled. A context variable rather than a thread
+# local, so the queries an async view runs in sync_to_async threads count too.
+current_request = ContextVar("current_request", default=None)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    sql_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_sql: str = ""
+    view_time: float = 0.0
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.sql_time += duration
+        if duration >= self.slowest_time:
+            self.slowest_time, self.slowest_sql = duration, sql
+
+    def server_timing(self):
+        """``Server-Timing`` header value, with times in milliseconds."""
+        return ", ".join([
+            f'sql;dur={self.sql_time * 1000:.2f};desc="{self.queries} queries"',
+            f"sql-slowest;dur={self.slowest_time * 1000:.2f}",
+            f"view;dur={self.view_time * 1000:.2f}",
+        ])
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper adding every query's duration to the current request's stats."""
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - start)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a sorted, non-empty list."""
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+@dataclass
+class RequestLog:
+    """The stats of the last requests to each URL name, in bounded ring buffers."""
+    size: int
+    requests: dict = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, url_name, stats):
+        with self.lock:
+            buffer = self.requests.get(url_name)
+            if buffer is None:
+                buffer = self.requests[url_name] = deque(maxlen=self.size)
+            buffer.append(stats)
+
+    def clear(self):
+        with self.lock:
+            self.requests.clear()
+
+    def summary(self):
+        """Per URL name, the p50/p95/p99 of the view time, SQL time and query count, and the slowest query."""
+        with self.lock:
+            requests = {url_name: list(buffer) for url_name, buffer in self.requests.items()}
+
+        summary = {}
+        for url_name, samples in sorted(requests.items()):
+            view_ms = sorted(stats.view_time * 1000 for stats in samples)
+            sql_ms = sorted(stats.sql_time * 1000 for stats in samples)
+            queries = sorted(stats.queries for stats in samples)
+            slowest = max(samples, key=lambda stats: stats.slowest_time)
+            summary[url_name] = {
+                "requests": len(samples),
+                "view_ms": {f"p{p}": round(percentile(view_ms, p), 2) for p in PERCENTILES},
+                "sql_ms": {f"p{p}": round(percentile(sql_ms, p), 2) for p in PERCENTILES},
+                "queries": {f"p{p}": percentile(queries, p) for p in PERCENTILES},
+                "slowest_query": {
+                    "ms": round(slowest.slowest_time * 1000, 2),
+                    "sql": slowest.slowest_sql[:MAX_SQL_LENGTH],
+                },
+            }
+        return summary
+
+
+request_log = RequestLog(size=settings.REQUEST_STATS_BUFFER_SIZE)
+
+
+class QueryTimingMiddleware:
+    """Count and time the SQL of every request, reporting it in ``Server-Timing`` and the request log.
+
+    Times are taken until the view returns its response, so the body of a
+    streaming response is not included. Only requests that resolved to a named
+    URL are logged.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, start = RequestStats(), time.perf_counter()
+        token = current_request.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats, start = RequestStats(), time.perf_counter()
+        token = current_request.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.finish(request, response, stats, start)
+
+    def finish(self, request, response, stats, start):
+        stats.view_time = time.perf_counter() - start
+        response["Server-Timing"] = stats.server_timing()
+        resolver_match = getattr(request, "resolver_match", None)
+        if resolver_match is not None and resolver_match.url_name:
+            request_log.add(resolver_match.url_name, stats)
+        return response
@@ -0,0 +1,23 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from app.changes import compact_changes
+
+
+class Command(BaseCommand):
+    help = "Remove the record change journal entries that no syncing client needs any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.CHANGES_RETENTION_DAYS,
+            help="Keep deletions journaled in the last DAYS days (default %(default)s).",
+        )
+
+    def handle(self, *args, days, **options):
+        if days < 0:
+            raise CommandError("--days must not be negative.")
+        removed = compact_changes(timezone.now() - timedelta(days=days))
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} journal entries."))
@@ -0,0 +1,39 @@
+import csv
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from app.importer import IMPORT_FORMATS, detect_format, import_records, iter_rows
+
+
+class Command(BaseCommand):
+    help = "Import records for a user from a CSV or OFX file, streaming it in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or OFX file to import.")
+        parser.add_argument("--user", required=True, dest="username", help="Username that will own the records.")
+        parser.add_argument("--format", choices=IMPORT_FORMATS, dest="file_format", help="File format (default: from the file extension).")
+        parser.add_argument("--batch-size", type=int, help="Records per bulk insert (default: settings.IMPORT_BATCH_SIZE).")
+
+    def handle(self, *args, path, username, file_format=None, batch_size=None, **options):
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise CommandError(f"Unknown user: {username}")
+        if batch_size is not None and batch_size < 1:
+            raise CommandError("--batch-size must be a positive number.")
+
+        file_format = file_format or detect_format(path)
+        try:
+            with open(path, encoding="utf-8-sig", errors="replace", newline="") as stream:
+                result = import_records(user, iter_rows(stream, file_format), batch_size=batch_size)
+        except OSError as error:
+            raise CommandError(f"Cannot read {path}: {error.strerror}")
+        except (ValueError, csv.Error) as error:
+            raise CommandError(str(error))
+
+        for error in result.errors:
+            self.stderr.write(error)
+        if result.skipped > len(result.errors):
+            self.stderr.write(f"... and {result.skipped - len(result.errors)} more invalid rows.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} records, skipped {result.skipped}, "
+            f"in {result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s)."
+        ))
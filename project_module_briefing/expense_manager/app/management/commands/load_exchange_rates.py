@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from app.currencies import load_exchange_rates
+
+
+class Command(BaseCommand):
+    help = "Load the euro reference rates of an ECB eurofxref CSV file into the exchange rates table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default=settings.EXCHANGE_RATES_FILE,
+            help="eurofxref.csv or eurofxref-hist.csv file (default %(default)s).",
+        )
+
+    def handle(self, *args, path, **options):
+        try:
+            loaded = load_exchange_rates(path)
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f"Loaded {loaded} exchange rates from {path}."))
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from app.summary import rebuild_rollups, verify_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user balance and category rollups from the records table and verify them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", dest="usernames", help="Only process this username (repeatable).")
+        parser.add_argument("--verify-only", action="store_true", help="Check the rollups without rebuilding them.")
+
+    def handle(self, *args, usernames=None, verify_only=False, **options):
+        users = User.objects.order_by("pk")
+        if usernames:
+            users = users.filter(username__in=usernames)
+            missing = set(usernames) - set(users.values_list("username", flat=True))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+
+        failed = 0
+        for user in users.iterator():
+            if not verify_only:
+                rebuild_rollups(user)
+            problems = verify_rollups(user)
+            if problems:
+                failed += 1
+                for problem in problems:
+                    self.stderr.write(f"{user.username}: {problem}")
+            elif options["verbosity"] > 1:
+                self.stdout.write(f"{user.username}: ok")
+
+        if failed:
+            raise CommandError(f"Rollups are out of date for {failed} user(s).")
+        self.stdout.write(self.style.SUCCESS("Rollups verified."))
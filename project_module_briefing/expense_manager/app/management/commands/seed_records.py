@@ -0,0 +1,51 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from app.seeding import DEFAULT_END, seed_records
+
+
+def parse_date(value):
+    return date.today() if value == "today" else date.fromisoformat(value)
+
+
+class Command(BaseCommand):
+    help = "Generate users with random but reproducible records, for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1, help="Number of users to generate (default: 1).")
+        parser.add_argument("--records", type=int, default=1000, help="Records per user (default: 1000).")
+        parser.add_argument("--categories", type=int, default=10, help="Categories per user (default: 10).")
+        parser.add_argument("--start", type=parse_date, help="First record date, YYYY-MM-DD (default: a year before --end).")
+        parser.add_argument("--end", type=parse_date, help=f"Last record date, YYYY-MM-DD or 'today' (default: {DEFAULT_END}).")
+        parser.add_argument("--income-ratio", type=float, default=0.2, help="Share of records that are incomes (default: 0.2).")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed generates the same records (default: 0).")
+        parser.add_argument("--username-prefix", default="seed", help="Users are named PREFIX1, PREFIX2, ... (default: seed).")
+        parser.add_argument("--password", default="seedpassword", help="Password of the generated users (default: seedpassword).")
+        parser.add_argument("--batch-size", type=int, help="Records per bulk insert (default: settings.IMPORT_BATCH_SIZE).")
+
+    def handle(self, *args, **options):
+        for name in ("users", "records", "batch_size"):
+            if options[name] is not None and options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be a positive number.")
+        if options["categories"] < 0:
+            raise CommandError("--categories must not be negative.")
+        if not 0 <= options["income_ratio"] <= 1:
+            raise CommandError("--income-ratio must be between 0 and 1.")
+        if options["start"] and options["end"] and options["start"] > options["end"]:
+            raise CommandError("--start must not be after --end.")
+
+        result = seed_records(
+            users=options["users"],
+            records=options["records"],
+            categories=options["categories"],
+            start=options["start"],
+            end=options["end"],
+            income_ratio=options["income_ratio"],
+            seed=options["seed"],
+            username_prefix=options["username_prefix"],
+            password=options["password"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created} records for {result.users} users "
+            f"in {result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s)."
+        ))
@@ -1,10 +1,34 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
-from django.db.models.signals import post_delete
-from django.dispatch import receiver
 from django.core.validators import MinValueValidator
 from decimal import Decimal
+from app.normalization import capitalize_words
+
+def signed_amount(record_type, cost):
+    """Amount a record adds to the wallet: incomes add their cost, expenses subtract it."""
+    cost = Decimal(str(cost))
+    return -cost if record_type == "Expense" else cost
+
+def deleting_users(origin):
+    """Whether a delete signal comes from deleting users, which cascades to everything they own."""
+    model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    return model is User
+
+class ExchangeRate(models.Model):
+    """How many units of ``currency`` one euro is worth, as in the ECB's euro foreign exchange reference rates."""
+    currency = models.CharField(max_length=3, primary_key=True, verbose_name=_("Currency"))
+    rate = models.DecimalField(max_digits=18, decimal_places=8, validators=[MinValueValidator(Decimal('0.00000001'))], verbose_name=_("Rate"))
+    date = models.DateField(null=True, blank=True, verbose_name=_("Date"))
+
+    class Meta:
+        verbose_name = _("Exchange Rate")
+        verbose_name_plural = _("Exchange Rates")
+        ordering = ['currency']
+
+    def __str__(self):
+        return self.currency
 
 class Category(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name=_("User"))
@@ -14,37 +38,60 @@ class Category(models.Model):
         verbose_name = _("Category")
         verbose_name_plural = _("Categories")
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=["user", "name"], name="unique_category_name_per_user"),
+        ]
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
         if self.name:
-            words = self.name.split()
-            capitalized_words = []
-            
-            for word in words:
-                print(f"Category save - word: '{word}', isupper: {word.isupper()}, islower: {word.islower()}")
-                
-                if not word:
-                    continue
-                elif word.upper() == word:
-                    capitalized_words.append(word)
-                    print(f"Preserving uppercase word: {word}")
-                elif word[0].islower():
-                    capitalized_words.append(word[0].upper() + word[1:])
-                    print(f"Capitalizing: {word} -> {word[0].upper() + word[1:]}")
-                else:
-                    capitalized_words.append(word)
-                    print(f"Keeping as is: {word}")
-                    
-            self.name = ' '.join(capitalized_words)
-            print(f"Final category name: {self.name}")
-            
+            self.name = capitalize_words(self.name)
         super().save(*args, **kwargs)
     
     def admin_display(self):
         return f"{self.name} @ {self.user.username}"
 
+class RecurringRule(models.Model):
+    """A record repeated every ``interval`` days, weeks, months or years from ``start_date``."""
+    FREQUENCY_CHOICES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+        ('yearly', 'Yearly'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="recurring_rules", verbose_name=_("User"))
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='monthly', verbose_name=_("Frequency"))
+    interval = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)], verbose_name=_("Interval"))
+    start_date = models.DateField(verbose_name=_("Start Date"))
+    end_date = models.DateField(null=True, blank=True, verbose_name=_("End Date"))
+    # The first occurrence not materialized yet, so the job only reads the rules that are due.
+    next_date = models.DateField(verbose_name=_("Next Date"))
+    type = models.CharField(max_length=10, choices=[('Expense', 'Expense'), ('Income', 'Income')], verbose_name=_("Type"))
+    item = models.CharField(max_length=20, verbose_name=_("Item"))
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("Category"))
+    volume = models.CharField(max_length=20, verbose_name=_("Volume"))
+    cost = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.00'))], verbose_name=_("Cost"))
+    currency = models.ForeignKey(ExchangeRate, on_delete=models.PROTECT, default=settings.DEFAULT_CURRENCY, db_column="currency", related_name="+", verbose_name=_("Currency"))
+
+    class Meta:
+        verbose_name = _("Recurring Rule")
+        verbose_name_plural = _("Recurring Rules")
+        indexes = [
+            models.Index(fields=["next_date", "id"], name="recurring_rule_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.item} - {self.cost} every {self.interval} {self.frequency}"
+
+    def save(self, *args, **kwargs):
+        if self.item:
+            self.item = capitalize_words(self.item)
+        if self.next_date is None:
+            self.next_date = self.start_date
+        super().save(*args, **kwargs)
+
 class Record(models.Model):
     TYPE_CHOICES = [
         ('Expense', 'Expense'),
@@ -58,35 +105,120 @@ class Record(models.Model):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("Category"))
     volume = models.CharField(max_length=20, verbose_name=_("Volume"))
     cost = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.00'))], verbose_name=_("Cost"))
+    currency = models.ForeignKey(ExchangeRate, on_delete=models.PROTECT, default=settings.DEFAULT_CURRENCY, db_column="currency", related_name="+", verbose_name=_("Currency"))
+    # Versions the record's cached table row; bulk updates have to set it themselves.
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+    recurring_rule = models.ForeignKey(RecurringRule, on_delete=models.SET_NULL, null=True, blank=True, related_name="records", verbose_name=_("Recurring Rule"))
+    occurrence_date = models.DateField(null=True, blank=True, verbose_name=_("Occurrence Date"))
 
     class Meta:
         verbose_name = _("Record")
         verbose_name_plural = _("Records")
         ordering = ['-date']
+        # The id tiebreak lets the keyset pagination of every sort option seek straight to a page.
+        indexes = [
+            models.Index(fields=["user", "-date", "-id"], name="record_user_date_idx"),
+            models.Index(fields=["user", "type"], name="record_user_type_idx"),
+            models.Index(fields=["user", "cost", "id"], name="record_user_cost_idx"),
+            models.Index(fields=["user", "item", "id"], name="record_user_item_idx"),
+            # Covers the spending reports, which group a date range by type and category.
+            models.Index(fields=["user", "date", "type", "category", "cost", "currency"], name="record_user_report_idx"),
+        ]
+        constraints = [
+            # Materializing a rule's occurrence twice is a no-op, however often the job runs.
+            models.UniqueConstraint(fields=["recurring_rule", "occurrence_date"], name="unique_recurring_occurrence"),
+        ]
 
     def __str__(self):
         return f"{self.date} - {self.item} - {self.cost}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what this record contributed to the rollups so an edit can move it.
+        loaded = dict(zip(field_names, values))
+        if {"user_id", "category_id", "currency_id", "type", "cost"} <= loaded.keys():
+            instance._rollup_state = (
+                loaded["user_id"],
+                loaded["category_id"],
+                loaded["currency_id"],
+                signed_amount(loaded["type"], loaded["cost"]),
+            )
+        return instance
+
+    @property
+    def rollup_state(self):
+        return (self.user_id, self.category_id, self.currency_id, signed_amount(self.type, self.cost))
+
     def save(self, *args, **kwargs):
         if self.item:
-            words = self.item.split()
-            capitalized_words = []
-            for word in words:
-                if not word:
-                    continue
-                elif word.upper() == word:
-                    capitalized_words.append(word)
-                elif word[0].islower():
-                    capitalized_words.append(word[0].upper() + word[1:])
-                else:
-                    capitalized_words.append(word)
-            self.item = ' '.join(capitalized_words)
+            self.item = capitalize_words(self.item)
         super().save(*args, **kwargs)
 
-@receiver(post_delete, sender=Record)
-def delete_unused_categories(sender, instance, **kwargs):
-    """Delete categories that are no longer used by any records."""
-    if instance.category:
-        if not Record.objects.filter(category=instance.category).exists():
-            print(f"Deleting unused category: {instance.category.name}")
-            instance.category.delete()
\ No newline at end of file
+class UserBalance(models.Model):
+    """Record count of a user, kept up to date as records change, and the currency their totals are shown in.
+
+    The wallet total is not stored: costs are in different currencies, so the
+    summary converts and sums the category rollups instead.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="balance", verbose_name=_("User"))
+    currency = models.ForeignKey(ExchangeRate, on_delete=models.PROTECT, default=settings.DEFAULT_CURRENCY, db_column="currency", related_name="+", verbose_name=_("Base Currency"))
+    record_count = models.PositiveIntegerField(default=0, verbose_name=_("Record Count"))
+
+    class Meta:
+        verbose_name = _("User Balance")
+        verbose_name_plural = _("User Balances")
+
+    def __str__(self):
+        return f"{self.user} - {self.currency_id}"
+
+class CategoryRollup(models.Model):
+    """Running net spend of a user's category in one currency; a null category holds uncategorized records."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="category_rollups", verbose_name=_("User"))
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name="rollups", verbose_name=_("Category"))
+    currency = models.ForeignKey(ExchangeRate, on_delete=models.PROTECT, default=settings.DEFAULT_CURRENCY, db_column="currency", related_name="+", verbose_name=_("Currency"))
+    net = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"), verbose_name=_("Net"))
+    record_count = models.PositiveIntegerField(default=0, verbose_name=_("Record Count"))
+
+    class Meta:
+        verbose_name = _("Category Rollup")
+        verbose_name_plural = _("Category Rollups")
+        constraints = [
+            models.UniqueConstraint(fields=["user", "category", "currency"], name="unique_category_rollup"),
+        ]
+
+    def __str__(self):
+        return f"{self.category or 'Uncategorized'} - {self.net}"
+
+class RecordChange(models.Model):
+    """Append-only journal of a user's record changes; its ids are the sequence numbers clients sync from."""
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+    PURGE = "purge"
+    COMPACTED = "compacted"
+    OPERATION_CHOICES = [
+        (CREATE, "Create"),
+        (UPDATE, "Update"),
+        (DELETE, "Delete"),
+        (PURGE, "Purge"),
+        (COMPACTED, "Compacted"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="record_changes", verbose_name=_("User"))
+    # Not a foreign key: the entries of deleted records have to outlive them.
+    record_id = models.BigIntegerField(null=True, blank=True, verbose_name=_("Record"))
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES, verbose_name=_("Operation"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+
+    class Meta:
+        verbose_name = _("Record Change")
+        verbose_name_plural = _("Record Changes")
+        indexes = [
+            models.Index(fields=["user", "id"], name="record_change_user_idx"),
+            # Finds the later changes of the same record when compacting.
+            models.Index(fields=["user", "record_id", "id"], name="record_change_record_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.id} - {self.operation} {self.record_id or ''}".strip()
@@ -0,0 +1,13 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def capitalize_words(text):
+    """Capitalize the first letter of each word, leaving all-caps words such as acronyms untouched.
+
+    Items and category names repeat a lot, so results are memoized.
+    """
+    return " ".join(
+        word if word.isupper() or not word[0].islower() else word[0].upper() + word[1:]
+        for word in text.split()
+    )
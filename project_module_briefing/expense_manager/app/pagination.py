@@ -0,0 +1,154 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db.models import F, Q
+
+SORT_FIELDS = ("id", "date", "item", "category__name", "cost")
+DEFAULT_SORT = "id"
+NULLABLE_SORT_FIELDS = ("category__name",)
+
+
+def parse_sort(sort_param):
+    """Split a ``sort`` query parameter into ``(field, descending)``, falling back to the default sort."""
+    sort_param = sort_param or DEFAULT_SORT
+    descending = sort_param.startswith("-")
+    sort_field = sort_param[1:] if descending else sort_param
+    if sort_field not in SORT_FIELDS:
+        return DEFAULT_SORT, False
+    return sort_field, descending
+
+
+def sort_ordering(sort_field, descending):
+    """Ordering for a sort field with ``id`` as the tiebreak, so every row has a unique position.
+
+    Missing categories sort first when ascending and last when descending on
+    every database, which keeps the cursor comparisons below valid.
+    """
+    tiebreak = "-id" if descending else "id"
+    if sort_field == "id":
+        return [tiebreak]
+    if sort_field in NULLABLE_SORT_FIELDS:
+        expression = F(sort_field).desc(nulls_last=True) if descending else F(sort_field).asc(nulls_first=True)
+    else:
+        expression = F(sort_field).desc() if descending else F(sort_field).asc()
+    return [expression, tiebreak]
+
+
+def rows_after(sort_field, descending, value, pk):
+    """Filter matching the rows that come strictly after ``(value, pk)`` in the given order."""
+    if sort_field == "id":
+        return Q(id__lt=pk) if descending else Q(id__gt=pk)
+
+    after = "lt" if descending else "gt"
+    if value is None:
+        # Only nullable fields have a None cursor; NULLs come first ascending, last descending.
+        same_value = Q(**{f"{sort_field}__isnull": True, f"id__{after}": pk})
+        return same_value if descending else same_value | Q(**{f"{sort_field}__isnull": False})
+
+    condition = Q(**{f"{sort_field}__{after}": value}) | Q(**{sort_field: value, f"id__{after}": pk})
+    if descending and sort_field in NULLABLE_SORT_FIELDS:
+        condition |= Q(**{f"{sort_field}__isnull": True})
+    return condition
+
+
+def sort_value(record, sort_field):
+    if sort_field == "category__name":
+        return record.category.name if record.category_id else None
+    return getattr(record, sort_field)
+
+
+def encode_cursor(record, sort_field):
+    value = sort_value(record, sort_field)
+    if isinstance(value, (date, Decimal)):
+        value = str(value)
+    payload = json.dumps([value, record.pk], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort_field):
+    """Return the ``(value, pk)`` encoded in ``cursor``, or ``None`` if it is not a valid cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded))
+        if sort_field == "date":
+            value = date.fromisoformat(value)
+        elif sort_field == "cost":
+            value = Decimal(value)
+        elif sort_field == "id":
+            value = int(value)
+        elif sort_field == "rank":
+            value = float(value)
+        elif value is not None and not isinstance(value, str):
+            return None
+        return value, int(pk)
+    except (ValueError, TypeError, InvalidOperation, binascii.Error):
+        return None
+
+
+@dataclass
+class KeysetPage:
+    records: list
+    sort_field: str
+    next_cursor: str = None
+    previous_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def keyset_query(queryset, sort_param=None, after=None, before=None, page_size=None):
+    """Order and filter ``queryset`` for one page; returns the sliced queryset and what ``build_page`` needs.
+
+    Each page is found by seeking past the cursor's ``(sort value, id)`` instead
+    of using an offset, so every page costs the same to fetch.
+    """
+    page_size = page_size or settings.RECORDS_PAGE_SIZE
+    sort_field, descending = parse_sort(sort_param)
+    cursor = decode_cursor(after or before, sort_field) if (after or before) else None
+    backwards = cursor is not None and not after
+
+    # Walking backwards is walking forwards in the reversed order, then flipping the page.
+    walk_descending = descending != backwards
+    queryset = queryset.order_by(*sort_ordering(sort_field, walk_descending))
+    if cursor is not None:
+        queryset = queryset.filter(rows_after(sort_field, walk_descending, *cursor))
+
+    # One extra row tells whether there is a page after this one.
+    return queryset[:page_size + 1], (sort_field, page_size, cursor is not None, backwards)
+
+
+def build_page(records, sort_field, page_size, has_cursor, backwards):
+    """Turn the rows fetched for a ``keyset_query`` into a page with its cursors."""
+    has_more = len(records) > page_size
+    records = records[:page_size]
+    if backwards:
+        records.reverse()
+
+    page = KeysetPage(records=records, sort_field=sort_field)
+    if records:
+        if has_more or backwards:
+            page.next_cursor = encode_cursor(records[-1], sort_field)
+        if (has_more and backwards) or (has_cursor and not backwards):
+            page.previous_cursor = encode_cursor(records[0], sort_field)
+    return page
+
+
+def paginate(queryset, sort_param=None, after=None, before=None, page_size=None):
+    """Return one page of ``queryset`` sorted by ``sort_param``, positioned by an ``after`` or ``before`` cursor."""
+    queryset, page_args = keyset_query(queryset, sort_param, after, before, page_size)
+    return build_page(list(queryset), *page_args)
+
+
+async def apaginate(queryset, sort_param=None, after=None, before=None, page_size=None):
+    """Async version of ``paginate`` for views running on the event loop."""
+    queryset, page_args = keyset_query(queryset, sort_param, after, before, page_size)
+    return build_page([record async for record in queryset], *page_args)
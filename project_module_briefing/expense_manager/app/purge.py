@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db import connection, transaction
+from app.changes import log_purge
+from app.models import Category, Record, RecurringRule
+from app.summary import reset_rollups
+from app.versions import CATEGORIES, RECORDS, bump_version
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def forget_records(cursor, user_id):
+    """Reset the rollups, delete the rules and journal a purge, so nothing counts the user's records any more."""
+    # Rollups and rules reference the categories, so they have to go before them.
+    reset_rollups(user_id)
+    cursor.execute(f"DELETE FROM {_table(RecurringRule)} WHERE user_id = %s", [user_id])
+    log_purge(user_id)
+    bump_version(RECORDS, user_id)
+
+
+def purge_user_records(user, chunk_size=None):
+    """Delete all records, recurring rules and categories of ``user`` with set-based SQL, returning ``(records, categories)``.
+
+    Unlike ``QuerySet.delete()`` this never loads the rows into Python nor
+    sends per-row signals; the rollups are reset, a single purge journaled and
+    the records and categories versions bumped once instead. The rules go too,
+    or the next ``materialize_recurring`` would bring the purged records back.
+    By default everything happens in one transaction.
+    With a ``chunk_size`` records are deleted that many at a time, each chunk
+    in its own transaction, so no single statement holds its locks for long.
+    The first chunk resets the rollups and journals the purge, so if a later
+    one fails the summary and sync clients already treat the records as gone.
+    """
+    user_id = getattr(user, "pk", user)
+    chunk_size = chunk_size if chunk_size is not None else settings.PURGE_CHUNK_SIZE
+    records, categories = _table(Record), _table(Category)
+
+    record_count = 0
+    if chunk_size:
+        first_chunk = True
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                if first_chunk:
+                    forget_records(cursor, user_id)
+                    first_chunk = False
+                cursor.execute(
+                    f"DELETE FROM {records} WHERE id IN (SELECT id FROM {records} WHERE user_id = %s LIMIT %s)",
+                    [user_id, chunk_size],
+                )
+                deleted = cursor.rowcount
+            record_count += deleted
+            if deleted < chunk_size:
+                break
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Without chunking this removes every record; with it, any added since the last chunk.
+        cursor.execute(f"DELETE FROM {records} WHERE user_id = %s", [user_id])
+        record_count += cursor.rowcount
+        if not chunk_size or cursor.rowcount:
+            # Records added while the chunks ran were counted and journaled after the first purge entry.
+            forget_records(cursor, user_id)
+        cursor.execute(f"DELETE FROM {categories} WHERE user_id = %s", [user_id])
+        category_count = cursor.rowcount
+        bump_version(CATEGORIES, user_id)
+
+    return record_count, category_count
@@ -0,0 +1,116 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.db.models.functions import TruncMonth, TruncWeek
+from app.currencies import base_currency, converted, exchange_rates
+from app.models import Category, Record
+from app.summary import UNCATEGORIZED, to_cents
+
+ZERO = Decimal("0.00")
+
+
+class MonthStart(TruncMonth):
+    """TruncMonth of a date that SQLite computes natively instead of calling back into Python per row."""
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.lhs)
+        return f"date({sql}, 'start of month')", params
+
+
+class WeekStart(TruncWeek):
+    """TruncWeek (weeks start on Monday) of a date, computed natively by SQLite."""
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.lhs)
+        # Move forward to the week's Sunday, then back to its Monday.
+        return f"date({sql}, 'weekday 0', '-6 days')", params
+
+
+PERIODS = {
+    "month": MonthStart,
+    "week": WeekStart,
+}
+
+
+def cost_of_type(record_type, base_rate):
+    """Converted cost of the records of one type, zero for the others, so one pass sums both types."""
+    return Case(
+        When(type=record_type, then=converted(F("cost"), base_rate)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+@dataclass
+class SpendingReport:
+    """Net spending pivoted as period x category, with the incomes and expenses of each period."""
+    period: str
+    currency: str = ""
+    periods: list = field(default_factory=list)
+    categories: list = field(default_factory=list)
+    cells: dict = field(default_factory=dict)
+    incomes: dict = field(default_factory=dict)
+    expenses: dict = field(default_factory=dict)
+
+    def net(self, period):
+        return self.incomes.get(period, ZERO) - self.expenses.get(period, ZERO)
+
+    def rows(self):
+        """``(period, [net per category], incomes, expenses, net)`` for each period, for templates."""
+        for period in self.periods:
+            cells = self.cells.get(period, {})
+            yield (
+                period,
+                [cells.get(category) for category in self.categories],
+                self.incomes.get(period, ZERO),
+                self.expenses.get(period, ZERO),
+                self.net(period),
+            )
+
+
+def spending_report(user, period="month", start=None, end=None):
+    """Build the user's spending report in a single grouped query over ``[start, end]``.
+
+    Records are grouped by truncated date and category id, summing incomes and
+    expenses with conditional sums converted to the user's base currency. The
+    date range is a plain ``date`` range on the user's records, so it is read
+    from the covering ``(user, date, ...)`` index without touching the table
+    rows, and each row's rate is joined from the small rates table.
+    """
+    trunc = PERIODS[period]
+    currency = base_currency(user)
+    base_rate = exchange_rates()[currency]
+    records = Record.objects.filter(user=user)
+    if start:
+        records = records.filter(date__gte=start)
+    if end:
+        records = records.filter(date__lte=end)
+
+    rows = (
+        records.order_by()
+        .annotate(period=trunc("date"))
+        .values("period", "category_id")
+        .annotate(incomes=Sum(cost_of_type("Income", base_rate)), expenses=Sum(cost_of_type("Expense", base_rate)))
+        .values_list("period", "category_id", "incomes", "expenses")
+    )
+
+    report = SpendingReport(period=period, currency=currency)
+    category_ids = set()
+    cells = {}
+    for period_start, category_id, incomes, expenses in rows:
+        incomes, expenses = to_cents(incomes), to_cents(expenses)
+        cells.setdefault(period_start, {})[category_id] = incomes - expenses
+        report.incomes[period_start] = report.incomes.get(period_start, ZERO) + incomes
+        report.expenses[period_start] = report.expenses.get(period_start, ZERO) + expenses
+        category_ids.add(category_id)
+
+    names = dict(Category.objects.filter(pk__in=category_ids - {None}).values_list("pk", "name"))
+    names[None] = UNCATEGORIZED
+    report.categories = sorted({names.get(category_id, UNCATEGORIZED) for category_id in category_ids})
+    report.periods = sorted(cells)
+    for period_start, by_category in cells.items():
+        row = report.cells[period_start] = {}
+        for category_id, net in by_category.items():
+            name = names.get(category_id, UNCATEGORIZED)
+            row[name] = row.get(name, ZERO) + net
+    return report
@@ -0,0 +1,156 @@
+import re
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+from app.models import Category, Record
+from app.pagination import KeysetPage, build_page, decode_cursor
+
+SEARCH_TABLE = "app_record_search"
+SEARCH_SORT = "rank"
+TERM = re.compile(r"\w+")
+
+# SQLite keeps a full-text index of every record in an FTS5 table whose rowid
+# is the record id. Triggers keep it in sync with every insert, update and
+# delete, including bulk creates, raw purges and category renames, which never
+# send model signals.
+SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+        item, volume, category, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""INSERT INTO {SEARCH_TABLE}(rowid, item, volume, category)
+        SELECT record.id, record.item, record.volume, category.name
+        FROM app_record record LEFT JOIN app_category category ON category.id = record.category_id""",
+    f"""CREATE TRIGGER app_record_search_insert AFTER INSERT ON app_record BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, item, volume, category)
+        VALUES (new.id, new.item, new.volume, (SELECT name FROM app_category WHERE id = new.category_id));
+    END""",
+    f"""CREATE TRIGGER app_record_search_update AFTER UPDATE OF item, volume, category_id ON app_record BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+        INSERT INTO {SEARCH_TABLE}(rowid, item, volume, category)
+        VALUES (new.id, new.item, new.volume, (SELECT name FROM app_category WHERE id = new.category_id));
+    END""",
+    f"""CREATE TRIGGER app_record_search_delete AFTER DELETE ON app_record BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER app_category_search_rename AFTER UPDATE OF name ON app_category BEGIN
+        UPDATE {SEARCH_TABLE} SET category = new.name
+        WHERE rowid IN (SELECT id FROM app_record WHERE category_id = new.id);
+    END""",
+]
+
+
+def search_indexes():
+    """GIN indexes over the same ``tsvector`` expressions the PostgreSQL search filters on."""
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return [
+        (Record, GinIndex(SearchVector("item", "volume", config="simple"), name="record_search_idx")),
+        (Category, GinIndex(SearchVector("name", config="simple"), name="category_search_idx")),
+    ]
+
+
+def create_search_index(connection):
+    """Create the full-text index for ``connection`` if it does not exist yet.
+
+    The app has no migrations, so this runs after ``migrate`` instead. A new
+    SQLite index is filled with the records that already exist.
+    """
+    if connection.vendor == "sqlite":
+        if SEARCH_TABLE in connection.introspection.table_names(include_views=True):
+            return
+        with connection.cursor() as cursor:
+            for statement in SQLITE_SCHEMA:
+                cursor.execute(statement)
+    elif connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            existing = {
+                name
+                for table in (Record._meta.db_table, Category._meta.db_table)
+                for name in connection.introspection.get_constraints(cursor, table)
+            }
+        with connection.schema_editor() as schema_editor:
+            for model, index in search_indexes():
+                if index.name not in existing:
+                    schema_editor.add_index(model, index)
+
+
+@receiver(post_migrate)
+def create_search_index_after_migrate(sender, using, **kwargs):
+    if sender.name == "app":
+        create_search_index(connections[using])
+
+
+def search_terms(query):
+    """Words of a search box query, lowercased; punctuation and operators are ignored."""
+    return TERM.findall((query or "").lower())
+
+
+def sqlite_search_page(user, terms, cursor, backwards, limit):
+    """``(id, rank)`` pairs of one page of matches, best first, read from the FTS5 index."""
+    # Every term must match, as a prefix of a word in the item, volume or category.
+    match = " ".join(f'"{term}"*' for term in terms)
+    order = "DESC" if backwards else "ASC"
+    sql = f"""
+        SELECT search.rowid, search.rank
+        FROM {SEARCH_TABLE} search
+        CROSS JOIN app_record record ON record.id = search.rowid
+        WHERE {SEARCH_TABLE} MATCH %s AND record.user_id = %s
+    """
+    params = [match, user.pk]
+    if cursor is not None:
+        comparison = "<" if backwards else ">"
+        sql += f" AND (search.rank {comparison} %s OR (search.rank = %s AND search.rowid {comparison} %s))"
+        params += [cursor[0], cursor[0], cursor[1]]
+    sql += f" ORDER BY search.rank {order}, search.rowid {order} LIMIT %s"
+    # CROSS JOIN makes SQLite walk the matches first, instead of every record of the user.
+    with connections[Record.objects.db].cursor() as db_cursor:
+        db_cursor.execute(sql, params + [limit])
+        return db_cursor.fetchall()
+
+
+def postgresql_search_page(user, terms, cursor, backwards, limit):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    query = SearchQuery(" & ".join(f"{term}:*" for term in terms), config="simple", search_type="raw")
+    vector = SearchVector("item", "volume", config="simple")
+    category_matches = Category.objects.annotate(vector=SearchVector("name", config="simple")).filter(vector=query)
+    records = (
+        Record.objects.filter(user=user)
+        .annotate(vector=vector, rank=-SearchRank(vector, query))
+        .filter(Q(vector=query) | Q(category__in=category_matches.values("pk")))
+    )
+    if cursor is not None:
+        after = "lt" if backwards else "gt"
+        records = records.filter(Q(**{f"rank__{after}": cursor[0]}) | Q(rank=cursor[0], **{f"id__{after}": cursor[1]}))
+    ordering = ["-rank", "-id"] if backwards else ["rank", "id"]
+    return list(records.order_by(*ordering).values_list("id", "rank")[:limit])
+
+
+def search_records(user, query, after=None, before=None, page_size=None):
+    """Return one page of ``user``'s records matching ``query``, best matches first.
+
+    Every word of the query has to match the start of a word in the record's
+    item, volume or category name. Pages are walked with ``after``/``before``
+    cursors over ``(rank, id)``, like the sorted records table, so a later page
+    costs the same as the first.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return KeysetPage(records=[], sort_field=SEARCH_SORT)
+
+    page_size = page_size or settings.RECORDS_PAGE_SIZE
+    cursor = decode_cursor(after or before, SEARCH_SORT) if (after or before) else None
+    backwards = cursor is not None and not after
+    search_page = sqlite_search_page if connections[Record.objects.db].vendor == "sqlite" else postgresql_search_page
+    matches = search_page(user, terms, cursor, backwards, page_size + 1)
+
+    records = Record.objects.select_related("category").in_bulk([pk for pk, rank in matches])
+    page = []
+    for pk, rank in matches:
+        record = records[pk]
+        record.rank = rank
+        page.append(record)
+    return build_page(page, SEARCH_SORT, page_size, cursor is not None, backwards)
@@ -0,0 +1,134 @@
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import reset_queries
+from app.changes import log_changes
+from app.models import Category, Record, RecordChange
+from app.summary import rebuild_rollups
+from app.versions import CATEGORIES, RECORDS, bump_version
+
+CATEGORY_NAMES = (
+    "Groceries", "Rent", "Utilities", "Transport", "Restaurants", "Health", "Insurance", "Entertainment",
+    "Clothing", "Education", "Travel", "Gifts", "Subscriptions", "Home", "Pets", "Sports",
+)
+EXPENSE_ITEMS = (
+    "Supermarket", "Coffee", "Lunch", "Dinner Out", "Bus Ticket", "Train Ticket", "Fuel", "Electricity Bill",
+    "Water Bill", "Internet", "Phone Plan", "Pharmacy", "Gym", "Cinema", "Books", "Shoes", "Taxi", "Bakery",
+    "Streaming", "Haircut", "Parking", "Toiletries", "Concert", "Hotel",
+)
+INCOME_ITEMS = ("Salary", "Freelance Work", "Refund", "Interest", "Gift Received", "Bonus", "Sold Item")
+VOLUMES = ("1", "1", "1", "2", "3", "1kg", "500g", "1L", "1 Month", "1 Week")
+CENTS_PER_UNIT = 100
+# Fixed rather than today, so a seed generates the same records whatever day it runs.
+DEFAULT_END = date(2024, 12, 31)
+
+
+@dataclass
+class SeedResult:
+    users: int = 0
+    created: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.created / self.elapsed if self.elapsed else float(self.created)
+
+
+def category_names(count):
+    """The first ``count`` category names, numbered once the realistic ones run out."""
+    return [
+        CATEGORY_NAMES[i] if i < len(CATEGORY_NAMES) else f"Category {i + 1}"
+        for i in range(count)
+    ]
+
+
+def random_records(user_id, category_ids, count, start, end, income_ratio, rng):
+    """Yield ``count`` unsaved records of ``user_id``, drawn from ``rng``.
+
+    Expenses are mostly small with a long tail and incomes larger, both log-normal.
+    One record in eight is left uncategorized, as hand-entered data tends to be.
+    """
+    days = (end - start).days + 1
+    for _ in range(count):
+        income = rng.random() < income_ratio
+        if income:
+            item, cents = rng.choice(INCOME_ITEMS), rng.lognormvariate(10.5, 0.8)
+        else:
+            item, cents = rng.choice(EXPENSE_ITEMS), rng.lognormvariate(7.0, 1.2)
+        yield Record(
+            user_id=user_id,
+            type="Income" if income else "Expense",
+            date=start + timedelta(days=rng.randrange(days)),
+            item=item,
+            volume=rng.choice(VOLUMES),
+            cost=Decimal(min(int(cents), 99_999_999)) / CENTS_PER_UNIT,
+            category_id=rng.choice(category_ids) if category_ids and rng.random() >= 0.125 else None,
+        )
+
+
+def seed_records(
+    users=1,
+    records=1000,
+    categories=10,
+    start=None,
+    end=None,
+    income_ratio=0.2,
+    seed=0,
+    username_prefix="seed",
+    password="seedpassword",
+    batch_size=None,
+):
+    """Create ``users`` users with ``records`` random records each, the same ones for the same ``seed``.
+
+    Records are generated lazily and written with ``bulk_create``, each batch
+    in its own transaction, so neither memory nor the write-ahead log grows
+    with the number of rows. Existing users with the generated names get the
+    records added to theirs. The rollups are rebuilt and the versions bumped
+    once per user at the end, because ``bulk_create`` sends no signals.
+    The dates run from ``start`` to ``end``, by default the year up to
+    ``DEFAULT_END``; pass ``end=date.today()`` for recent records instead.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    end = end or DEFAULT_END
+    start = start or end - timedelta(days=365)
+    result = SeedResult()
+    started = time.perf_counter()
+
+    for index in range(users):
+        user, created = User.objects.get_or_create(username=f"{username_prefix}{index + 1}")
+        if created:
+            user.set_password(password)
+            user.save(update_fields=["password"])
+        names = category_names(categories)
+        Category.objects.bulk_create([Category(user=user, name=name) for name in names], ignore_conflicts=True)
+        category_ids = list(Category.objects.filter(user=user, name__in=names).order_by("name").values_list("id", flat=True))
+
+        # Seeding per user keeps each user's data the same however many users are generated.
+        rng = random.Random(f"{seed}:{index}")
+        rows = random_records(user.pk, category_ids, records, start, end, income_ratio, rng)
+        batch = []
+        for record in rows:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                Record.objects.bulk_create(batch)
+                log_changes(batch, RecordChange.CREATE)
+                result.created += len(batch)
+                batch = []
+                # With DEBUG on Django keeps the last thousands of statements, and these INSERTs are large.
+                reset_queries()
+        if batch:
+            Record.objects.bulk_create(batch)
+            log_changes(batch, RecordChange.CREATE)
+            result.created += len(batch)
+
+        rebuild_rollups(user)
+        bump_version(RECORDS, user.pk)
+        bump_version(CATEGORIES, user.pk)
+        result.users += 1
+
+    result.elapsed = time.perf_counter() - started
+    return result
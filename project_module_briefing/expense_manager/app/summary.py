@@ -0,0 +1,289 @@
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Sum, When
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from app.currencies import base_currency, converted, exchange_rates
+from app.models import Category, CategoryRollup, ExchangeRate, Record, UserBalance, deleting_users
+from app.versions import ALL_USERS, RATES, SUMMARY, aget_version, bump_version, get_version
+
+UNCATEGORIZED = "Uncategorized"
+CENTS = Decimal("0.01")
+
+
+def signed_cost():
+    """Cost of a record as seen by the wallet: incomes add, expenses subtract."""
+    return Case(
+        When(type="Expense", then=-F("cost")),
+        default=F("cost"),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def to_cents(amount):
+    """A database sum as a ``Decimal`` in cents; SQLite sums decimals as floats, and conversions are floats."""
+    return Decimal(str(amount)).quantize(CENTS)
+
+
+def build_summary(rows, currency):
+    """Turn ``(category name, net)`` pairs in ``currency`` into the wallet total and sorted spending dict."""
+    total_amount = 0
+    category_spending = {}
+    for category_name, net in rows:
+        net = to_cents(net)
+        category_name = category_name or UNCATEGORIZED
+        category_spending[category_name] = category_spending.get(category_name, 0) + net
+        total_amount += net
+
+    return {
+        "total_amount": total_amount,
+        "category_spending": dict(sorted(category_spending.items())),
+        "currency": currency,
+    }
+
+
+def compute_summary(user):
+    """Compute the wallet total and net spending per category in a single grouped query.
+
+    Each record is converted to the user's base currency as it is summed,
+    through a join on the rates table.
+    """
+    currency = base_currency(user)
+    rows = (
+        Record.objects.filter(user=user)
+        .order_by()
+        .values("category__name")
+        .annotate(net=Sum(converted(signed_cost(), exchange_rates()[currency])))
+        .values_list("category__name", "net")
+    )
+    return build_summary(rows, currency)
+
+
+def summary_cache_key(user_id):
+    return f"summary:{user_id}:{get_version(SUMMARY, user_id)}:{get_version(RATES, ALL_USERS)}"
+
+
+async def asummary_cache_key(user_id):
+    return f"summary:{user_id}:{await aget_version(SUMMARY, user_id)}:{await aget_version(RATES, ALL_USERS)}"
+
+
+def invalidate_summary(*user_ids):
+    """Make the cached summaries of ``user_ids`` stale."""
+    bump_version(SUMMARY, *user_ids)
+
+
+def get_summary(user):
+    """Return the user's summary from the cache, reading it from the rollups on a miss."""
+    key = summary_cache_key(user.pk)
+    summary = cache.get(key)
+    if summary is None:
+        summary = read_summary(user)
+        cache.set(key, summary, settings.SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def converted_rollups(user, base_rate):
+    """``(category name, net)`` of the user's categories, their rollups in each currency converted and summed."""
+    return (
+        CategoryRollup.objects.filter(user=user, record_count__gt=0)
+        .values("category__name")
+        .annotate(net=Sum(converted(F("net"), base_rate)))
+        .values_list("category__name", "net")
+    )
+
+
+def read_summary(user):
+    """Read the summary from the rollup tables, building them first if they do not exist yet."""
+    balance = UserBalance.objects.filter(pk=user.pk).select_related("currency").first() or rebuild_rollups(user)
+    rows = converted_rollups(user, balance.currency.rate)
+    return build_summary(rows, balance.currency_id)
+
+
+async def aget_summary(user):
+    """Async version of ``get_summary`` for views running on the event loop."""
+    key = await asummary_cache_key(user.pk)
+    summary = await cache.aget(key)
+    if summary is None:
+        summary = await aread_summary(user)
+        await cache.aset(key, summary, settings.SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+async def aread_summary(user):
+    """Async version of ``read_summary``; only a first-time rollup build leaves the event loop."""
+    balance = await UserBalance.objects.filter(pk=user.pk).select_related("currency").afirst()
+    if balance is None:
+        balance = await sync_to_async(rebuild_rollups)(user)
+        balance.currency = await ExchangeRate.objects.aget(pk=balance.currency_id)
+
+    rows = converted_rollups(user, balance.currency.rate)
+    return build_summary([row async for row in rows], balance.currency_id)
+
+
+def rebuild_rollups(user):
+    """Recompute a user's balance and category rollups from their records."""
+    user_id = getattr(user, "pk", user)
+    rows = (
+        Record.objects.filter(user_id=user_id)
+        .order_by()
+        .values("category_id", "currency_id")
+        .annotate(net=Sum(signed_cost()), record_count=Count("id"))
+    )
+    rollups = [
+        CategoryRollup(
+            user_id=user_id,
+            category_id=row["category_id"],
+            currency_id=row["currency_id"],
+            net=to_cents(row["net"]),
+            record_count=row["record_count"],
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        CategoryRollup.objects.filter(user_id=user_id).delete()
+        CategoryRollup.objects.bulk_create(rollups)
+        balance, _ = UserBalance.objects.update_or_create(
+            user_id=user_id,
+            defaults={"record_count": sum(rollup.record_count for rollup in rollups)},
+        )
+        invalidate_summary(user_id)
+    return balance
+
+
+def reset_rollups(user):
+    """Zero a user's rollups, e.g. after all of their records were purged."""
+    user_id = getattr(user, "pk", user)
+    with transaction.atomic():
+        CategoryRollup.objects.filter(user_id=user_id).delete()
+        UserBalance.objects.update_or_create(
+            user_id=user_id,
+            defaults={"record_count": 0},
+        )
+        invalidate_summary(user_id)
+
+
+def set_base_currency(user, currency):
+    """Show the user's wallet and category totals in ``currency`` from now on."""
+    user_id = getattr(user, "pk", user)
+    with transaction.atomic():
+        if not UserBalance.objects.filter(pk=user_id).exists():
+            # Without rollups yet a bare balance row would read as a user with no records.
+            rebuild_rollups(user_id)
+        UserBalance.objects.filter(pk=user_id).update(currency_id=currency)
+        invalidate_summary(user_id)
+
+
+def verify_rollups(user):
+    """Return a list of differences between the stored rollups and the records themselves."""
+    stored = read_summary(user)
+    actual = compute_summary(user)
+    balance = UserBalance.objects.get(pk=user.pk)
+    record_count = Record.objects.filter(user=user).count()
+    problems = []
+
+    if balance.record_count != record_count:
+        problems.append(f"record count is {balance.record_count}, expected {record_count}")
+    if stored["total_amount"] != actual["total_amount"]:
+        problems.append(f"wallet total is {stored['total_amount']}, expected {actual['total_amount']}")
+
+    for name in sorted(stored["category_spending"].keys() | actual["category_spending"].keys()):
+        stored_net = stored["category_spending"].get(name)
+        actual_net = actual["category_spending"].get(name)
+        if stored_net != actual_net:
+            problems.append(f"category '{name}' is {stored_net}, expected {actual_net}")
+
+    return problems
+
+
+def apply_deltas(deltas):
+    """Apply ``(user_id, category_id, currency_id, net, record_count)`` changes to the rollups.
+
+    Each user's record count is updated once with the sum of their deltas. A user
+    without rollups yet is rebuilt from the records table instead, which
+    already reflects the change being applied.
+    """
+    counts = {}
+    for user_id, category_id, currency_id, net, record_count in deltas:
+        counts[user_id] = counts.get(user_id, 0) + record_count
+
+    rebuilt = set()
+    with transaction.atomic():
+        invalidate_summary(*counts)
+        for user_id, record_count in counts.items():
+            updated = UserBalance.objects.filter(pk=user_id).update(record_count=F("record_count") + record_count)
+            if not updated:
+                rebuild_rollups(user_id)
+                rebuilt.add(user_id)
+        for user_id, category_id, currency_id, net, record_count in deltas:
+            if user_id not in rebuilt:
+                apply_category_delta(user_id, category_id, currency_id, net, record_count)
+
+
+def apply_category_delta(user_id, category_id, currency_id, net, record_count):
+    """Add ``net`` and ``record_count`` to a single category rollup of one currency."""
+    updated = CategoryRollup.objects.filter(user_id=user_id, category_id=category_id, currency_id=currency_id).update(
+        net=F("net") + net,
+        record_count=F("record_count") + record_count,
+    )
+    if updated:
+        return
+    if category_id is not None and not Category.objects.filter(pk=category_id).exists():
+        # The category was deleted in the meantime, which left its records uncategorized.
+        return apply_category_delta(user_id, None, currency_id, net, record_count)
+    CategoryRollup.objects.create(
+        user_id=user_id, category_id=category_id, currency_id=currency_id, net=net, record_count=record_count
+    )
+
+
+@receiver(post_save, sender=Record)
+def update_rollups_on_save(sender, instance, created, raw=False, **kwargs):
+    """Move a record's contribution in the rollups from its previous state to its new one."""
+    if raw:
+        return
+    old_state = None if created else getattr(instance, "_rollup_state", None)
+    new_state = instance.rollup_state
+
+    if not created and old_state is None:
+        # Saved without a loaded snapshot, so the previous contribution is unknown.
+        rebuild_rollups(instance.user_id)
+    elif old_state != new_state:
+        deltas = []
+        if old_state is not None:
+            user_id, category_id, currency_id, net = old_state
+            deltas.append((user_id, category_id, currency_id, -net, -1))
+        user_id, category_id, currency_id, net = new_state
+        deltas.append((user_id, category_id, currency_id, net, 1))
+        apply_deltas(deltas)
+
+    instance._rollup_state = new_state
+
+
+@receiver(post_delete, sender=Record)
+def update_rollups_on_delete(sender, instance, origin=None, **kwargs):
+    """Remove a deleted record's contribution from the rollups."""
+    if deleting_users(origin):
+        # Updating them would rebuild the rollups the cascade has just deleted.
+        return
+    user_id, category_id, currency_id, net = getattr(instance, "_rollup_state", instance.rollup_state)
+    apply_deltas([(user_id, category_id, currency_id, -net, -1)])
+
+
+@receiver(pre_delete, sender=Category)
+def fold_category_rollup(sender, instance, origin=None, **kwargs):
+    """Records of a deleted category become uncategorized, so move its rollup there too."""
+    if deleting_users(origin):
+        return
+    for rollup in CategoryRollup.objects.filter(category=instance, record_count__gt=0):
+        apply_category_delta(rollup.user_id, None, rollup.currency_id, rollup.net, rollup.record_count)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_summary_on_category_change(sender, instance, created=False, raw=False, **kwargs):
+    """Renaming or deleting a category changes the names shown in its user's summary."""
+    if not created and not raw:
+        invalidate_summary(instance.user_id)
@@ -0,0 +1,10 @@
+from django import template
+from app.fragments import render_record_rows
+
+register = template.Library()
+
+
+@register.simple_tag
+def record_rows(records):
+    """Render the records table body from cached per-record rows."""
+    return render_record_rows(records)
@@ -0,0 +1,63 @@
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from app.models import Category, Record
+
+SUMMARY = "summary"
+RECORDS = "records"
+CATEGORIES = "categories"
+RATES = "rates"
+# Exchange rates are shared by every user, so they have a single version under this id.
+ALL_USERS = "all"
+
+
+def version_key(namespace, user_id):
+    return f"{namespace}:version:{user_id}"
+
+
+def get_version(namespace, user_id):
+    """Current version of a user's ``namespace``, stored in the cache.
+
+    A missing version starts from the clock rather than from 1, so a version
+    that was evicted can never come back and match an older cached value.
+    """
+    return cache.get_or_set(version_key(namespace, user_id), time.time_ns(), None)
+
+
+async def aget_version(namespace, user_id):
+    return await cache.aget_or_set(version_key(namespace, user_id), time.time_ns(), None)
+
+
+def bump_version(namespace, *user_ids):
+    """Bump the ``namespace`` version of ``user_ids`` so values cached under the old one are no longer read.
+
+    The version is bumped right away, for reads later in the same transaction,
+    and again on commit, in case another request cached the old data in between.
+    """
+    def bump():
+        for user_id in user_ids:
+            try:
+                cache.incr(version_key(namespace, user_id))
+            except ValueError:
+                cache.set(version_key(namespace, user_id), time.time_ns(), None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Record)
+@receiver(post_delete, sender=Record)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_records_version(sender, instance, **kwargs):
+    """Any change to a record or category is a new version of its user's records."""
+    bump_version(RECORDS, instance.user_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_categories_version(sender, instance, **kwargs):
+    """A created, renamed or deleted category changes its user's category list."""
+    bump_version(CATEGORIES, instance.user_id)
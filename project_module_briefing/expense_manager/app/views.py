@@ -4,12 +4,31 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.views import LoginView as AuthLoginView
 from django.contrib.auth import logout
 from app.models import Record, Category
-from app.forms import RecordForm
+from app.forms import BaseCurrencyForm, BulkRecordsForm, ImportRecordsForm, RecordForm, ReportFilterForm
+from app.reports import spending_report
+from app.importer import detect_format, import_records, iter_rows
+from app.exporter import EXPORT_FORMATS, aexport_rows, aiter_export, export_rows, iter_export
+from app.api import page_link, parse_fields, records_etag, serialize_record, serialize_summary, sparse_queryset
+from app.summary import aget_summary, get_summary, set_base_currency
+from app.categories import delete_orphan_categories
+from app.bulk import bulk_delete_records, bulk_update_records
+from app.recurring import end_rule, repeat_record
+from app.changes import achanges_since, alatest_sequence
+from app.purge import purge_user_records
+from app.pagination import DEFAULT_SORT, apaginate, paginate, parse_sort
+from app.search import search_records
+from app.instrumentation import request_log
 from django.urls import reverse_lazy, reverse
-from django.db.models import Sum, Q
-from django.http import Http404
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag, urlencode
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
+import csv
+import io
 
 # Create your views here.
 
@@ -53,62 +72,48 @@ class RecordsView(LoginRequiredMixin, CreateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        sort_param = self.request.GET.get('sort', 'id')  # Default to sorting by ID
-        
-        sort_reverse = sort_param.startswith('-')
-        if sort_reverse:
-            sort_field = sort_param[1:]
-        else:
-            sort_field = sort_param
+        sort_param = self.request.GET.get('sort', DEFAULT_SORT)
+        sort_field, sort_reverse = parse_sort(sort_param)
         
         context['sort_by'] = sort_field
         context['sort_reverse'] = sort_reverse
+        context['sort_param'] = f"-{sort_field}" if sort_reverse else sort_field
         
-        records = Record.objects.filter(user=self.request.user).order_by(sort_param)
-        context["object_list"] = records
-        
-        expenses = records.filter(type="Expense").aggregate(total=Sum("cost"))["total"] or 0
-        incomes = records.filter(type="Income").aggregate(total=Sum("cost"))["total"] or 0
-        context["total_amount"] = incomes - expenses
-        
-        category_spending = {}
-        for record in records:
-            category_name = record.category.name if record.category else "Uncategorized"
-            if category_name not in category_spending:
-                category_spending[category_name] = 0
-                
-            if record.type == "Expense":
-                category_spending[category_name] -= record.cost
-            else:
-                category_spending[category_name] += record.cost
-        
-        sorted_category_spending = dict(sorted(category_spending.items()))
-        context["category_spending"] = sorted_category_spending
+        query = self.request.GET.get('q', '').strip()
+        context['query'] = query
+        # Page links keep either the search or the sort order they were walking.
+        context['page_params'] = urlencode({'q': query} if query else {'sort': context['sort_param']})
+        if query:
+            page = search_records(
+                self.request.user,
+                query,
+                after=self.request.GET.get('after'),
+                before=self.request.GET.get('before'),
+            )
+        else:
+            records = Record.objects.filter(user=self.request.user).select_related("category")
+            page = paginate(
+                records,
+                context['sort_param'],
+                after=self.request.GET.get('after'),
+                before=self.request.GET.get('before'),
+            )
+        context["page"] = page
+        context["object_list"] = page.records
+        context["bulk_form"] = BulkRecordsForm(user=self.request.user)
+        summary = get_summary(self.request.user)
+        context.update(summary)
+        context["currency_form"] = BaseCurrencyForm(initial={"currency": summary["currency"]})
+        # New records are entered in the currency the wallet is shown in unless changed.
+        context["form"].initial.setdefault("currency", summary["currency"])
         
         return context
 
     def form_valid(self, form):
         """Handle form submission for record creation."""
-        new_category_name = self.request.POST.get('new_category')
+        new_category_name = form.cleaned_data.get('new_category')
         
         if new_category_name:
-            words = new_category_name.split()
-            capitalized_words = []
-            
-            for word in words:
-                if not word:
-                    continue
-                elif word.isupper():
-                    capitalized_words.append(word)
-                    print(f"Keeping uppercase word: {word}")
-                elif word[0].islower():
-                    capitalized_words.append(word[0].upper() + word[1:])
-                else:
-                    capitalized_words.append(word)
-                    
-            new_category_name = ' '.join(capitalized_words)
-            print(f"Final category name: {new_category_name}")
-            
             category, created = Category.objects.get_or_create(
                 user=self.request.user,
                 name=new_category_name
@@ -117,9 +122,133 @@ class RecordsView(LoginRequiredMixin, CreateView):
             form.instance.category = category
         
         form.instance.user = self.request.user
+        if form.cleaned_data.get('repeat'):
+            repeat_record(form.instance, form.cleaned_data['repeat'])
         
         return super().form_valid(form)
 
+class ReportsView(LoginRequiredMixin, TemplateView):
+    """Spending per category over time, for a date range."""
+    template_name = "app/reports.html"
+    login_url = reverse_lazy("login")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = ReportFilterForm(self.request.GET or None)
+        context["form"] = form
+        if form.is_bound and not form.is_valid():
+            return context
+        filters = form.cleaned_data if form.is_bound else {"period": "month", "start": None, "end": None}
+        context["report"] = spending_report(self.request.user, filters["period"], filters["start"], filters["end"])
+        return context
+
+class AsyncLoginRequiredMixin:
+    """LoginRequiredMixin for views with async handlers, which must not load the user synchronously."""
+    login_url = reverse_lazy("login")
+    raise_exception = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            if self.raise_exception:
+                raise PermissionDenied
+            return redirect_to_login(request.get_full_path(), self.login_url)
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+class ExportRecordsView(AsyncLoginRequiredMixin, View):
+    """View to download all records of the current user as CSV or NDJSON."""
+
+    async def get(self, request):
+        """Stream the records in the table's sort order without loading them all in memory."""
+        export_format = request.GET.get("format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            raise Http404("Unknown export format")
+        content_type, extension = EXPORT_FORMATS[export_format]
+
+        sort_field, sort_reverse = parse_sort(request.GET.get("sort", DEFAULT_SORT))
+        records = Record.objects.filter(user=request.user)
+        if isinstance(request, ASGIRequest):
+            content = aiter_export(aexport_rows(records, sort_field, sort_reverse), export_format)
+        else:
+            # A WSGI server would collect an async iterator into a list before sending any of it.
+            content = iter_export(export_rows(records, sort_field, sort_reverse), export_format)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="records.{extension}"'
+        return response
+
+class RecordsApiView(AsyncLoginRequiredMixin, View):
+    """JSON listing of the current user's records with sparse fieldsets and keyset pagination."""
+    raise_exception = True
+
+    async def get(self, request):
+        """Return one page of records, or 304 Not Modified when the client's ETag is still current."""
+        etag = await records_etag(request.user, request.GET.urlencode())
+        not_modified = get_conditional_response(request, etag=quote_etag(etag))
+        if not_modified is not None:
+            return not_modified
+
+        try:
+            fields = parse_fields(request.GET.get("fields"))
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=400)
+
+        sort_field, sort_reverse = parse_sort(request.GET.get("sort", DEFAULT_SORT))
+        records = sparse_queryset(Record.objects.filter(user=request.user), fields, sort_field)
+        page = await apaginate(
+            records,
+            f"-{sort_field}" if sort_reverse else sort_field,
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
+        )
+        response = JsonResponse({
+            "results": [serialize_record(record, fields) for record in page.records],
+            "next": page_link(request, "after", page.next_cursor),
+            "previous": page_link(request, "before", page.previous_cursor),
+        })
+        response["ETag"] = quote_etag(etag)
+        return response
+
+class RecordChangesApiView(AsyncLoginRequiredMixin, View):
+    """JSON journal of the changes to the current user's records after a ``since`` sequence number."""
+    raise_exception = True
+
+    async def get(self, request):
+        """Return the changes after ``since``, just the latest sequence without it, or 410 Gone once compacted."""
+        since = request.GET.get("since")
+        if since is None:
+            return JsonResponse({"changes": [], "sequence": await alatest_sequence(request.user), "next": None})
+        try:
+            since = int(since)
+        except ValueError:
+            return JsonResponse({"error": "since must be a sequence number"}, status=400)
+
+        page = await achanges_since(request.user, since)
+        if page is None:
+            return JsonResponse({"error": "Changes this old were compacted; download the records again."}, status=410)
+        return JsonResponse({
+            "changes": page.changes,
+            "sequence": page.sequence,
+            "next": page_link(request, "since", page.sequence) if page.has_more else None,
+        })
+
+class SummaryApiView(AsyncLoginRequiredMixin, View):
+    """JSON wallet total and spending by category of the current user."""
+    raise_exception = True
+
+    async def get(self, request):
+        return JsonResponse(serialize_summary(await aget_summary(request.user)))
+
+class RequestStatsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Staff-only JSON of the query counts and latency percentiles of the recent requests per URL name."""
+    login_url = reverse_lazy("login")
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        return JsonResponse(request_log.summary())
+
 class EditRecordView(LoginRequiredMixin, UpdateView):
     model = Record
     form_class = RecordForm
@@ -134,53 +263,28 @@ class EditRecordView(LoginRequiredMixin, UpdateView):
 
     def get_queryset(self):
         """Only allow users to edit their own records."""
-        return Record.objects.filter(user=self.request.user)
+        return Record.objects.filter(user=self.request.user).select_related("recurring_rule")
 
     def form_valid(self, form):
         """Handle form submission for record editing."""
-        current_record = Record.objects.get(id=self.object.id)
-        
-        old_category_id = current_record.category_id
-        print(f"Edit view - old category ID: {old_category_id}")
-        
-        new_category_id = form.cleaned_data.get('category').id if form.cleaned_data.get('category') else None
-        print(f"Edit view - form category ID: {new_category_id}")
-        
-        new_category_name = self.request.POST.get('new_category')
+        new_category_name = form.cleaned_data.get('new_category')
         if new_category_name:
-            words = new_category_name.split()
-            capitalized_words = []
-            
-            for word in words:
-                if not word:
-                    continue
-                elif word.isupper():
-                    capitalized_words.append(word)
-                elif word[0].islower():
-                    capitalized_words.append(word[0].upper() + word[1:])
-                else:
-                    capitalized_words.append(word)
-                    
-            new_category_name = ' '.join(capitalized_words)
-            
             category, created = Category.objects.get_or_create(
                 user=self.request.user,
                 name=new_category_name
             )
             
             form.instance.category = category
-            new_category_id = category.id  # Update new_category_id
         
-        response = super().form_valid(form)
-        
-        if old_category_id and old_category_id != new_category_id:
-            remaining = Record.objects.filter(category_id=old_category_id).count()
-            print(f"Edit view - records using old category {old_category_id}: {remaining}")
-            
-            if remaining == 0:
-                print(f"Edit view - deleting orphaned category {old_category_id}")
-                Category.objects.filter(id=old_category_id).delete()
+        # Changing the repeat of a recurring record ends its rule there; a new frequency starts another from it.
+        repeat, rule = form.cleaned_data.get('repeat'), form.instance.recurring_rule
+        if rule and repeat != rule.frequency:
+            end_rule(rule, form.instance.occurrence_date)
+        if repeat and (rule is None or repeat != rule.frequency):
+            repeat_record(form.instance, repeat)
         
+        response = super().form_valid(form)
+        delete_orphan_categories(self.request.user)
         return response
 
 class DeleteRecordView(LoginRequiredMixin, DeleteView):
@@ -193,27 +297,10 @@ class DeleteRecordView(LoginRequiredMixin, DeleteView):
         """Only allow users to delete their own records."""
         return Record.objects.filter(user=self.request.user)
 
-    def delete(self, request, *args, **kwargs):
-        record = self.get_object()
-        category_id = None
-        user_id = None
-        
-        if record.category:
-            category_id = record.category.id
-            user_id = record.user.id
-            print(f"Will check category {category_id} after deletion")
-        
-        response = super().delete(request, *args, **kwargs)
-        
-        if category_id and user_id:
-            remaining_count = Record.objects.filter(category_id=category_id).count()
-            print(f"Found {remaining_count} records still using category {category_id}")
-            
-            if remaining_count == 0:
-                print(f"Deleting category {category_id}")
-                Category.objects.filter(id=category_id).delete()
-                print(f"Category {category_id} deleted")
-        
+    def form_valid(self, form):
+        """Delete the record, then any category it leaves unused."""
+        response = super().form_valid(form)
+        delete_orphan_categories(self.request.user)
         return response
 
 class PurgeRecordsView(LoginRequiredMixin, View):
@@ -228,10 +315,65 @@ class PurgeRecordsView(LoginRequiredMixin, View):
     
     def post(self, request):
         """Handle POST requests: delete all records."""
-        user_category_ids = Category.objects.filter(user=request.user).values_list('id', flat=True)
-        records = Record.objects.filter(user=request.user)
-        count = records.count()
-        records.delete()
-        deleted_cats = Category.objects.filter(user=request.user).delete()[0]
+        count, deleted_cats = purge_user_records(request.user)
         messages.success(request, f"Successfully deleted all {count} records and {deleted_cats} categories.")
-        return redirect('records')
\ No newline at end of file
+        return redirect('records')
+
+class BaseCurrencyView(LoginRequiredMixin, View):
+    """View to choose the currency the wallet and category totals are converted to."""
+    login_url = reverse_lazy("login")
+
+    def post(self, request):
+        """Handle POST requests: set the current user's base currency."""
+        form = BaseCurrencyForm(request.POST)
+        if form.is_valid():
+            set_base_currency(request.user, form.cleaned_data['currency'])
+        else:
+            messages.error(request, " ".join(error for errors in form.errors.values() for error in errors))
+        return redirect('records')
+
+class BulkRecordsView(LoginRequiredMixin, View):
+    """View to change the type or category of, or delete, the selected records in one go."""
+    login_url = reverse_lazy("login")
+
+    def post(self, request):
+        """Handle POST requests: apply the action to the selected records of the current user."""
+        form = BulkRecordsForm(request.POST, user=request.user)
+        if not form.is_valid():
+            messages.error(request, " ".join(error for errors in form.errors.values() for error in errors))
+            return redirect('records')
+
+        records = form.cleaned_data['records']
+        if form.cleaned_data['action'] == 'delete':
+            count = bulk_delete_records(request.user, records)
+            messages.success(request, f"Deleted {count} records.")
+        else:
+            count = bulk_update_records(request.user, records, **form.changes())
+            messages.success(request, f"Updated {count} records.")
+        return redirect('records')
+
+class ImportRecordsView(LoginRequiredMixin, FormView):
+    """View to bulk import records from a CSV or OFX file."""
+    template_name = "app/import.html"
+    form_class = ImportRecordsForm
+    success_url = reverse_lazy("records")
+    login_url = reverse_lazy("login")
+
+    def form_valid(self, form):
+        """Stream the uploaded file into the records table."""
+        upload = form.cleaned_data["file"]
+        file_format = form.cleaned_data["format"] or detect_format(upload.name)
+        stream = io.TextIOWrapper(upload, encoding="utf-8-sig", errors="replace", newline="")
+        try:
+            result = import_records(self.request.user, iter_rows(stream, file_format))
+        except (ValueError, csv.Error) as error:
+            form.add_error("file", str(error))
+            return self.form_invalid(form)
+
+        messages.success(
+            self.request,
+            f"Imported {result.created} records in {result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s).",
+        )
+        if result.skipped:
+            messages.warning(self.request, f"Skipped {result.skipped} invalid rows. " + " ".join(result.errors))
+        return super().form_valid(form)
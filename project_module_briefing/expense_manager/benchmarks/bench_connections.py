@@ -0,0 +1,83 @@
+"""Per-request cost of opening a database connection, against reusing one or borrowing it from a pool.
+
+Uses the PostgreSQL database configured by the POSTGRES_* environment variables
+(for example the compose.yaml one, with POSTGRES_HOST=localhost), or a throwaway
+SQLite database when POSTGRES_HOST is not set. Run from the project root with
+``python -m benchmarks.bench_connections [--requests N]``.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+from django.conf import settings  # noqa: E402
+
+from config.database import database_settings, pool_options  # noqa: E402
+
+
+def configure_databases():
+    """One database alias per connection strategy, all pointing at the same database."""
+    # Without the pool, which gets an alias of its own below.
+    environ = {**os.environ, "DB_POOL": "false"}
+    default = database_settings(environ, sqlite_path=os.path.join(tempfile.mkdtemp(prefix="expense_bench_"), "bench.sqlite3"))
+    options = {key: value for key, value in default.get("OPTIONS", {}).items() if key != "pool"}
+    databases = {
+        "default": default,
+        "fresh": {**default, "CONN_MAX_AGE": 0, "OPTIONS": options},
+        "persistent": {**default, "CONN_MAX_AGE": 600, "OPTIONS": options},
+    }
+    if default["ENGINE"].endswith("postgresql"):
+        try:
+            databases["pooled"] = {**default, "CONN_MAX_AGE": 0, "OPTIONS": {**options, "pool": pool_options(os.environ)}}
+        except ImportError:
+            print("psycopg_pool is not installed, skipping the pooled connections")
+    settings.DATABASES = databases
+    return default["ENGINE"].rsplit(".", 1)[-1]
+
+
+def run_requests(alias, count, connects):
+    """Run ``count`` request cycles that each make one query on ``alias``, in microseconds per request."""
+    from django.core import signals
+    from django.db import connections
+
+    connects[alias] = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        signals.request_started.send(sender=None)
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1")
+        signals.request_finished.send(sender=None)
+    return (time.perf_counter() - start) / count * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    vendor = configure_databases()
+    django.setup()
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    connects = {}
+
+    def count_connect(sender, connection, **kwargs):
+        connects[connection.alias] = connects.get(connection.alias, 0) + 1
+
+    connection_created.connect(count_connect)
+    print(f"{vendor}, {args.requests} requests")
+    print(f"{'connections':>12} | {'us/request':>10} | {'opened':>8}")
+    for alias in [alias for alias in settings.DATABASES if alias != "default"]:
+        per_request = run_requests(alias, args.requests, connects)
+        # Django reports every checkout from the pool as a new connection; the pool knows how many it opened.
+        opened = connections[alias].pool.get_stats()["connections_num"] if alias == "pooled" else connects[alias]
+        print(f"{alias:>12} | {per_request:>10.1f} | {opened:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Import throughput and memory of the CSV importer as the file grows.
+
+Run from the project root with ``python -m benchmarks.bench_import``.
+"""
+import csv
+import os
+import resource
+import tempfile
+
+from benchmarks.setup import make_user, setup_django
+
+setup_django()
+
+from app.importer import import_records, iter_rows  # noqa: E402
+from app.models import Record  # noqa: E402
+
+
+def write_csv(path, count, categories=25):
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(("type", "date", "item", "category", "volume", "cost"))
+        for i in range(count):
+            writer.writerow((
+                "income" if i % 4 == 0 else "expense",
+                f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                f"item {i % 1000}",
+                f"category {i % categories}" if i % 7 else "",
+                "1",
+                f"{i % 500}.99",
+            ))
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    directory = tempfile.mkdtemp(prefix="expense_import_")
+    print(f"{'rows':>9} | {'seconds':>8} {'rows/s':>9} | {'peak rss MB':>11}")
+    for index, size in enumerate((10_000, 100_000, 1_000_000)):
+        user = make_user(f"import{index}")
+        path = os.path.join(directory, f"records_{size}.csv")
+        write_csv(path, size)
+
+        with open(path, newline="") as stream:
+            result = import_records(user, iter_rows(stream, "csv"))
+        assert result.created == size and Record.objects.filter(user=user).count() == size
+        os.remove(path)
+
+        print(f"{size:>9} | {result.elapsed:>8.2f} {result.rows_per_second:>9.0f} | {peak_rss_mb():>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
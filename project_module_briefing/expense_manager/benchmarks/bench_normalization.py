@@ -0,0 +1,79 @@
+"""CPU time spent capitalizing item and category names per record save, before and after.
+
+Run from the project root with ``python -m benchmarks.bench_normalization``.
+"""
+import io
+import time
+from contextlib import redirect_stdout
+
+from app.normalization import capitalize_words
+
+ITEMS = ["coffee beans", "USB hub", "monthly rent", "iPhone case", "gas bill", "Netflix", "train to LX", "groceries"]
+CATEGORIES = ["food", "office IT", "home", "tech", "utilities", "fun", "travel", "food"]
+
+
+def legacy_capitalize(text, verbose=False):
+    """The loop that used to be copied into the models, the form and the views."""
+    words = text.split()
+    capitalized_words = []
+    for word in words:
+        if verbose:
+            print(f"Category save - word: '{word}', isupper: {word.isupper()}, islower: {word.islower()}")
+        if not word:
+            continue
+        elif word.upper() == word:
+            capitalized_words.append(word)
+            if verbose:
+                print(f"Preserving uppercase word: {word}")
+        elif word[0].islower():
+            capitalized_words.append(word[0].upper() + word[1:])
+            if verbose:
+                print(f"Capitalizing: {word} -> {word[0].upper() + word[1:]}")
+        else:
+            capitalized_words.append(word)
+            if verbose:
+                print(f"Keeping as is: {word}")
+    result = ' '.join(capitalized_words)
+    if verbose:
+        print(f"Final category name: {result}")
+    return result
+
+
+def legacy_save(item, category):
+    """A record created with a new category: form clean, view, Category.save and Record.save."""
+    item, category = legacy_capitalize(item), legacy_capitalize(category)
+    category = legacy_capitalize(category)
+    category = legacy_capitalize(category, verbose=True)
+    return legacy_capitalize(item), category
+
+
+def current_save(item, category):
+    """The same save now: the form normalizes once, the model calls hit the memo."""
+    item, category = capitalize_words(item), capitalize_words(category)
+    return capitalize_words(item), capitalize_words(category)
+
+
+def per_save_microseconds(save, repeat=20_000):
+    pairs = list(zip(ITEMS, CATEGORIES))
+    # Console output is what the server's stdout would cost; keep it off the terminal.
+    with redirect_stdout(io.StringIO()):
+        start = time.process_time()
+        for i in range(repeat):
+            save(*pairs[i % len(pairs)])
+        elapsed = time.process_time() - start
+    return elapsed / repeat * 1_000_000
+
+
+def main():
+    with redirect_stdout(io.StringIO()):
+        for item, category in zip(ITEMS, CATEGORIES):
+            assert legacy_save(item, category) == current_save(item, category)
+    legacy_us = per_save_microseconds(legacy_save)
+    current_us = per_save_microseconds(current_save)
+    print(f"{'path':>8} | {'CPU us per save':>15}")
+    print(f"{'legacy':>8} | {legacy_us:>15.2f}")
+    print(f"{'current':>8} | {current_us:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
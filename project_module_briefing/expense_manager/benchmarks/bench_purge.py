@@ -0,0 +1,49 @@
+"""Compare purging all of a user's records through the ORM and through the set-based path.
+
+Run from the project root with ``python -m benchmarks.bench_purge``.
+"""
+import time
+
+from benchmarks.setup import count_queries, make_user, seed_records, setup_django
+
+setup_django()
+
+from app.categories import delete_orphan_categories  # noqa: E402
+from app.models import Record  # noqa: E402
+from app.purge import purge_user_records  # noqa: E402
+from app.summary import rebuild_rollups, reset_rollups  # noqa: E402
+
+
+def legacy_purge(user):
+    """The purge as PurgeRecordsView used to do it: a collected delete that signals every row."""
+    records = Record.objects.filter(user=user)
+    count = records.count()
+    records.delete()
+    return count, delete_orphan_categories(user)
+
+
+def timed(purge, user):
+    with count_queries({}) as queries:
+        start = time.perf_counter()
+        counts = purge(user)
+        elapsed = (time.perf_counter() - start) * 1000
+    return counts, elapsed, queries["queries"]
+
+
+def main():
+    print(f"{'records':>8} | {'legacy ms':>10} {'queries':>8} | {'set-based ms':>12} {'queries':>8}")
+    for index, size in enumerate((1_000, 10_000, 50_000)):
+        legacy_user, fast_user = make_user(f"legacy{index}"), make_user(f"fast{index}")
+        for user in (legacy_user, fast_user):
+            seed_records(user, size)
+            rebuild_rollups(user)
+
+        legacy_counts, legacy_ms, legacy_queries = timed(legacy_purge, legacy_user)
+        reset_rollups(legacy_user)
+        fast_counts, fast_ms, fast_queries = timed(purge_user_records, fast_user)
+        assert legacy_counts == fast_counts
+        print(f"{size:>8} | {legacy_ms:>10.1f} {legacy_queries:>8} | {fast_ms:>12.1f} {fast_queries:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Throughput and memory of materialize_recurring as the number of due rules grows.
+
+Run from the project root with ``python -m benchmarks.bench_recurring [--rules N]``.
+"""
+import argparse
+import resource
+from datetime import date
+from decimal import Decimal
+
+from benchmarks.setup import make_user, setup_django
+
+setup_django()
+
+from app.models import Category, Record, RecurringRule  # noqa: E402
+from app.recurring import materialize_recurring  # noqa: E402
+
+USERS = 100
+FREQUENCIES = ("weekly", "monthly", "monthly", "monthly", "yearly")
+
+
+def seed_rules(count, batch_size=10_000):
+    """Create ``count`` rules spread over ``USERS`` users, each one due at least once in January 2025."""
+    users = [make_user(f"recurring{index}") for index in range(USERS)]
+    categories = Category.objects.bulk_create(Category(user=user, name="Bills") for user in users)
+    batch = []
+    for i in range(count):
+        start = date(2025, 1, i % 28 + 1)
+        batch.append(RecurringRule(
+            user=users[i % USERS],
+            frequency=FREQUENCIES[i % len(FREQUENCIES)],
+            start_date=start,
+            next_date=start,
+            type="Income" if i % 10 == 0 else "Expense",
+            item=f"Bill {i % 50}",
+            category=categories[i % USERS] if i % 3 else None,
+            volume="1",
+            cost=Decimal(i % 900) + Decimal("0.99"),
+        ))
+        if len(batch) >= batch_size:
+            RecurringRule.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        RecurringRule.objects.bulk_create(batch)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    seed_rules(args.rules)
+    print(f"{args.rules} rules, peak rss MB after seeding: {peak_rss_mb():.1f}")
+    print(f"{'run':>8} | {'created':>9} {'seconds':>8} {'rows/s':>9} | {'peak rss MB':>11}")
+    # The second run of the same day is the idempotent re-run: nothing is due any more.
+    for label, until in (("january", date(2025, 1, 31)), ("re-run", date(2025, 1, 31)), ("march", date(2025, 3, 31))):
+        result = materialize_recurring(today=until)
+        print(f"{label:>8} | {result.created:>9} {result.elapsed:>8.2f} {result.rows_per_second:>9.0f} | {peak_rss_mb():>11.1f}")
+    print(f"{Record.objects.count()} records")
+
+
+if __name__ == "__main__":
+    main()
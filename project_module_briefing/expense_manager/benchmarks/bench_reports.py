@@ -0,0 +1,49 @@
+"""Time the spending reports over growing date ranges against Django's own date truncation.
+
+Run from the project root with ``python -m benchmarks.bench_reports [--records N]``.
+"""
+import argparse
+from datetime import date
+
+from benchmarks.setup import best_of, make_user, seed_records, setup_django
+
+setup_django()
+
+from app import reports  # noqa: E402
+from django.db.models.functions import TruncMonth  # noqa: E402
+
+RANGES = {
+    "month": (date(2024, 3, 1), date(2024, 3, 31)),
+    "quarter": (date(2024, 1, 1), date(2024, 3, 31)),
+    "year": (None, None),
+}
+
+
+def legacy_report(user, start, end):
+    """The same report grouped with TruncMonth, which SQLite evaluates through a Python function per row."""
+    periods = reports.PERIODS
+    reports.PERIODS = {"month": TruncMonth}
+    try:
+        return reports.spending_report(user, "month", start, end)
+    finally:
+        reports.PERIODS = periods
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    user = make_user()
+    seed_records(user, args.records)
+    print(f"{args.records} records")
+    print(f"{'range':>8} | {'TruncMonth ms':>13} | {'native ms':>10}")
+    for label, (start, end) in RANGES.items():
+        assert legacy_report(user, start, end).cells == reports.spending_report(user, "month", start, end).cells
+        legacy_ms = best_of(lambda: legacy_report(user, start, end), repeat=3)
+        native_ms = best_of(lambda: reports.spending_report(user, "month", start, end), repeat=3)
+        print(f"{label:>8} | {legacy_ms:>13.1f} | {native_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Compare searching records with ``icontains`` scans and with the full-text index.
+
+Run from the project root with ``python -m benchmarks.bench_search [--records N]``.
+"""
+import argparse
+
+from benchmarks.setup import best_of, make_user, seed_records, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+from app.models import Record  # noqa: E402
+from app.search import search_records  # noqa: E402
+
+QUERIES = ("12345", "item 12345", "category 3")
+
+
+def legacy_search(user, query):
+    """A substring search over the same fields, first page by entry order."""
+    records = Record.objects.filter(user=user)
+    for term in query.split():
+        records = records.filter(Q(item__icontains=term) | Q(volume__icontains=term) | Q(category__name__icontains=term))
+    return list(records.select_related("category").order_by("id")[:settings.RECORDS_PAGE_SIZE])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=200_000)
+    args = parser.parse_args()
+
+    user = make_user()
+    seed_records(user, args.records)
+    print(f"{args.records} records")
+    print(f"{'query':>12} | {'icontains ms':>12} | {'full-text ms':>12}")
+    for query in QUERIES:
+        legacy_ms = best_of(lambda: legacy_search(user, query), repeat=3)
+        search_ms = best_of(lambda: search_records(user, query), repeat=3)
+        print(f"{query:>12} | {legacy_ms:>12.1f} | {search_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
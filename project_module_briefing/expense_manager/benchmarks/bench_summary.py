@@ -0,0 +1,54 @@
+"""Compare the RecordsView summary panel before and after the grouped aggregation.
+
+Run from the project root with ``python -m benchmarks.bench_summary``.
+"""
+from benchmarks.setup import best_of, count_queries, make_user, seed_records, setup_django
+
+setup_django()
+
+from django.db.models import Sum  # noqa: E402
+
+from app.models import Record  # noqa: E402
+from app.summary import CENTS, compute_summary  # noqa: E402
+
+
+def legacy_summary(user):
+    """The summary as RecordsView used to compute it: two aggregates plus a Python loop."""
+    records = Record.objects.filter(user=user)
+    expenses = records.filter(type="Expense").aggregate(total=Sum("cost"))["total"] or 0
+    incomes = records.filter(type="Income").aggregate(total=Sum("cost"))["total"] or 0
+    category_spending = {}
+    for record in records:
+        category_name = record.category.name if record.category else "Uncategorized"
+        category_spending.setdefault(category_name, 0)
+        if record.type == "Expense":
+            category_spending[category_name] -= record.cost
+        else:
+            category_spending[category_name] += record.cost
+    return {"total_amount": incomes - expenses, "category_spending": dict(sorted(category_spending.items()))}
+
+
+def main():
+    print(f"{'records':>8} | {'legacy ms':>10} {'queries':>8} | {'grouped ms':>10} {'queries':>8}")
+    for index, size in enumerate((100, 1_000, 10_000, 50_000)):
+        user = make_user(f"bench{index}")
+        seed_records(user, size)
+
+        legacy, grouped = legacy_summary(user), compute_summary(user)
+        assert legacy["category_spending"] == grouped["category_spending"]
+        assert legacy["total_amount"].quantize(CENTS) == grouped["total_amount"]
+        with count_queries({}) as legacy_queries:
+            legacy_summary(user)
+        with count_queries({}) as grouped_queries:
+            compute_summary(user)
+
+        legacy_ms = best_of(lambda: legacy_summary(user), repeat=1)
+        grouped_ms = best_of(lambda: compute_summary(user))
+        print(
+            f"{size:>8} | {legacy_ms:>10.1f} {legacy_queries['queries']:>8} | "
+            f"{grouped_ms:>10.1f} {grouped_queries['queries']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare rendering the records table row by row with rendering it from cached row fragments.
+
+Run from the project root with ``python -m benchmarks.bench_templates [--records N]``.
+"""
+import argparse
+
+from benchmarks.setup import best_of, make_user, seed_records, setup_django
+
+setup_django()
+
+from django.core.cache import cache  # noqa: E402
+from django.template import engines  # noqa: E402
+
+from app.models import Record  # noqa: E402
+
+# The table body as records.html rendered it, resolving both action URLs and styling every cell inline.
+LEGACY_ROWS = """
+{% for record in object_list %}
+<tr>
+    <td style="border: 1px solid black; text-align: center;">{{ record.type }}</td>
+    <td style="border: 1px solid black; text-align: center;">{{ record.date }}</td>
+    <td style="border: 1px solid black; text-align: center;">{{ record.item }}</td>
+    <td style="border: 1px solid black; text-align: center;">{{ record.category }}</td>
+    <td style="border: 1px solid black; text-align: center;">{{ record.volume }}</td>
+    <td style="border: 1px solid black; text-align: center;">{{ record.cost }} €</td>
+    <td style="border: 1px solid black; text-align: center;">
+        <a href="{% url 'edit_record' record.id %}">✏️</a>
+        <a href="{% url 'delete_record' record.id %}">❌</a>
+    </td>
+</tr>
+{% endfor %}
+"""
+FRAGMENT_ROWS = "{% load records %}{% record_rows object_list %}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=10_000)
+    args = parser.parse_args()
+
+    user = make_user()
+    seed_records(user, args.records)
+    records = list(Record.objects.filter(user=user).select_related("category"))
+    context = {"object_list": records}
+    engine = engines["django"]
+    fragments = engine.from_string(FRAGMENT_ROWS)
+
+    def cold():
+        cache.clear()
+        fragments.render(context)
+
+    legacy_ms = best_of(lambda: engine.from_string(LEGACY_ROWS).render(context), repeat=3)
+    cold_ms = best_of(cold, repeat=3)
+    warm_ms = best_of(lambda: fragments.render(context))
+    legacy_size = len(engine.from_string(LEGACY_ROWS).render(context))
+    fragment_size = len(fragments.render(context))
+
+    print(f"{args.records} rows")
+    print(f"{'rendering':>16} | {'ms':>8} | {'speedup':>7} | {'kB':>6}")
+    print(f"{'per-row legacy':>16} | {legacy_ms:>8.1f} | {1:>6.1f}x | {legacy_size / 1024:>6.0f}")
+    print(f"{'fragments, cold':>16} | {cold_ms:>8.1f} | {legacy_ms / cold_ms:>6.1f}x | {fragment_size / 1024:>6.0f}")
+    print(f"{'fragments, warm':>16} | {warm_ms:>8.1f} | {legacy_ms / warm_ms:>6.1f}x | {fragment_size / 1024:>6.0f}")
+
+
+if __name__ == "__main__":
+    main()
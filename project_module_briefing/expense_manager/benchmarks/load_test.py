@@ -0,0 +1,97 @@
+"""Requests/second of the async API views against synchronous twins, under one uvicorn worker.
+
+Run from the project root with ``python -m benchmarks.load_test [--concurrency N] [--seconds S]``.
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+
+from benchmarks.setup import make_user, seed_records, setup_django
+
+setup_django()
+
+import uvicorn  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.core.asgi import get_asgi_application  # noqa: E402
+from django.test import Client  # noqa: E402
+
+from app.summary import rebuild_rollups  # noqa: E402
+
+ENDPOINTS = [
+    ("records", "/sync/records/?fields=date,item,cost", "/async/records/?fields=date,item,cost"),
+    ("summary", "/sync/summary/", "/async/summary/"),
+]
+
+
+def start_server():
+    """Serve the project on a free port from a background thread and return the port."""
+    settings.ROOT_URLCONF = "benchmarks.load_urls"
+    settings.ALLOWED_HOSTS = ["*"]
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(get_asgi_application(), port=port, log_level="warning", lifespan="off"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return port
+
+
+async def fetch(port, path, cookie):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: localhost\r\nCookie: sessionid={cookie}\r\nConnection: close\r\n\r\n".encode()
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    if not response.startswith(b"HTTP/1.1 200"):
+        raise RuntimeError(response[:200])
+
+
+async def load(port, path, cookie, concurrency, seconds):
+    """Keep ``concurrency`` clients requesting ``path`` for ``seconds``; return requests/s and latencies."""
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await fetch(port, path, cookie)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return len(latencies) / seconds, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--records", type=int, default=10_000)
+    args = parser.parse_args()
+
+    user = make_user("load")
+    seed_records(user, args.records)
+    rebuild_rollups(user)
+    client = Client()
+    client.force_login(user)
+    cookie = client.cookies["sessionid"].value
+    port = start_server()
+
+    print(f"{args.concurrency} concurrent clients, {args.seconds:g}s per run")
+    print(f"{'endpoint':>8} | {'sync req/s':>10} {'p95 ms':>8} | {'async req/s':>11} {'p95 ms':>8}")
+    for name, sync_path, async_path in ENDPOINTS:
+        results = []
+        for path in (sync_path, async_path):
+            rate, latencies = asyncio.run(load(port, path, cookie, args.concurrency, args.seconds))
+            results.append((rate, statistics.quantiles(latencies, n=20)[-1]))
+        (sync_rate, sync_p95), (async_rate, async_p95) = results
+        print(f"{name:>8} | {sync_rate:>10.1f} {sync_p95:>8.1f} | {async_rate:>11.1f} {async_p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""URLs for the load test: the app's async API views next to synchronous twins doing the same work."""
+from django.http import JsonResponse
+from django.urls import path
+
+from app import views
+from app.api import serialize_record, serialize_summary, sparse_queryset, parse_fields
+from app.models import Record
+from app.pagination import paginate
+from app.summary import get_summary
+
+
+def sync_records(request):
+    fields = parse_fields(request.GET.get("fields"))
+    page = paginate(sparse_queryset(Record.objects.filter(user=request.user), fields, "id"), "id")
+    return JsonResponse({"results": [serialize_record(record, fields) for record in page.records]})
+
+
+def sync_summary(request):
+    return JsonResponse(serialize_summary(get_summary(request.user)))
+
+
+urlpatterns = [
+    path("sync/records/", sync_records),
+    path("sync/summary/", sync_summary),
+    path("async/records/", views.RecordsApiView.as_view()),
+    path("async/summary/", views.SummaryApiView.as_view()),
+]
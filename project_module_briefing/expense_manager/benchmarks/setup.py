@@ -0,0 +1,84 @@
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+
+import django
+
+
+def setup_django():
+    """Configure Django against a throwaway SQLite database and create the schema."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    from django.conf import settings
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="expense_bench_"), "bench.sqlite3")
+    settings.DATABASES["default"]["NAME"] = db_path
+    django.setup()
+
+    from django.core.management import call_command
+    call_command("migrate", run_syncdb=True, verbosity=0)
+    return db_path
+
+
+def make_user(username="bench"):
+    from django.contrib.auth.models import User
+    return User.objects.create_user(username=username, password="benchpassword")
+
+
+def seed_records(user, count, categories=10, batch_size=5000):
+    """Insert ``count`` records for ``user`` spread over a handful of categories."""
+    from app.models import Category, Record
+
+    category_objs = Category.objects.bulk_create(
+        Category(user=user, name=f"Category {i}") for i in range(categories)
+    )
+    batch = []
+    for i in range(count):
+        batch.append(Record(
+            user=user,
+            type="Income" if i % 4 == 0 else "Expense",
+            date=date(2024, 1, 1) + timedelta(days=i % 365),
+            item=f"Item {i}",
+            category=category_objs[i % categories] if i % 7 else None,
+            volume="1",
+            cost=Decimal(i % 500) + Decimal("0.99"),
+        ))
+        if len(batch) >= batch_size:
+            Record.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Record.objects.bulk_create(batch)
+
+
+@contextmanager
+def timer(results, label):
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
+
+
+@contextmanager
+def count_queries(counter):
+    """Count every SQL statement executed inside the block into ``counter["queries"]``."""
+    from django.db import connection
+
+    counter["queries"] = 0
+
+    def wrapper(execute, sql, params, many, context):
+        counter["queries"] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+def best_of(func, repeat=5):
+    """Return the fastest of ``repeat`` runs of ``func`` in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
@@ -0,0 +1,119 @@
+"""
+Database settings read from the environment.
+
+SQLite is used unless POSTGRES_HOST is set, as it is in the .env file that
+compose.yaml passes to the web container. Each SQLite connection is set up
+in write-ahead log mode, so reads keep going while an import or a purge is
+writing, with the other pragmas below tuned to match. On PostgreSQL connections are
+borrowed from a psycopg 3 connection pool shared by the worker's threads.
+
+Connections are not kept open between requests otherwise: the app is served
+over ASGI, where each request may run on a different thread, and a connection
+left open per thread would pile up idle ones. With DB_POOL=false Postgres
+connections can still be kept open for DB_CONN_MAX_AGE seconds.
+"""
+
+import os
+from django.core.exceptions import ImproperlyConfigured
+
+# Seconds a worker keeps its connection open between requests; 0 closes it after each request
+DEFAULT_CONN_MAX_AGE = 0
+
+# Connections a pool keeps open, can grow to, and waits for before giving up (seconds)
+DEFAULT_POOL_MIN_SIZE = 2
+DEFAULT_POOL_MAX_SIZE = 10
+DEFAULT_POOL_TIMEOUT = 10
+
+# Pragmas run on every new SQLite connection: a negative cache size is in KiB,
+# mmap size is in bytes and busy timeout is how long a writer waits for the lock
+SQLITE_PRAGMAS = {
+    # First, so that it also applies to switching the journal mode, which needs a lock.
+    "busy_timeout": ("SQLITE_BUSY_TIMEOUT", 5000),
+    "journal_mode": ("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": ("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": ("SQLITE_CACHE_SIZE", -64_000),
+    "mmap_size": ("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+}
+SQLITE_JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+SQLITE_SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+def env_bool(environ, name, default=False):
+    value = environ.get(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(environ, name, default):
+    value = environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_choice(environ, name, default, choices):
+    value = (environ.get(name) or default).strip().upper()
+    if value not in choices:
+        raise ImproperlyConfigured(f"{name} must be one of {', '.join(choices)}, not {value!r}")
+    return value
+
+
+def sqlite_init_command(environ):
+    """The ``PRAGMA`` statements Django runs whenever it opens a SQLite connection."""
+    values = {}
+    for pragma, (name, default) in SQLITE_PRAGMAS.items():
+        if pragma == "journal_mode":
+            values[pragma] = env_choice(environ, name, default, SQLITE_JOURNAL_MODES)
+        elif pragma == "synchronous":
+            values[pragma] = env_choice(environ, name, default, SQLITE_SYNCHRONOUS_LEVELS)
+        else:
+            values[pragma] = env_int(environ, name, default)
+    return "".join(f"PRAGMA {pragma}={value};" for pragma, value in values.items())
+
+
+def pool_options(environ):
+    """Options for Django's psycopg 3 pool; every connection is checked before it is handed out."""
+    from psycopg_pool import ConnectionPool
+
+    return {
+        "min_size": env_int(environ, "DB_POOL_MIN_SIZE", DEFAULT_POOL_MIN_SIZE),
+        "max_size": env_int(environ, "DB_POOL_MAX_SIZE", DEFAULT_POOL_MAX_SIZE),
+        "timeout": env_int(environ, "DB_POOL_TIMEOUT", DEFAULT_POOL_TIMEOUT),
+        "check": ConnectionPool.check_connection,
+    }
+
+
+def database_settings(environ=os.environ, sqlite_path=None):
+    """The ``default`` entry of ``DATABASES`` for the given environment."""
+    conn_max_age = env_int(environ, "DB_CONN_MAX_AGE", DEFAULT_CONN_MAX_AGE)
+
+    if not environ.get("POSTGRES_HOST"):
+        return {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": environ.get("SQLITE_PATH") or sqlite_path,
+            "CONN_MAX_AGE": conn_max_age,
+            "OPTIONS": {
+                "init_command": sqlite_init_command(environ),
+                # Writers take the lock when their transaction starts, so one waits
+                # for the busy timeout instead of failing when it first writes.
+                "transaction_mode": "IMMEDIATE",
+            },
+        }
+
+    database = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": environ.get("POSTGRES_DATABASE"),
+        "USER": environ.get("POSTGRES_USERNAME"),
+        "PASSWORD": environ.get("POSTGRES_PASSWORD"),
+        "HOST": environ.get("POSTGRES_HOST"),
+        "PORT": environ.get("POSTGRES_PORT", "5432"),
+        # A reused connection is pinged before the request that picks it up, so a
+        # database restart costs one reconnect instead of a failed request.
+        "CONN_HEALTH_CHECKS": True,
+        "CONN_MAX_AGE": conn_max_age,
+        "OPTIONS": {},
+    }
+    if env_bool(environ, "DB_POOL", default=True):
+        # The pool is what keeps the connections open, and Django refuses persistent ones on top of it.
+        database["CONN_MAX_AGE"] = 0
+        database["OPTIONS"]["pool"] = pool_options(environ)
+    return database
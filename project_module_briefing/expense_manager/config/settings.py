@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import os
 
+from config.database import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "app.instrumentation.QueryTimingMiddleware", # SQL count and timings in Server-Timing headers and /debug/requests/
+    "app.currencies.ExchangeRateMiddleware", # reads the exchange rates at most once per request
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware", # for serving static files in production (DEBUG False)
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -58,8 +62,17 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": ['templates'],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Compile every template once per process, in development too.
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -75,15 +88,49 @@ WSGI_APPLICATION = "config.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# SQLite by default; PostgreSQL with persistent or pooled connections when
+# POSTGRES_HOST is set. See config/database.py for the environment variables.
 
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_settings(sqlite_path=BASE_DIR / "db.sqlite3"),
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# The local memory cache is private to each process; set REDIS_URL when running
+# several workers so that they all see the same summary invalidations.
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "expense-manager",
+            # Room for the cached records table rows, beyond the default of 300 entries.
+            "OPTIONS": {"MAX_ENTRIES": 20_000},
+        }
+    }
+
+# Seconds a cached records summary is kept; writes invalidate it sooner
+SUMMARY_CACHE_TIMEOUT = 60 * 60
+
+# Requests per URL name kept for the latency percentiles at /debug/requests/
+REQUEST_STATS_BUFFER_SIZE = 1000
+
+# Seconds a user's cached category dropdown is kept; category changes invalidate it sooner
+CATEGORY_CACHE_TIMEOUT = 60 * 60
+
+# Seconds a rendered records table row is kept; editing the record or its category replaces it sooner
+RECORD_ROW_CACHE_TIMEOUT = 24 * 60 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -125,3 +172,38 @@ STATIC_ROOT=BASE_DIR / "static"
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Number of records shown per page of the records table
+RECORDS_PAGE_SIZE = 50
+
+# Number of records written per bulk insert when importing CSV/OFX files
+IMPORT_BATCH_SIZE = 1000
+
+# Number of records fetched per database round trip when streaming an export
+EXPORT_CHUNK_SIZE = 2000
+
+# Records deleted per transaction when purging; None purges everything in one transaction
+PURGE_CHUNK_SIZE = None
+
+# Most records a single bulk edit or delete may select, which keeps its id list within SQLite's parameter limit
+BULK_ACTION_MAX_RECORDS = 1000
+
+# Most journal entries returned per request of the record changes API
+CHANGES_PAGE_SIZE = 500
+
+# Days deletions stay in the record changes journal; clients that have not synced for longer download everything again
+CHANGES_RETENTION_DAYS = 30
+
+# Seconds a journal entry waits before the record changes API serves it. Sequence numbers are
+# handed out before commit, so with concurrent writers, as on PostgreSQL, a later one can commit
+# first; SQLite runs one write transaction at a time, so its entries are served straight away.
+CHANGES_SETTLE_SECONDS = 0 if DATABASES["default"]["ENGINE"].endswith("sqlite3") else 30
+
+# Recurring rules read per transaction by materialize_recurring; their records are written IMPORT_BATCH_SIZE at a time
+RECURRING_CHUNK_SIZE = 1000
+
+# Currency of records entered without one, and of the wallet until its user picks another
+DEFAULT_CURRENCY = "EUR"
+
+# ECB euro reference rates (eurofxref.csv) loaded into the rates table after migrate and by load_exchange_rates
+EXCHANGE_RATES_FILE = BASE_DIR / "app" / "data" / "eurofxref.csv"
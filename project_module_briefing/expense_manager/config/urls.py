@@ -34,7 +34,16 @@ urlpatterns = [
     path("records/", views.RecordsView.as_view(), name="records"),
     path("records/edit/<int:pk>/", views.EditRecordView.as_view(), name="edit_record"),
     path("records/delete/<int:pk>/", views.DeleteRecordView.as_view(), name="delete_record"),
+    path("records/export/", views.ExportRecordsView.as_view(), name="export_records"),
+    path("records/import/", views.ImportRecordsView.as_view(), name="import_records"),
+    path("records/bulk/", views.BulkRecordsView.as_view(), name="bulk_records"),
+    path("records/currency/", views.BaseCurrencyView.as_view(), name="base_currency"),
+    path("reports/", views.ReportsView.as_view(), name="reports"),
+    path("api/records/", views.RecordsApiView.as_view(), name="api_records"),
+    path("api/summary/", views.SummaryApiView.as_view(), name="api_summary"),
+    path("api/changes/", views.RecordChangesApiView.as_view(), name="api_changes"),
     path('purge/', views.PurgeRecordsView.as_view(), name='purge_records'),
+    path("debug/requests/", views.RequestStatsView.as_view(), name="request_stats"),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
 # handler404 = "views.page_not_found"
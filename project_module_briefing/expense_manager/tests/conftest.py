@@ -0,0 +1,25 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """The test database reuses primary keys between tests, so start each one with an empty cache."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def read_stream():
+    """Return a function that consumes a streaming response, whether its content is sync or async."""
+    from asgiref.sync import async_to_sync
+
+    def read(response):
+        if not response.is_async:
+            return b''.join(response.streaming_content)
+
+        async def collect():
+            return b''.join([chunk async for chunk in response.streaming_content])
+        return async_to_sync(collect)()
+    return read
@@ -253,6 +253,39 @@ def test_updates_clean_orphaned_categories(client, user):
     print(f"Records still using category1: {remaining}")
     assert Category.objects.filter(id=category1.id).count() == 0
 
+@pytest.mark.django_db
+def test_orphan_category_cleanup_only_touches_unused_categories(user, django_user_model):
+    """Test that the cleanup deletes the user's unused categories and leaves used and other users' ones alone."""
+    from app.categories import delete_orphan_categories
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    used = Category.objects.create(user=user, name='Used')
+    Category.objects.create(user=user, name='Unused')
+    other_unused = Category.objects.create(user=other_user, name='Unused')
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Item', volume='1', cost='1', category=used)
+    assert delete_orphan_categories(user) == 1
+    assert list(Category.objects.filter(user=user)) == [used]
+    assert Category.objects.filter(pk=other_unused.pk).exists()
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('record_count, category_count', [(3, 3), (60, 12)])
+def test_orphan_category_cleanup_query_count_is_constant(user, record_count, category_count, django_assert_num_queries):
+    """Test that removing the categories left behind by a bulk delete costs the same however many records and categories went."""
+    from app.categories import category_choices, delete_orphan_categories
+    from app.summary import get_summary, rebuild_rollups
+    categories = [Category.objects.create(user=user, name=f'Category {i}') for i in range(category_count)]
+    Record.objects.bulk_create(
+        Record(user=user, type='Expense', date='2024-01-01', item=f'Item {i}', volume='1', cost='1.00', category=categories[i % category_count])
+        for i in range(record_count)
+    )
+    rebuild_rollups(user)
+    assert len(category_choices(user)) == category_count
+    Record.objects.filter(user=user).delete()
+    with django_assert_num_queries(4):
+        assert delete_orphan_categories(user) == category_count
+    assert not Category.objects.filter(user=user).exists()
+    assert category_choices(user) == []
+    assert get_summary(user)['category_spending'] == {}
+
 # -------- SECURITY TESTS --------
 
 @pytest.mark.django_db
@@ -649,6 +682,17 @@ def test_user_input_capitalization_preserves_acronyms(client, user):
     )
     assert record.item == "TV Set For Home"
 
+@pytest.mark.django_db
+def test_name_normalization_is_shared_and_quiet(user, capsys):
+    """Test that items and category names are capitalized by the shared helper without writing to stdout."""
+    from app.normalization import capitalize_words
+    assert capitalize_words('  office  IT supplies ') == 'Office IT Supplies'
+    assert capitalize_words('iPhone 15 case') == 'IPhone 15 Case'
+    category = Category.objects.create(user=user, name='office IT')
+    record = Record.objects.create(user=user, type='Expense', date='2024-01-01', item='usb hub', volume='1', cost='5', category=category)
+    assert (category.name, record.item) == ('Office IT', 'Usb Hub')
+    assert capsys.readouterr().out == ''
+
 # -------- PURGE FUNCTIONALITY TEST --------
 
 @pytest.mark.django_db
@@ -680,4 +724,1332 @@ def test_purge_removes_categories(client, user):
     url = reverse('purge_records')
     response = client.post(url, follow=True)
     assert Record.objects.filter(user=user).count() == 0    
-    assert Category.objects.filter(user=user).count() == 0
\ No newline at end of file
+    assert Category.objects.filter(user=user).count() == 0
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('chunk_size', [None, 7])
+def test_purge_is_set_based(user, category, django_user_model, chunk_size):
+    """Test that the purge deletes only the user's rows, without loading them, in a query count independent of the record count."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from app.purge import purge_user_records
+    from app.summary import get_summary, rebuild_rollups
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    other_category = Category.objects.create(user=other_user, name='Test Category')
+    Record.objects.create(user=other_user, type='Expense', date='2024-01-01', item='Theirs', volume='1', cost='1', category=other_category)
+    Record.objects.bulk_create(
+        Record(user=user, type='Expense', date='2024-01-01', item=f'Item {i}', volume='1', cost='1.00', category=category if i % 2 else None)
+        for i in range(50)
+    )
+    rebuild_rollups(user)
+    with CaptureQueriesContext(connection) as queries:
+        assert purge_user_records(user, chunk_size=chunk_size) == (50, 1)
+    record_queries = [query['sql'] for query in queries if query['sql'].startswith(('SELECT', 'DELETE')) and '"app_record"' in query['sql']]
+    assert all(sql.startswith('DELETE') for sql in record_queries)
+    assert len(record_queries) == (50 // chunk_size + 2 if chunk_size else 1)
+    assert not Record.objects.filter(user=user).exists()
+    assert not Category.objects.filter(user=user).exists()
+    assert get_summary(user) == {'total_amount': 0, 'category_spending': {}, 'currency': 'EUR'}
+    assert Record.objects.filter(user=other_user).count() == 1
+    assert Category.objects.filter(user=other_user).count() == 1
+
+@pytest.mark.django_db
+def test_failed_chunked_purge_already_forgot_the_records(user, category):
+    """Test that a chunked purge failing partway leaves the summary and the journal describing the records as purged."""
+    from django.db import connection
+    from app.models import RecordChange
+    from app.purge import purge_user_records
+    from app.summary import get_summary
+    Record.objects.bulk_create(
+        Record(user=user, type='Expense', date='2024-01-01', item=f'Item {i}', volume='1', cost='1.00', category=category)
+        for i in range(10)
+    )
+    assert get_summary(user)['total_amount'] == Decimal('-10.00')
+    chunks = []
+
+    def fail_second_chunk(execute, sql, params, many, context):
+        if sql.startswith('DELETE FROM "app_record" WHERE id IN'):
+            chunks.append(sql)
+            if len(chunks) == 2:
+                raise RuntimeError('connection lost')
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(fail_second_chunk), pytest.raises(RuntimeError):
+        purge_user_records(user, chunk_size=4)
+    assert Record.objects.filter(user=user).count() == 6
+    assert get_summary(user) == {'total_amount': 0, 'category_spending': {}, 'currency': 'EUR'}
+    assert RecordChange.objects.filter(user=user).latest('id').operation == RecordChange.PURGE
+
+    assert purge_user_records(user, chunk_size=4) == (6, 1)
+    assert get_summary(user) == {'total_amount': 0, 'category_spending': {}, 'currency': 'EUR'}
+
+# -------- SUMMARY TESTS --------
+
+@pytest.mark.django_db
+def test_summary_groups_spending_by_category(user, category):
+    """Test that the summary nets incomes against expenses per category, including uncategorized records."""
+    from app.summary import compute_summary
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Item 1', volume='1', cost='20.10', category=category)
+    Record.objects.create(user=user, type='Income', date='2024-01-02', item='Item 2', volume='1', cost='5.05', category=category)
+    Record.objects.create(user=user, type='Income', date='2024-01-03', item='Item 3', volume='1', cost='100')
+    summary = compute_summary(user)
+    assert summary['total_amount'] == Decimal('84.95')
+    assert summary['category_spending'] == {'Test Category': Decimal('-15.05'), 'Uncategorized': Decimal('100.00')}
+    assert list(summary['category_spending']) == ['Test Category', 'Uncategorized']
+
+@pytest.mark.django_db
+def test_summary_is_empty_without_records(user):
+    """Test that a user without records has an empty summary and a zero wallet."""
+    from app.summary import compute_summary
+    assert compute_summary(user) == {'total_amount': 0, 'category_spending': {}, 'currency': 'EUR'}
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('record_count', [5, 200])
+def test_summary_query_count_does_not_grow_with_records(user, category, record_count, django_assert_num_queries):
+    """Test that the summary is computed in a single query regardless of how many records exist."""
+    from app.summary import compute_summary
+    Record.objects.bulk_create(
+        Record(user=user, type='Expense', date='2024-01-01', item=f'Item {i}', volume='1', cost='1.00', category=category if i % 2 else None)
+        for i in range(record_count)
+    )
+    # The base currency and the exchange rates, then the grouped query.
+    with django_assert_num_queries(3):
+        summary = compute_summary(user)
+    assert summary['total_amount'] == -record_count
+
+# -------- ROLLUP TESTS --------
+
+@pytest.mark.django_db
+def test_rollups_follow_record_changes(client, user, category):
+    """Test that the balance and category rollups stay correct through create, edit, delete and purge."""
+    from app.models import UserBalance
+    from app.summary import get_summary, verify_rollups
+    client.post(reverse('records'), {'type': 'Expense', 'date': '2024-01-01', 'item': 'Rent', 'volume': '1', 'cost': '500', 'category': category.id})
+    client.post(reverse('records'), {'type': 'Income', 'date': '2024-01-02', 'item': 'Salary', 'volume': '1', 'cost': '1200', 'category': '', 'new_category': 'Work'})
+    assert verify_rollups(user) == []
+    assert get_summary(user)['total_amount'] == Decimal('700.00')
+
+    rent = Record.objects.get(user=user, item='Rent')
+    client.post(reverse('edit_record', args=[rent.pk]), {'type': 'Income', 'date': '2024-01-01', 'item': 'Rent', 'volume': '1', 'cost': '450', 'category': '', 'new_category': 'Sublet'})
+    assert verify_rollups(user) == []
+    assert get_summary(user) == {'total_amount': Decimal('1650.00'), 'category_spending': {'Sublet': Decimal('450.00'), 'Work': Decimal('1200.00')}, 'currency': 'EUR'}
+
+    client.post(reverse('delete_record', args=[rent.pk]))
+    assert verify_rollups(user) == []
+    assert get_summary(user)['category_spending'] == {'Work': Decimal('1200.00')}
+
+    client.post(reverse('purge_records'))
+    assert verify_rollups(user) == []
+    assert UserBalance.objects.get(user=user).record_count == 0
+    assert get_summary(user) == {'total_amount': 0, 'category_spending': {}, 'currency': 'EUR'}
+
+@pytest.mark.django_db
+def test_rollups_move_records_of_deleted_category_to_uncategorized(user, category):
+    """Test that deleting a category that still has records folds its rollup into Uncategorized."""
+    from app.summary import get_summary, verify_rollups
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Item', volume='1', cost='10', category=category)
+    Record.objects.create(user=user, type='Expense', date='2024-01-02', item='Other', volume='1', cost='5', category=category)
+    Category.objects.filter(pk=category.pk).delete()
+    assert get_summary(user)['category_spending'] == {'Uncategorized': Decimal('-15.00')}
+    assert verify_rollups(user) == []
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('delete', ['instance', 'queryset'])
+def test_deleting_a_user_with_records_leaves_nothing_behind(user, category, django_user_model, delete):
+    """Test that deleting a user cascades to their records without rebuilding rollups or journaling them."""
+    from django.db import connection
+    from app.models import CategoryRollup, RecordChange, UserBalance
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Item', volume='1', cost='10', category=category)
+    Record.objects.create(user=user, type='Expense', date='2024-01-02', item='Other', volume='1', cost='5')
+    if delete == 'instance':
+        user.delete()
+    else:
+        django_user_model.objects.filter(pk=user.pk).delete()
+    connection.check_constraints()
+    assert not Record.objects.exists()
+    assert not UserBalance.objects.exists()
+    assert not CategoryRollup.objects.exists()
+    assert not RecordChange.objects.exists()
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('record_count', [5, 200])
+def test_rollup_summary_read_is_constant(user, category, record_count, django_assert_num_queries):
+    """Test that reading the summary from the rollups costs the same no matter the history size."""
+    from app.summary import get_summary, rebuild_rollups
+    Record.objects.bulk_create(
+        Record(user=user, type='Income', date='2024-01-01', item=f'Item {i}', volume='1', cost='2.50', category=category)
+        for i in range(record_count)
+    )
+    rebuild_rollups(user)
+    with django_assert_num_queries(2):
+        summary = get_summary(user)
+    assert summary['category_spending'] == {'Test Category': Decimal('2.50') * record_count}
+
+@pytest.mark.django_db
+def test_rebuild_rollups_command_repairs_drift(user, category):
+    """Test that the rebuild_rollups command detects stale rollups and rebuilds them."""
+    from django.core.management import call_command
+    from django.core.management.base import CommandError
+    from app.models import CategoryRollup
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Item', volume='1', cost='10', category=category)
+    CategoryRollup.objects.filter(user=user).update(net=Decimal('99.00'))
+    with pytest.raises(CommandError):
+        call_command('rebuild_rollups', '--verify-only', '--user', user.username)
+    call_command('rebuild_rollups', '--user', user.username)
+    assert CategoryRollup.objects.get(user=user).net == Decimal('-10.00')
+
+# -------- SUMMARY CACHE TESTS --------
+
+@pytest.mark.django_db
+def test_cached_summary_needs_no_queries(user, category, django_assert_num_queries):
+    """Test that a repeated summary read is served from the cache without touching the database."""
+    from app.summary import get_summary
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Item', volume='1', cost='10', category=category)
+    summary = get_summary(user)
+    with django_assert_num_queries(0):
+        assert get_summary(user) == summary == {'total_amount': Decimal('-10.00'), 'category_spending': {'Test Category': Decimal('-10.00')}, 'currency': 'EUR'}
+
+@pytest.mark.django_db
+def test_cached_summary_is_never_stale(client, user, django_user_model):
+    """Test that the summary shown on the records page follows every create, edit, rename, delete, import and purge."""
+    import io
+    from app.importer import import_records, iter_rows
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    def summary():
+        response = client.get(reverse('records'))
+        return response.context['total_amount'], response.context['category_spending']
+
+    assert summary() == (0, {})
+    client.post(reverse('records'), {'type': 'Expense', 'date': '2024-01-01', 'item': 'Rent', 'volume': '1', 'cost': '500', 'category': '', 'new_category': 'Home'})
+    assert summary() == (Decimal('-500.00'), {'Home': Decimal('-500.00')})
+
+    rent = Record.objects.get(user=user)
+    client.post(reverse('edit_record', args=[rent.pk]), {'type': 'Expense', 'date': '2024-01-01', 'item': 'Rent', 'volume': '1', 'cost': '450', 'category': rent.category_id})
+    assert summary() == (Decimal('-450.00'), {'Home': Decimal('-450.00')})
+
+    home = Category.objects.get(user=user)
+    home.name = 'House'
+    home.save()
+    assert summary() == (Decimal('-450.00'), {'House': Decimal('-450.00')})
+
+    Record.objects.create(user=other_user, type='Income', date='2024-01-01', item='Other', volume='1', cost='1')
+    assert summary() == (Decimal('-450.00'), {'House': Decimal('-450.00')})
+
+    import_records(user, iter_rows(io.StringIO('type,date,item,category,volume,cost\nIncome,2024-01-02,Pay,,1,1000\n'), 'csv'))
+    assert summary() == (Decimal('550.00'), {'House': Decimal('-450.00'), 'Uncategorized': Decimal('1000.00')})
+
+    client.post(reverse('delete_record', args=[rent.pk]))
+    assert summary() == (Decimal('1000.00'), {'Uncategorized': Decimal('1000.00')})
+
+    client.post(reverse('purge_records'))
+    assert summary() == (0, {})
+
+# -------- PAGINATION TESTS --------
+
+def _expected_order(records, sort_field, descending):
+    """Sort records in Python the way the records table should: missing categories first, id as tiebreak."""
+    def key(record):
+        if sort_field == 'category__name':
+            name = record.category.name if record.category else None
+            return (name is not None, name or '', record.id)
+        return (getattr(record, sort_field), record.id)
+    return sorted(records, key=key, reverse=descending)
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('sort_param', ['id', '-id', 'date', '-date', 'item', '-item', 'category__name', '-category__name', 'cost', '-cost'])
+def test_keyset_pagination_walks_every_sort_option(user, sort_param):
+    """Test that following next and previous cursors visits every record exactly once in sort order."""
+    from app.pagination import paginate, parse_sort
+    food = Category.objects.create(user=user, name='Food')
+    rent = Category.objects.create(user=user, name='Rent')
+    categories = [food, rent, None]
+    for i in range(17):
+        Record.objects.create(user=user, type='Expense', date=f'2024-01-{i % 4 + 1:02d}', item=f'Item {i % 5}', volume='1', cost=str(i % 3), category=categories[i % 3])
+
+    sort_field, descending = parse_sort(sort_param)
+    queryset = Record.objects.filter(user=user).select_related('category')
+    expected = [record.id for record in _expected_order(list(queryset), sort_field, descending)]
+
+    pages = [paginate(queryset, sort_param, page_size=5)]
+    while pages[-1].has_next:
+        pages.append(paginate(queryset, sort_param, after=pages[-1].next_cursor, page_size=5))
+    assert [record.id for page in pages for record in page.records] == expected
+    assert len(pages) == 4
+    assert not pages[0].has_previous
+
+    backwards = [pages[-1]]
+    while backwards[-1].has_previous:
+        backwards.append(paginate(queryset, sort_param, before=backwards[-1].previous_cursor, page_size=5))
+    assert [[record.id for record in page.records] for page in reversed(backwards)] == [[record.id for record in page.records] for page in pages]
+
+@pytest.mark.django_db
+def test_records_view_paginates_with_cursor_links(client, user, settings):
+    """Test that the records page shows one page of rows and links to the next one, keeping the sort."""
+    settings.RECORDS_PAGE_SIZE = 2
+    for i in range(5):
+        Record.objects.create(user=user, type='Expense', date='2024-01-01', item=f'Row {i}', volume='1', cost='1')
+    response = client.get(reverse('records') + '?sort=-id')
+    assert [record.item for record in response.context['object_list']] == ['Row 4', 'Row 3']
+    next_cursor = response.context['page'].next_cursor
+    assert f'?sort=-id&after={next_cursor}' in response.content.decode()
+    response = client.get(reverse('records') + f'?sort=-id&after={next_cursor}')
+    assert [record.item for record in response.context['object_list']] == ['Row 2', 'Row 1']
+
+@pytest.mark.django_db
+def test_records_view_ignores_unknown_sort_and_bad_cursor(client, user):
+    """Test that an unknown sort field or a garbled cursor falls back to the first page sorted by id."""
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Only Row', volume='1', cost='1')
+    response = client.get(reverse('records') + '?sort=user__password&after=not-a-cursor')
+    assert response.status_code == 200
+    assert response.context['sort_by'] == 'id'
+    assert 'Only Row' in response.content.decode()
+
+@pytest.mark.django_db
+def test_keyset_pages_do_not_use_offsets(user, django_assert_num_queries):
+    """Test that a later page is fetched with a single seek query rather than an OFFSET scan."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from app.pagination import paginate
+    Record.objects.bulk_create(Record(user=user, type='Expense', date='2024-01-01', item=f'Item {i}', volume='1', cost=i) for i in range(30))
+    queryset = Record.objects.filter(user=user).select_related('category')
+    page = paginate(queryset, '-cost', page_size=10)
+    page = paginate(queryset, '-cost', after=page.next_cursor, page_size=10)
+    with CaptureQueriesContext(connection) as queries:
+        page = paginate(queryset, '-cost', after=page.next_cursor, page_size=10)
+    assert len(queries) == 1
+    assert 'OFFSET' not in queries[0]['sql']
+    assert [record.cost for record in page.records] == list(range(9, -1, -1))
+
+# -------- IMPORT TESTS --------
+
+IMPORT_CSV = (
+    "type,date,item,category,volume,cost\n"
+    "expense,2024-01-01,coffee beans,groceries,1,12.50\n"
+    "Income,2024-01-02,salary,,1,1000\n"
+    "Expense,2024-01-03,USB hub,office IT,2,30\n"
+    "Expense,not a date,broken,groceries,1,5\n"
+    "Expense,2024-01-04,tea,Groceries,1,-3\n"
+    "Expense,2024-01-05,tea,Groceries,1,4.25\n"
+)
+
+IMPORT_OFX = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240201120000<TRNAMT>-42.10<NAME>grocery store
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240205<TRNAMT>1500.00<NAME>ACME payroll &amp; co</NAME>
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+@pytest.mark.django_db
+def test_import_csv_creates_records_and_categories(user, django_assert_max_num_queries):
+    """Test that a CSV import capitalizes like the form, skips invalid rows and keeps the rollups correct."""
+    import io
+    from app.importer import import_records, iter_rows
+    from app.summary import get_summary, verify_rollups
+    with django_assert_max_num_queries(30):
+        result = import_records(user, iter_rows(io.StringIO(IMPORT_CSV), 'csv'), batch_size=2)
+    assert (result.created, result.skipped) == (4, 2)
+    assert result.errors == ["Row 5: invalid date 'not a date'", "Row 6: invalid cost '-3'"]
+    assert sorted(Record.objects.filter(user=user).values_list('item', flat=True)) == ['Coffee Beans', 'Salary', 'Tea', 'USB Hub']
+    assert sorted(Category.objects.filter(user=user).values_list('name', flat=True)) == ['Groceries', 'Office IT']
+    assert verify_rollups(user) == []
+    assert get_summary(user)['total_amount'] == Decimal('953.25')
+
+@pytest.mark.django_db
+def test_import_csv_reuses_existing_categories(user, category):
+    """Test that imported rows attach to the user's existing category of the same name."""
+    import io
+    from app.importer import import_records, iter_rows
+    csv_file = "type,date,item,category,volume,cost\nExpense,2024-01-01,item,test category,1,1\n"
+    import_records(user, iter_rows(io.StringIO(csv_file), 'csv'))
+    assert Record.objects.get(user=user).category == category
+    assert Category.objects.filter(user=user).count() == 1
+
+@pytest.mark.django_db
+def test_import_ofx_statement(user):
+    """Test that OFX transactions become incomes and expenses by the sign of their amount."""
+    import io
+    from app.importer import import_records, iter_rows
+    result = import_records(user, iter_rows(io.StringIO(IMPORT_OFX), 'ofx'))
+    assert result.created == 2
+    records = list(Record.objects.filter(user=user).order_by('date').values_list('type', 'date', 'item', 'cost', 'category'))
+    assert records == [
+        ('Expense', date(2024, 2, 1), 'Grocery Store', Decimal('42.10'), None),
+        ('Income', date(2024, 2, 5), 'ACME Payroll & Co', Decimal('1500.00'), None),
+    ]
+
+@pytest.mark.django_db
+def test_import_view_uploads_file(client, user):
+    """Test that the import page accepts an uploaded CSV and rejects a file without the required columns."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    url = reverse('import_records')
+    assert client.get(url).status_code == 200
+
+    upload = SimpleUploadedFile('records.csv', IMPORT_CSV.encode(), content_type='text/csv')
+    response = client.post(url, {'file': upload})
+    assert response.status_code == 302
+    assert Record.objects.filter(user=user).count() == 4
+
+    upload = SimpleUploadedFile('records.csv', b'name,amount\nx,1\n', content_type='text/csv')
+    response = client.post(url, {'file': upload})
+    assert response.status_code == 200
+    assert 'missing the column' in response.content.decode()
+
+@pytest.mark.django_db
+def test_import_records_command(user, tmp_path):
+    """Test that the import_records command imports a file and reports the throughput."""
+    from io import StringIO
+    from django.core.management import call_command
+    path = tmp_path / 'records.csv'
+    path.write_text(IMPORT_CSV)
+    out = StringIO()
+    call_command('import_records', str(path), '--user', user.username, '--batch-size', '3', stdout=out, stderr=StringIO())
+    assert 'Imported 4 records, skipped 2' in out.getvalue()
+    assert 'rows/s' in out.getvalue()
+
+# -------- EXPORT TESTS --------
+
+@pytest.mark.django_db
+def test_export_streams_csv_in_sort_order(client, user, category, read_stream):
+    """Test that the CSV export streams every record of the user in the requested sort order."""
+    import csv
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Cheap', volume='1', cost='5', category=category)
+    Record.objects.create(user=user, type='Income', date='2024-01-02', item='Pricey', volume='2', cost='50.5')
+    response = client.get(reverse('export_records'), {'format': 'csv', 'sort': '-cost'})
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Disposition'] == 'attachment; filename="records.csv"'
+    rows = list(csv.DictReader(read_stream(response).decode().splitlines()))
+    assert [(row['item'], row['category'], row['cost']) for row in rows] == [('Pricey', '', '50.50'), ('Cheap', 'Test Category', '5.00')]
+
+@pytest.mark.django_db
+def test_export_ndjson_is_user_specific(client, user, django_user_model, read_stream):
+    """Test that the NDJSON export holds one object per line and only the user's own records."""
+    import json
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Mine', volume='1', cost='5')
+    Record.objects.create(user=other_user, type='Expense', date='2024-01-01', item='Theirs', volume='1', cost='5')
+    response = client.get(reverse('export_records'), {'format': 'json'})
+    assert response['Content-Type'] == 'application/x-ndjson'
+    lines = read_stream(response).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {'id': Record.objects.get(item='Mine').id, 'type': 'Expense', 'date': '2024-01-01', 'item': 'Mine', 'category': None, 'volume': '1', 'cost': '5.00', 'currency': 'EUR'},
+    ]
+    assert client.get(reverse('export_records'), {'format': 'xml'}).status_code == 404
+
+@pytest.mark.django_db
+def test_export_is_lazy_and_uses_one_query(user, settings, django_assert_num_queries):
+    """Test that the export only queries once it is consumed, then reads every record through a single cursor."""
+    from app.exporter import export_rows, iter_csv
+    settings.EXPORT_CHUNK_SIZE = 10
+    Record.objects.bulk_create(
+        Record(user=user, type='Expense', date='2024-01-01', item=f'Item {i}', volume='1', cost='1.00')
+        for i in range(25)
+    )
+    with django_assert_num_queries(0):
+        lines = iter_csv(export_rows(Record.objects.filter(user=user), 'id', False))
+        assert next(lines).startswith('id,type,date')
+    with django_assert_num_queries(1):
+        rows = list(lines)
+    assert [row.split(',')[3] for row in rows] == [f'Item {i}' for i in range(25)]
+
+@pytest.mark.django_db
+def test_export_streams_synchronously_under_wsgi(client, user, settings):
+    """Test that a WSGI request gets a sync export, which the server sends a chunk at a time instead of buffering."""
+    settings.EXPORT_CHUNK_SIZE = 10
+    Record.objects.bulk_create(
+        Record(user=user, type='Expense', date='2024-01-01', item=f'Item {i}', volume='1', cost='1.00')
+        for i in range(25)
+    )
+    response = client.get(reverse('export_records'))
+    assert response.streaming
+    assert not response.is_async
+    content = iter(response.streaming_content)
+    assert next(content).startswith(b'id,type,date')
+    assert len(list(content)) == 25
+
+# -------- API TESTS --------
+
+@pytest.mark.django_db
+def test_api_lists_records_with_sparse_fields(client, user, category, settings):
+    """Test that the records API returns only the requested fields and pages with keyset cursors."""
+    settings.RECORDS_PAGE_SIZE = 2
+    for i in range(3):
+        Record.objects.create(user=user, type='Expense', date=f'2024-01-0{i + 1}', item=f'Item {i}', volume='1', cost=f'{i}.50', category=category if i else None)
+    response = client.get(reverse('api_records'), {'fields': 'date,cost,category', 'sort': '-date'})
+    assert response.status_code == 200
+    data = response.json()
+    assert data['results'] == [
+        {'date': '2024-01-03', 'cost': '2.50', 'category': 'Test Category'},
+        {'date': '2024-01-02', 'cost': '1.50', 'category': 'Test Category'},
+    ]
+    assert data['previous'] is None
+    data = client.get(data['next']).json()
+    assert data['results'] == [{'date': '2024-01-01', 'cost': '0.50', 'category': None}]
+    assert data['next'] is None and data['previous'] is not None
+
+    response = client.get(reverse('api_records'), {'fields': 'date,secret'})
+    assert response.status_code == 400
+    assert response.json() == {'error': 'Unknown field(s): secret'}
+
+@pytest.mark.django_db
+def test_api_only_loads_requested_columns(client, user):
+    """Test that a sparse fieldset is pushed down to the SELECT instead of loading whole records."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Item', volume='1', cost='1')
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get(reverse('api_records'), {'fields': 'item'}).json()['results'] == [{'item': 'Item'}]
+    [sql] = [query['sql'] for query in queries if 'FROM "app_record"' in query['sql']]
+    assert '"app_record"."cost"' not in sql and 'app_category' not in sql
+
+@pytest.mark.django_db
+def test_api_etag_answers_unchanged_polls_without_reading_records(client, user, django_user_model):
+    """Test that a poll with a current ETag gets 304 without querying records, and that any change issues a new ETag."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    record = Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Item', volume='1', cost='1')
+    url = reverse('api_records')
+    etag = client.get(url)['ETag']
+    assert etag.startswith('"') and not etag.startswith('W/')
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert not any('app_record' in query['sql'] for query in queries)
+    assert client.get(url, {'fields': 'item'}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    Record.objects.create(user=other_user, type='Expense', date='2024-01-01', item='Other', volume='1', cost='1')
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    record.item = 'Renamed'
+    record.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['results'][0]['item'] == 'Renamed'
+
+    etag = response['ETag']
+    client.post(reverse('purge_records'))
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+@pytest.mark.django_db
+def test_api_summary(client, user, category):
+    """Test that the summary API returns the wallet total and spending per category as strings."""
+    assert client.get(reverse('api_summary')).json() == {'total_amount': '0.00', 'category_spending': {}, 'currency': 'EUR'}
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Item', volume='1', cost='10', category=category)
+    Record.objects.create(user=user, type='Income', date='2024-01-01', item='Pay', volume='1', cost='25.5')
+    assert client.get(reverse('api_summary')).json() == {
+        'total_amount': '15.50',
+        'category_spending': {'Test Category': '-10.00', 'Uncategorized': '25.50'},
+        'currency': 'EUR',
+    }
+
+@pytest.mark.django_db
+def test_async_views_serve_asgi_requests(user, category, read_stream):
+    """Test that the list, summary and export views run natively on the ASGI handler."""
+    import asyncio
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient
+    from app import views
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Item', volume='1', cost='10', category=category)
+    for view in (views.RecordsApiView, views.SummaryApiView, views.ExportRecordsView):
+        assert view.view_is_async
+
+    async def fetch():
+        client = AsyncClient()
+        await client.aforce_login(user)
+        return await asyncio.gather(
+            client.get(reverse('api_records'), {'fields': 'item'}),
+            client.get(reverse('api_summary')),
+            client.get(reverse('export_records'), {'format': 'json'}),
+        )
+    records, summary, export = async_to_sync(fetch)()
+    assert records.json()['results'] == [{'item': 'Item'}]
+    assert summary.json()['total_amount'] == '-10.00'
+    assert export.is_async
+    assert b'"item":"Item"' in read_stream(export)
+
+@pytest.mark.django_db
+def test_api_requires_login():
+    """Test that anonymous API requests are refused instead of redirected to the login page."""
+    assert Client().get(reverse('api_records')).status_code == 403
+    assert Client().get(reverse('api_summary')).status_code == 403
+    assert Client().get(reverse('export_records')).status_code == 302
+
+# -------- REPORT TESTS --------
+
+@pytest.fixture
+def report_records(user, category, django_user_model):
+    """Fixture to create records across two months and three weeks, plus someone else's."""
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    Record.objects.create(user=other_user, type='Expense', date='2024-01-10', item='Other', volume='1', cost='999')
+    for record_date, record_type, cost, record_category in [
+        ('2024-01-01', 'Expense', '10.50', category),  # Monday
+        ('2024-01-07', 'Income', '100', None),  # Sunday, same week
+        ('2024-01-08', 'Expense', '4', category),
+        ('2024-01-31', 'Expense', '1', None),
+        ('2024-02-01', 'Income', '20', category),
+    ]:
+        Record.objects.create(user=user, type=record_type, date=record_date, item='Item', volume='1', cost=cost, category=record_category)
+
+@pytest.mark.django_db
+def test_monthly_report_pivots_net_spending_by_category(user, report_records, django_assert_num_queries):
+    """Test that the monthly report sums each month and category in one grouped query plus the category names."""
+    from app.reports import spending_report
+    # The base currency and the exchange rates come first.
+    with django_assert_num_queries(4):
+        report = spending_report(user, 'month')
+    january, february = date(2024, 1, 1), date(2024, 2, 1)
+    assert report.periods == [january, february]
+    assert report.categories == ['Test Category', 'Uncategorized']
+    assert report.cells == {
+        january: {'Test Category': Decimal('-14.50'), 'Uncategorized': Decimal('99.00')},
+        february: {'Test Category': Decimal('20.00')},
+    }
+    assert list(report.rows()) == [
+        (january, [Decimal('-14.50'), Decimal('99.00')], Decimal('100.00'), Decimal('15.50'), Decimal('84.50')),
+        (february, [Decimal('20.00'), None], Decimal('20.00'), Decimal('0.00'), Decimal('20.00')),
+    ]
+
+@pytest.mark.django_db
+def test_weekly_report_buckets_by_monday_within_date_range(user, report_records):
+    """Test that weeks start on Monday and that the date range bounds are inclusive."""
+    from app.reports import spending_report
+    report = spending_report(user, 'week', start=date(2024, 1, 1), end=date(2024, 1, 31))
+    assert report.periods == [date(2024, 1, 1), date(2024, 1, 8), date(2024, 1, 29)]
+    assert report.cells[date(2024, 1, 1)] == {'Test Category': Decimal('-10.50'), 'Uncategorized': Decimal('100.00')}
+    assert report.net(date(2024, 1, 29)) == Decimal('-1.00')
+    assert spending_report(user, 'week', start=date(2024, 3, 1)).periods == []
+
+@pytest.mark.django_db
+def test_reports_view_renders_and_validates_range(client, report_records):
+    """Test that the reports page shows the pivot table and rejects an inverted date range."""
+    response = client.get(reverse('reports'))
+    assert response.status_code == 200
+    content = response.content.decode()
+    assert 'January 2024' in content and 'February 2024' in content
+    assert '84.50' in content
+    assert '999' not in content
+
+    response = client.get(reverse('reports'), {'period': 'week', 'start': '2024-02-01', 'end': '2024-02-29'})
+    assert [row[0] for row in response.context['report'].rows()] == [date(2024, 1, 29)]
+
+    response = client.get(reverse('reports'), {'start': '2024-02-01', 'end': '2024-01-01'})
+    assert response.status_code == 200
+    assert 'report' not in response.context
+    assert 'must not be after' in response.content.decode()
+
+# -------- SEARCH TESTS --------
+
+def search_items(user, query, **kwargs):
+    from app.search import search_records
+    return [record.item for record in search_records(user, query, **kwargs).records]
+
+@pytest.mark.django_db
+def test_search_matches_word_prefixes_in_items_volumes_and_categories(user, category, django_user_model):
+    """Test that every query word must prefix a word of the item, volume or category, ignoring case and accents."""
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    Record.objects.create(user=other_user, type='Expense', date='2024-01-01', item='Coffee Beans', volume='1', cost='1')
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Coffee Beans', volume='1kg', cost='9')
+    Record.objects.create(user=user, type='Expense', date='2024-01-02', item='Café Latte', volume='2 cups', cost='5', category=category)
+    Record.objects.create(user=user, type='Expense', date='2024-01-03', item='Tea', volume='1', cost='3')
+    assert search_items(user, 'coff') == ['Coffee Beans']
+    assert search_items(user, 'CAFE') == ['Café Latte']
+    assert search_items(user, 'cup') == ['Café Latte']
+    assert search_items(user, 'test cat') == ['Café Latte']
+    assert search_items(user, 'coffee tea') == []
+    assert search_items(user, '"* OR -') == []
+
+@pytest.mark.django_db
+def test_search_ranks_the_best_matches_first(user):
+    """Test that results are ordered by relevance rather than by entry order."""
+    coffee = Category.objects.create(user=user, name='Coffee')
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Big Box Of Coffee Pods', volume='1', cost='1')
+    Record.objects.create(user=user, type='Expense', date='2024-01-02', item='Coffee', volume='1', cost='1', category=coffee)
+    assert search_items(user, 'coffee') == ['Coffee', 'Big Box Of Coffee Pods']
+
+@pytest.mark.django_db
+def test_search_index_follows_edits_renames_deletes_and_bulk_writes(user, category):
+    """Test that the index stays in sync with saves, category renames, deletes, imports and purges."""
+    from app.importer import import_records
+    from app.purge import purge_user_records
+    record = Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Bread', volume='1', cost='2', category=category)
+    record.item = 'Baguette'
+    record.save()
+    assert search_items(user, 'bread') == []
+    assert search_items(user, 'bag') == ['Baguette']
+
+    category.name = 'Bakery'
+    category.save()
+    assert search_items(user, 'bakery') == ['Baguette']
+    category.delete()
+    assert search_items(user, 'bakery') == []
+
+    record.delete()
+    assert search_items(user, 'bag') == []
+
+    import_records(user, enumerate([{'type': 'Expense', 'date': '2024-01-01', 'item': 'Croissant', 'category': 'bakery', 'volume': '3', 'cost': '4'}]))
+    assert search_items(user, 'bakery croi') == ['Croissant']
+    purge_user_records(user)
+    assert search_items(user, 'croi') == []
+
+@pytest.mark.django_db
+def test_search_pages_walk_forwards_and_backwards(user, settings):
+    """Test that ranked results are paginated with cursors, without repeating or skipping matches."""
+    for i in range(5):
+        Record.objects.create(user=user, type='Expense', date='2024-01-01', item=f'Milk {i}', volume='1', cost='1')
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Eggs', volume='1', cost='1')
+    from app.search import search_records
+    settings.RECORDS_PAGE_SIZE = 2
+    pages = [search_records(user, 'milk')]
+    while pages[-1].has_next:
+        pages.append(search_records(user, 'milk', after=pages[-1].next_cursor))
+    items = [record.item for page in pages for record in page.records]
+    assert sorted(items) == [f'Milk {i}' for i in range(5)]
+    assert [len(page.records) for page in pages] == [2, 2, 1]
+    previous = search_records(user, 'milk', before=pages[2].previous_cursor)
+    assert previous.records == pages[1].records
+    assert previous.has_previous and previous.has_next
+
+@pytest.mark.django_db
+def test_records_view_searches(client, user):
+    """Test that the records page shows the search results and keeps the query in its page links."""
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Gas Bill', volume='1', cost='40')
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Groceries', volume='1', cost='20')
+    response = client.get(reverse('records'), {'q': 'gas'})
+    assert [record.item for record in response.context['object_list']] == ['Gas Bill']
+    assert response.context['page_params'] == 'q=gas'
+    response = client.get(reverse('records'), {'q': 'nothing'})
+    assert 'No records match' in response.content.decode()
+
+# -------- CATEGORY DROPDOWN CACHE TESTS --------
+
+def category_queries(captured):
+    return [query['sql'] for query in captured if 'FROM "app_category"' in query['sql']]
+
+@pytest.mark.django_db
+def test_warm_record_form_needs_no_category_queries(client, user, category):
+    """Test that rendering and validating the record form reads the category list from the cache once warm."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    client.get(reverse('records'))
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(reverse('records'))
+    assert category_queries(captured) == []
+    assert f'<option value="{category.pk}">Test Category</option>' in response.content.decode()
+
+    form_data = {'type': 'Expense', 'date': '2024-01-01', 'item': 'Lunch', 'volume': '1', 'cost': '5', 'category': category.pk}
+    with CaptureQueriesContext(connection) as captured:
+        form = RecordForm(data=form_data, user=user)
+        assert form.is_valid()
+    assert category_queries(captured) == []
+    record = form.save()
+    assert Record.objects.get(pk=record.pk).category == category
+
+@pytest.mark.django_db
+def test_record_form_rejects_categories_it_does_not_list(user, django_user_model):
+    """Test that the cached dropdown still refuses other users' categories and malformed ids."""
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    other_category = Category.objects.create(user=other_user, name='Theirs')
+    for value in (other_category.pk, 'abc'):
+        form = RecordForm(data={'type': 'Expense', 'date': '2024-01-01', 'item': 'Lunch', 'volume': '1', 'cost': '5', 'category': value}, user=user)
+        assert not form.is_valid()
+        assert 'category' in form.errors
+
+@pytest.mark.django_db
+def test_category_dropdown_follows_category_changes(client, user):
+    """Test that created, renamed, orphaned and purged categories show up in the dropdown straight away."""
+    def dropdown():
+        return [name for pk, name in RecordForm(user=user).fields['category'].widget.choices if pk]
+    assert dropdown() == []
+    client.post(reverse('records'), {'type': 'Expense', 'date': '2024-01-01', 'item': 'Bus', 'volume': '1', 'cost': '2', 'category': '', 'new_category': 'travel'})
+    assert dropdown() == ['Travel']
+    category = Category.objects.get(user=user)
+    category.name = 'Transport'
+    category.save()
+    assert dropdown() == ['Transport']
+    record = Record.objects.get(user=user)
+    client.post(reverse('delete_record', args=[record.pk]))
+    assert dropdown() == []
+    Category.objects.create(user=user, name='Food')
+    assert dropdown() == ['Food']
+    client.post(reverse('purge_records'))
+    assert dropdown() == []
+
+# -------- RECORD ROW CACHE TESTS --------
+
+@pytest.mark.django_db
+def test_warm_records_table_renders_no_rows(client, user, category, monkeypatch):
+    """Test that once cached the table rows are reused without rendering, with the same links reverse() gives."""
+    record = Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Lunch', volume='1', cost='5', category=category)
+    first = client.get(reverse('records')).content.decode()
+    assert f'href="{reverse("edit_record", args=[record.pk])}"' in first
+    assert f'href="{reverse("delete_record", args=[record.pk])}"' in first
+
+    def fail(*args, **kwargs):
+        raise AssertionError('a cached row was rendered again')
+    monkeypatch.setattr('app.fragments.get_template', fail)
+    def table(content):
+        return content[content.index('<tbody>'):content.index('</tbody>')]
+    assert table(client.get(reverse('records')).content.decode()) == table(first)
+
+@pytest.mark.django_db
+def test_cached_rows_follow_record_and_category_changes(client, user, category):
+    """Test that editing a record or renaming its category replaces the cached row straight away."""
+    record = Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Lunch', volume='1', cost='5', category=category)
+    client.get(reverse('records'))
+    client.post(reverse('edit_record', args=[record.pk]), {'type': 'Expense', 'date': '2024-01-01', 'item': 'Dinner', 'volume': '1', 'cost': '5', 'category': category.pk})
+    content = client.get(reverse('records')).content.decode()
+    assert 'Dinner' in content and 'Lunch' not in content
+    category.name = 'Meals'
+    category.save()
+    assert '<td>Meals</td>' in client.get(reverse('records')).content.decode()
+
+# -------- BULK ACTION TESTS --------
+
+def bulk_records(user, count, category=None):
+    return [
+        Record.objects.create(user=user, type='Expense', date='2024-01-01', item=f'Item {i}', volume='1', cost='2.50', category=category)
+        for i in range(count)
+    ]
+
+@pytest.mark.django_db
+def test_bulk_update_moves_records_and_rollups(client, user, category, django_user_model):
+    """Test that a bulk update changes only the user's selected records and keeps the summary and categories right."""
+    from app.summary import get_summary, verify_rollups
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    theirs = Record.objects.create(user=other_user, type='Expense', date='2024-01-01', item='Theirs', volume='1', cost='1')
+    selected = bulk_records(user, 3, category)
+    kept = bulk_records(user, 1)
+    food = Category.objects.create(user=user, name='Food')
+    get_summary(user)
+
+    response = client.post(reverse('bulk_records'), {
+        'records': [record.pk for record in selected] + [theirs.pk],
+        'action': 'update', 'type': 'Income', 'category': food.pk,
+    })
+    assert response.status_code == 302
+    assert Record.objects.filter(user=user, type='Income', category=food).count() == 3
+    assert Record.objects.get(pk=kept[0].pk).type == 'Expense'
+    assert Record.objects.get(pk=theirs.pk).type == 'Expense'
+    # The records left 'Test Category' unused, so it was cleaned up.
+    assert not Category.objects.filter(pk=category.pk).exists()
+    assert verify_rollups(user) == []
+    assert get_summary(user)['category_spending'] == {'Food': Decimal('7.50'), 'Uncategorized': Decimal('-2.50')}
+
+    client.post(reverse('bulk_records'), {'records': [record.pk for record in selected], 'action': 'update', 'uncategorize': 'on'})
+    assert not Category.objects.filter(user=user).exists()
+    assert verify_rollups(user) == []
+
+@pytest.mark.django_db
+def test_bulk_delete_removes_records_and_orphans(client, user, category):
+    """Test that a bulk delete removes the selected records, their unused categories and their rollup share."""
+    from app.summary import get_summary, verify_rollups
+    selected = bulk_records(user, 3, category)
+    kept = bulk_records(user, 2)
+    get_summary(user)
+
+    client.post(reverse('bulk_records'), {'records': [record.pk for record in selected], 'action': 'delete'})
+    assert list(Record.objects.filter(user=user).order_by('pk')) == kept
+    assert not Category.objects.filter(pk=category.pk).exists()
+    assert verify_rollups(user) == []
+    assert get_summary(user)['total_amount'] == Decimal('-5.00')
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('action', ['update', 'delete'])
+def test_bulk_action_query_count_does_not_grow_with_records(client, user, category, action):
+    """Test that acting on 30 records takes as many queries as acting on 3, once the rollups exist."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    food = Category.objects.create(user=user, name='Food')
+    bulk_records(user, 1, category)
+    bulk_records(user, 1, food)
+    counts = []
+    for count in (1, 3, 30):
+        records = bulk_records(user, count, category)
+        data = {'records': [record.pk for record in records], 'action': action}
+        if action == 'update':
+            data['category'] = food.pk
+        with CaptureQueriesContext(connection) as captured:
+            client.post(reverse('bulk_records'), data)
+        counts.append(len(captured))
+    assert counts[1] == counts[2]
+
+@pytest.mark.django_db
+def test_bulk_action_rejects_invalid_selections(client, user, category, settings):
+    """Test that empty or oversized selections and updates without changes leave the records alone."""
+    settings.BULK_ACTION_MAX_RECORDS = 2
+    records = bulk_records(user, 3, category)
+    ids = [record.pk for record in records]
+    for data in (
+        {'action': 'delete'},
+        {'records': ids, 'action': 'delete'},
+        {'records': ids[:1], 'action': 'update'},
+        {'records': ids[:1], 'action': 'update', 'category': category.pk, 'uncategorize': 'on'},
+    ):
+        response = client.post(reverse('bulk_records'), data)
+        assert response.status_code == 302
+    assert Record.objects.filter(user=user, category=category, type='Expense').count() == 3
+
+# -------- CHANGE JOURNAL TESTS --------
+
+def record_data(**fields):
+    return {'type': 'Expense', 'date': '2024-01-01', 'item': 'Lunch', 'volume': '1', 'cost': '5', 'category': '', **fields}
+
+def sync(client, since):
+    return client.get(reverse('api_changes'), {'since': since}).json()
+
+@pytest.mark.django_db
+def test_changes_api_returns_the_latest_change_of_each_record(client, user, django_user_model):
+    """Test that a sync returns each changed record once, in its current state, and nothing of other users."""
+    start = client.get(reverse('api_changes')).json()['sequence']
+    client.post(reverse('records'), record_data(item='Lunch'))
+    client.post(reverse('records'), record_data(item='Bus'))
+    lunch, bus = Record.objects.order_by('pk')
+    client.post(reverse('edit_record', args=[lunch.pk]), record_data(item='Dinner', cost='12'))
+    client.post(reverse('delete_record', args=[bus.pk]))
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    Record.objects.create(user=other_user, type='Expense', date='2024-01-01', item='Other', volume='1', cost='1')
+
+    data = sync(client, start)
+    assert [(change['operation'], change['id']) for change in data['changes']] == [('update', lunch.pk), ('delete', bus.pk)]
+    assert data['changes'][0]['record'] == {
+        'id': lunch.pk, 'type': 'Expense', 'date': '2024-01-01', 'item': 'Dinner', 'category': None, 'volume': '1', 'cost': '12.00',
+        'currency': 'EUR',
+    }
+    assert data['next'] is None
+    assert sync(client, data['sequence']) == {'changes': [], 'sequence': data['sequence'], 'next': None}
+    assert client.get(reverse('api_changes'), {'since': 'latest'}).status_code == 400
+
+@pytest.mark.django_db
+def test_changes_api_covers_bulk_paths(client, user, category):
+    """Test that category renames, bulk edits, imports and purges are journaled too, and that a purge hides what came before."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    record = Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Lunch', volume='1', cost='5', category=category)
+    start = sync(client, 0)['sequence']
+    category.name = 'Meals'
+    category.save()
+    data = sync(client, start)
+    assert [change['record']['category'] for change in data['changes']] == ['Meals']
+
+    client.post(reverse('bulk_records'), {'records': [record.pk], 'action': 'update', 'type': 'Income'})
+    data = sync(client, data['sequence'])
+    assert [(change['operation'], change['record']['type']) for change in data['changes']] == [('update', 'Income')]
+
+    upload = SimpleUploadedFile('records.csv', b'type,date,item,category,volume,cost\nExpense,2024-01-02,Bread,,1,2\n')
+    client.post(reverse('import_records'), {'file': upload})
+    data = sync(client, data['sequence'])
+    assert [(change['operation'], change['record']['item']) for change in data['changes']] == [('create', 'Bread')]
+
+    client.post(reverse('purge_records'))
+    client.post(reverse('records'), record_data(item='Fresh Start'))
+    data = sync(client, start)
+    assert [change['operation'] for change in data['changes']] == ['purge', 'create']
+    assert data['changes'][1]['record']['item'] == 'Fresh Start'
+
+@pytest.mark.django_db
+def test_changes_api_pages_with_next_links(client, user, settings):
+    settings.CHANGES_PAGE_SIZE = 2
+    for i in range(3):
+        Record.objects.create(user=user, type='Expense', date='2024-01-01', item=f'Item {i}', volume='1', cost='1')
+    data = sync(client, 0)
+    assert [change['record']['item'] for change in data['changes']] == ['Item 0', 'Item 1']
+    data = client.get(data['next']).json()
+    assert [change['record']['item'] for change in data['changes']] == ['Item 2']
+    assert data['next'] is None
+
+@pytest.mark.django_db
+def test_changes_api_waits_for_entries_to_settle(client, user, settings):
+    """Test that with a settle window recent entries are held back, so a cursor never passes a change still being committed."""
+    from datetime import timedelta
+    from django.utils import timezone
+    from app.models import RecordChange
+    settings.CHANGES_SETTLE_SECONDS = 30
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Settled', volume='1', cost='1')
+    RecordChange.objects.filter(user=user).update(created_at=timezone.now() - timedelta(seconds=31))
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Recent', volume='1', cost='1')
+    settled, recent = RecordChange.objects.filter(user=user).order_by('id')
+
+    data = sync(client, 0)
+    assert [change['record']['item'] for change in data['changes']] == ['Settled']
+    assert data['sequence'] == settled.id == client.get(reverse('api_changes')).json()['sequence']
+    RecordChange.objects.filter(pk=recent.pk).update(created_at=timezone.now() - timedelta(seconds=31))
+    assert [change['record']['item'] for change in sync(client, data['sequence'])['changes']] == ['Recent']
+
+@pytest.mark.django_db
+def test_compaction_keeps_syncs_correct(client, user):
+    """Test that compaction drops superseded entries and old deletions, sending clients behind them to a full download."""
+    from datetime import timedelta
+    from django.core.management import call_command
+    from django.utils import timezone
+    from app.changes import compact_changes
+    from app.models import RecordChange
+    kept, deleted = [Record.objects.create(user=user, type='Expense', date='2024-01-01', item=f'Item {i}', volume='1', cost='1') for i in range(2)]
+    for cost in ('2', '3'):
+        kept.cost = cost
+        kept.save()
+    deleted.delete()
+    before = sync(client, 0)['changes']
+
+    # Recent deletions stay, so a compacted journal syncs to the same state from the start.
+    assert compact_changes(timezone.now() - timedelta(days=1)) == 3
+    assert sync(client, 0)['changes'] == before
+    assert RecordChange.objects.filter(user=user).count() == 2
+
+    latest = sync(client, 0)['sequence']
+    call_command('compact_changes', days=0)
+    assert client.get(reverse('api_changes'), {'since': 0}).status_code == 410
+    assert list(RecordChange.objects.filter(user=user).values_list('operation', flat=True).order_by('id')) == ['update', 'compacted']
+    kept.delete()
+    assert [change['operation'] for change in sync(client, latest)['changes']] == ['delete']
+
+# -------- RECURRING RULE TESTS --------
+
+def make_rule(user, **fields):
+    from app.models import RecurringRule
+    return RecurringRule.objects.create(**{
+        'user': user, 'frequency': 'monthly', 'start_date': date(2024, 1, 31), 'type': 'Expense',
+        'item': 'rent', 'volume': '1', 'cost': Decimal('700'), **fields,
+    })
+
+@pytest.mark.django_db
+def test_materialize_recurring_is_idempotent(user, category):
+    """Test that due occurrences are created once, on the start day or the end of shorter months, with the rollups and journal kept up to date."""
+    from app.models import RecordChange
+    from app.recurring import materialize_recurring
+    from app.summary import get_summary, verify_rollups
+    rule = make_rule(user, category=category)
+    get_summary(user)
+
+    result = materialize_recurring(today=date(2024, 4, 30))
+    assert (result.rules, result.created) == (1, 4)
+    records = Record.objects.filter(recurring_rule=rule).order_by('date')
+    assert [record.date for record in records] == [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)]
+    assert {(record.item, record.category_id, record.cost) for record in records} == {('Rent', category.pk, Decimal('700.00'))}
+    assert verify_rollups(user) == []
+    assert get_summary(user)['total_amount'] == Decimal('-2800.00')
+    assert RecordChange.objects.filter(user=user, operation='create').count() == 4
+
+    assert materialize_recurring(today=date(2024, 4, 30)).created == 0
+    # Even a rule moved back to its start only fills in missing occurrences.
+    rule.refresh_from_db()
+    rule.next_date = rule.start_date
+    rule.save()
+    Record.objects.get(recurring_rule=rule, occurrence_date=date(2024, 2, 29)).delete()
+    assert materialize_recurring(today=date(2024, 4, 30)).created == 1
+    assert records.count() == 4
+    assert verify_rollups(user) == []
+
+@pytest.mark.django_db
+def test_materialize_recurring_in_chunks(user, django_user_model):
+    """Test that small chunks and batches across users create the same records, stopping at each rule's end date."""
+    from app.recurring import materialize_recurring
+    from app.summary import verify_rollups
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    make_rule(user, frequency='weekly', interval=2, start_date=date(2024, 1, 1))
+    make_rule(other_user, frequency='daily', start_date=date(2024, 1, 1), end_date=date(2024, 1, 10), type='Income')
+    make_rule(other_user, frequency='yearly', start_date=date(2023, 6, 1))
+    make_rule(user, start_date=date(2025, 1, 1))
+
+    result = materialize_recurring(today=date(2024, 2, 29), chunk_size=1, batch_size=3)
+    assert (result.rules, result.created) == (3, 5 + 10 + 1)
+    assert not Record.objects.filter(date__gt=date(2024, 2, 29)).exists()
+    assert verify_rollups(user) == [] and verify_rollups(other_user) == []
+    assert materialize_recurring(today=date(2024, 12, 31), chunk_size=1).created == 22 + 1
+
+@pytest.mark.django_db
+def test_record_form_starts_a_recurring_rule(client, user):
+    """Test that a record added with a repeat becomes the first occurrence of a new rule."""
+    from django.core.management import call_command
+    from io import StringIO
+    from app.models import RecurringRule
+    client.post(reverse('records'), {'type': 'Income', 'date': '2024-01-15', 'item': 'salary', 'volume': '1', 'cost': '2000', 'category': '', 'repeat': 'monthly'})
+    rule = RecurringRule.objects.get(user=user)
+    assert (rule.item, rule.next_date) == ('Salary', date(2024, 2, 15))
+    assert Record.objects.get(user=user).recurring_rule == rule
+
+    out = StringIO()
+    call_command('materialize_recurring', date=date(2024, 3, 31), stdout=out)
+    assert 'Created 2 records from 1 due rules' in out.getvalue()
+    assert [record.date for record in Record.objects.filter(user=user).order_by('date')] == [date(2024, 1, 15), date(2024, 2, 15), date(2024, 3, 15)]
+
+@pytest.mark.django_db
+def test_edit_form_stops_or_changes_a_recurring_rule(client, user):
+    """Test that editing a recurring record shows its repeat, and that changing it ends the rule at that record."""
+    from app.models import RecurringRule
+    from app.recurring import materialize_recurring
+    client.post(reverse('records'), {'type': 'Expense', 'date': '2024-01-15', 'item': 'rent', 'volume': '1', 'cost': '700', 'category': '', 'repeat': 'monthly'})
+    materialize_recurring(today=date(2024, 2, 28))
+    february = Record.objects.get(user=user, date=date(2024, 2, 15))
+    assert client.get(reverse('edit_record', args=[february.pk])).context['form']['repeat'].value() == 'monthly'
+
+    edit = {'type': 'Expense', 'date': '2024-02-15', 'item': 'Rent', 'volume': '1', 'cost': '750', 'category': ''}
+    client.post(reverse('edit_record', args=[february.pk]), {**edit, 'repeat': 'monthly'})
+    assert RecurringRule.objects.get(user=user).end_date is None
+
+    client.post(reverse('edit_record', args=[february.pk]), {**edit, 'repeat': ''})
+    assert RecurringRule.objects.get(user=user).end_date == date(2024, 2, 15)
+    assert materialize_recurring(today=date(2024, 6, 30)).created == 0
+    assert Record.objects.filter(user=user).count() == 2
+
+    client.post(reverse('edit_record', args=[february.pk]), {**edit, 'repeat': 'yearly'})
+    rule = RecurringRule.objects.get(user=user, end_date__isnull=True)
+    assert (rule.frequency, rule.start_date, rule.next_date) == ('yearly', date(2024, 2, 15), date(2025, 2, 15))
+    assert Record.objects.get(pk=february.pk).recurring_rule == rule
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('action', ['delete', 'edit', 'bulk_update', 'bulk_delete', 'purge'])
+def test_removing_a_rules_last_record_keeps_its_category(client, user, action):
+    """Test that a category still used by a recurring rule survives its records, and that a purge removes the rules too."""
+    from django.db import connection
+    from app.models import RecurringRule
+    from app.recurring import materialize_recurring
+    client.post(reverse('records'), {'type': 'Expense', 'date': '2024-01-15', 'item': 'rent', 'volume': '1', 'cost': '700', 'new_category': 'housing', 'repeat': 'monthly'})
+    record = Record.objects.get(user=user)
+    if action == 'delete':
+        response = client.post(reverse('delete_record', args=[record.pk]))
+    elif action == 'edit':
+        response = client.post(reverse('edit_record', args=[record.pk]), {'type': 'Expense', 'date': '2024-01-15', 'item': 'Rent', 'volume': '1', 'cost': '700', 'category': ''})
+    elif action == 'bulk_update':
+        response = client.post(reverse('bulk_records'), {'records': [record.pk], 'action': 'update', 'uncategorize': 'on'})
+    elif action == 'bulk_delete':
+        response = client.post(reverse('bulk_records'), {'records': [record.pk], 'action': 'delete'})
+    else:
+        response = client.post(reverse('purge_records'))
+    assert response.status_code == 302
+    connection.check_constraints()
+
+    if action == 'purge':
+        assert not RecurringRule.objects.filter(user=user).exists()
+        assert not Category.objects.filter(user=user).exists()
+        assert materialize_recurring(today=date(2024, 3, 31)).created == 0
+    else:
+        assert RecurringRule.objects.get(user=user).category.name == 'Housing'
+
+# -------- INSTRUMENTATION TESTS --------
+
+def server_timing(response):
+    return dict(
+        (name, dict(part.split('=', 1) for part in params))
+        for name, *params in (entry.strip().split(';') for entry in response['Server-Timing'].split(','))
+    )
+
+@pytest.mark.django_db
+def test_responses_report_their_sql_in_server_timing(client, user):
+    """Test that every response carries its query count, SQL time, slowest query and view time."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(reverse('records'))
+    timing = server_timing(response)
+    assert timing['sql']['desc'] == f'"{len(captured)} queries"'
+    assert 0 < float(timing['sql-slowest']['dur']) <= float(timing['sql']['dur']) <= float(timing['view']['dur'])
+
+@pytest.mark.django_db
+def test_async_view_queries_are_counted(user, category):
+    """Test that queries an async view runs through sync_to_async threads are attributed to its request."""
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Item', volume='1', cost='10', category=category)
+
+    async def fetch():
+        client = AsyncClient()
+        await client.aforce_login(user)
+        return await client.get(reverse('api_records'))
+    response = async_to_sync(fetch)()
+    assert response.status_code == 200
+    assert server_timing(response)['sql']['desc'] != '"0 queries"'
+
+def test_request_log_percentiles_per_url_name():
+    """Test that the log keeps the last requests of each URL name and reports nearest-rank percentiles."""
+    from app.instrumentation import RequestLog, RequestStats
+    log = RequestLog(size=100)
+    for i in range(1, 201):
+        log.add('records', RequestStats(queries=i, sql_time=i / 1000, slowest_time=i / 2000, slowest_sql=f'SELECT {i}', view_time=i / 500))
+    log.add('purge_records', RequestStats(queries=3, view_time=0.01))
+    summary = log.summary()
+    assert list(summary) == ['purge_records', 'records']
+    records = summary['records']
+    assert records['requests'] == 100
+    assert records['queries'] == {'p50': 150, 'p95': 195, 'p99': 199}
+    assert records['sql_ms'] == {'p50': 150.0, 'p95': 195.0, 'p99': 199.0}
+    assert records['view_ms']['p99'] == 398.0
+    assert records['slowest_query'] == {'ms': 100.0, 'sql': 'SELECT 200'}
+    assert summary['purge_records']['queries'] == {'p50': 3, 'p95': 3, 'p99': 3}
+
+@pytest.mark.django_db
+def test_request_stats_endpoint_is_staff_only(client, user):
+    """Test that staff can read the per-URL request stats and other users cannot."""
+    from app.instrumentation import request_log
+    request_log.clear()
+    record = Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Item', volume='1', cost='10')
+    client.get(reverse('records'))
+    client.get(reverse('edit_record', args=[record.pk]))
+    assert client.get(reverse('request_stats')).status_code == 403
+
+    user.is_staff = True
+    user.save()
+    stats = client.get(reverse('request_stats')).json()
+    assert {'records', 'edit_record'} <= set(stats)
+    assert stats['records']['requests'] == 1
+    assert set(stats['edit_record']['view_ms']) == {'p50', 'p95', 'p99'}
+    assert stats['edit_record']['queries']['p50'] > 0
+
+# -------- SEED COMMAND TESTS --------
+
+@pytest.mark.django_db
+def test_seed_records_command_is_reproducible(django_user_model):
+    """Test that the same seed generates the same records, within the requested range, ratio and categories."""
+    import io
+    from django.core.management import call_command
+    from app.summary import verify_rollups
+
+    def seeded_rows(prefix):
+        call_command('seed_records', users=2, records=400, categories=20, start=date(2023, 1, 1), end=date(2023, 3, 31),
+                     income_ratio=0.25, seed=7, username_prefix=prefix, batch_size=64, stdout=io.StringIO())
+        return [
+            list(Record.objects.filter(user__username=f'{prefix}{i}').order_by('id').values_list('type', 'date', 'item', 'volume', 'cost', 'category__name'))
+            for i in (1, 2)
+        ]
+    first, second = seeded_rows('a'), seeded_rows('b')
+    assert first == second
+    assert first[0] != first[1]
+
+    user = django_user_model.objects.get(username='a1')
+    records = Record.objects.filter(user=user)
+    assert records.count() == 400
+    assert Category.objects.filter(user=user).count() == 20
+    assert Category.objects.filter(user=user, name='Groceries').exists()
+    assert date(2023, 1, 1) <= min(row[1] for row in first[0]) and max(row[1] for row in first[0]) <= date(2023, 3, 31)
+    assert 60 <= records.filter(type='Income').count() <= 140
+    assert verify_rollups(user) == []
+    assert user.check_password('seedpassword')
+
+@pytest.mark.django_db
+def test_seed_records_dates_do_not_depend_on_today():
+    """Test that the default date range is fixed, and that seeding up to today has to be asked for."""
+    import io
+    from django.core.management import call_command
+    from datetime import timedelta
+    from app.seeding import DEFAULT_END
+    call_command('seed_records', records=50, username_prefix='fixed', stdout=io.StringIO())
+    call_command('seed_records', '--end', 'today', records=50, username_prefix='recent', stdout=io.StringIO())
+    fixed = Record.objects.filter(user__username='fixed1').values_list('date', flat=True)
+    recent = Record.objects.filter(user__username='recent1').values_list('date', flat=True)
+    assert DEFAULT_END - timedelta(days=365) <= min(fixed) and max(fixed) <= DEFAULT_END
+    assert date.today() - timedelta(days=365) <= min(recent) and max(recent) <= date.today()
+
+@pytest.mark.django_db
+def test_seed_records_command_validates_options():
+    from django.core.management import CommandError, call_command
+    with pytest.raises(CommandError, match='income-ratio'):
+        call_command('seed_records', income_ratio=1.5)
+    with pytest.raises(CommandError, match='start'):
+        call_command('seed_records', '--start', '2024-02-01', '--end', '2024-01-01')
+    with pytest.raises(CommandError, match='records'):
+        call_command('seed_records', records=0)
+
+# -------- CURRENCY TESTS --------
+
+@pytest.fixture
+def usd_rates(tmp_path):
+    """Load an ECB file where one euro is worth two dollars."""
+    from app.currencies import load_exchange_rates
+    path = tmp_path / 'eurofxref.csv'
+    path.write_text('Date, USD, GBP, \n17 October 2026, 2.0000, 0.5000, \n')
+    load_exchange_rates(path)
+    return path
+
+@pytest.mark.django_db
+def test_summary_converts_each_currency_to_the_base_currency(user, category, usd_rates):
+    """Test that the wallet and category totals are converted in the summing query, into the chosen base currency."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from app.summary import compute_summary, get_summary, set_base_currency, verify_rollups
+    Record.objects.create(user=user, type='Expense', date='2024-01-01', item='Lunch', volume='1', cost='10', category=category)
+    Record.objects.create(user=user, type='Expense', date='2024-01-02', item='Dinner', volume='1', cost='10', category=category, currency_id='USD')
+    Record.objects.create(user=user, type='Income', date='2024-01-03', item='Refund', volume='1', cost='20', currency_id='USD')
+
+    with CaptureQueriesContext(connection) as queries:
+        summary = get_summary(user)
+    assert summary == {'total_amount': Decimal('-5.00'), 'category_spending': {'Test Category': Decimal('-15.00'), 'Uncategorized': Decimal('10.00')}, 'currency': 'EUR'}
+    assert any('JOIN "app_exchangerate"' in query['sql'] and 'SUM(' in query['sql'] for query in queries)
+
+    set_base_currency(user, 'USD')
+    assert get_summary(user) == compute_summary(user) == {
+        'total_amount': Decimal('-10.00'), 'category_spending': {'Test Category': Decimal('-30.00'), 'Uncategorized': Decimal('20.00')}, 'currency': 'USD',
+    }
+    set_base_currency(user, 'GBP')
+    assert get_summary(user)['category_spending'] == {'Test Category': Decimal('-7.50'), 'Uncategorized': Decimal('5.00')}
+    assert verify_rollups(user) == []
+
+@pytest.mark.django_db
+def test_load_exchange_rates_reads_ecb_files_and_reconverts_cached_summaries(user, usd_rates, tmp_path):
+    """Test that the latest rate of each currency is loaded, and that cached summaries are converted again."""
+    import io
+    from django.core.management import CommandError, call_command
+    from app.models import ExchangeRate
+    from app.summary import get_summary, set_base_currency
+    Record.objects.create(user=user, type='Income', date='2024-01-01', item='Pay', volume='1', cost='10')
+    set_base_currency(user, 'USD')
+    assert get_summary(user)['total_amount'] == Decimal('20.00')
+
+    history = tmp_path / 'eurofxref-hist.csv'
+    history.write_text('Date,USD,JPY,\n2026-10-17,4.0,N/A,\n2026-10-16,3.0,150.0,\n')
+    call_command('load_exchange_rates', str(history), stdout=io.StringIO())
+    assert dict(ExchangeRate.objects.filter(currency__in=['USD', 'JPY', 'GBP', 'EUR']).values_list('currency', 'rate')) == {
+        'USD': Decimal('4'), 'JPY': Decimal('150'), 'GBP': Decimal('0.5'), 'EUR': Decimal('1'),
+    }
+    assert ExchangeRate.objects.get(currency='USD').date == date(2026, 10, 17)
+    assert get_summary(user)['total_amount'] == Decimal('40.00')
+
+    history.write_text('Currency,Rate\nUSD,1.1\n')
+    with pytest.raises(CommandError, match='Date column'):
+        call_command('load_exchange_rates', str(history))
+
+@pytest.mark.django_db
+def test_exchange_rates_are_memoized_per_request(user, django_assert_num_queries):
+    """Test that a request reads the rates and the base currency once however often they are looked up."""
+    from app.currencies import base_currency, exchange_rates, request_memo
+    token = request_memo.set({})
+    try:
+        with django_assert_num_queries(2):
+            for _ in range(3):
+                assert exchange_rates()['EUR'] == 1
+                assert base_currency(user) == 'EUR'
+    finally:
+        request_memo.reset(token)
+    # Outside a request the rates come from the cache, but the base currency is read every time.
+    with django_assert_num_queries(2):
+        exchange_rates()
+        base_currency(user)
+        base_currency(user)
+
+@pytest.mark.django_db
+def test_records_carry_their_currency(client, user, usd_rates):
+    """Test that records are entered, shown, imported and exported with their currency."""
+    import io
+    from app.importer import import_records, iter_rows
+    data = {'type': 'Expense', 'date': '2024-01-01', 'item': 'Taxi', 'volume': '1', 'cost': '12', 'currency': 'USD'}
+    assert client.post(reverse('records'), data).status_code == 302
+    record = Record.objects.get(item='Taxi')
+    assert record.currency_id == 'USD'
+    assert '12.00 USD' in client.get(reverse('records')).content.decode()
+
+    response = client.post(reverse('records'), {**data, 'item': 'Bus', 'currency': 'XXX'})
+    assert response.status_code == 200 and response.context['form'].errors['currency']
+
+    result = import_records(user, iter_rows(io.StringIO(
+        'type,date,item,category,volume,cost,currency\n'
+        'Expense,2024-01-02,Bread,,1,2,gbp\n'
+        'Expense,2024-01-02,Milk,,1,1,\n'
+        'Expense,2024-01-02,Eggs,,1,3,XXX\n'
+    ), 'csv'))
+    assert (result.created, result.skipped) == (2, 1)
+    assert "unknown currency 'XXX'" in result.errors[0]
+    assert dict(Record.objects.filter(item__in=['Bread', 'Milk']).values_list('item', 'currency')) == {'Bread': 'GBP', 'Milk': 'EUR'}
+    assert client.get(reverse('api_records'), {'fields': 'item,currency', 'sort': 'item'}).json()['results'][0] == {'item': 'Bread', 'currency': 'GBP'}
@@ -0,0 +1,117 @@
+import threading
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connections
+from config.database import database_settings, sqlite_init_command
+
+POSTGRES_ENV = {
+    'POSTGRES_HOST': 'database',
+    'POSTGRES_PORT': '5432',
+    'POSTGRES_DATABASE': 'dj_db',
+    'POSTGRES_USERNAME': 'postgres',
+    'POSTGRES_PASSWORD': 'qwerty',
+}
+
+def test_sqlite_is_the_default_without_persistent_connections():
+    """Test that without POSTGRES_HOST the app keeps using SQLite, closing connections after each request as ASGI needs."""
+    database = database_settings({}, sqlite_path='/tmp/db.sqlite3')
+    assert (database['ENGINE'], database['NAME'], database['CONN_MAX_AGE']) == ('django.db.backends.sqlite3', '/tmp/db.sqlite3', 0)
+    assert database_settings({'SQLITE_PATH': '/data/db.sqlite3', 'DB_CONN_MAX_AGE': '60'})['CONN_MAX_AGE'] == 60
+
+def test_postgres_without_pool_reuses_health_checked_connections():
+    """Test that with the pool turned off PostgreSQL connections can be kept open, and are health-checked."""
+    assert database_settings({**POSTGRES_ENV, 'DB_POOL': 'false'})['CONN_MAX_AGE'] == 0
+    database = database_settings({**POSTGRES_ENV, 'DB_POOL': 'false', 'DB_CONN_MAX_AGE': '300'})
+    assert database['ENGINE'] == 'django.db.backends.postgresql'
+    assert (database['HOST'], database['NAME'], database['USER']) == ('database', 'dj_db', 'postgres')
+    assert database['CONN_MAX_AGE'] == 300
+    assert database['CONN_HEALTH_CHECKS'] is True
+    assert 'pool' not in database['OPTIONS']
+
+def test_postgres_pools_connections_by_default():
+    """Test that the compose environment selects PostgreSQL with psycopg's pool, checking connections, and no persistent ones on top."""
+    psycopg_pool = pytest.importorskip('psycopg_pool')
+    database = database_settings({**POSTGRES_ENV, 'DB_CONN_MAX_AGE': '300', 'DB_POOL_MAX_SIZE': '20'})
+    assert database['ENGINE'] == 'django.db.backends.postgresql'
+    assert (database['HOST'], database['NAME'], database['USER']) == ('database', 'dj_db', 'postgres')
+    assert database['CONN_MAX_AGE'] == 0
+    assert database['OPTIONS']['pool'] == {
+        'min_size': 2,
+        'max_size': 20,
+        'timeout': 10,
+        'check': psycopg_pool.ConnectionPool.check_connection,
+    }
+
+# -------- SQLITE TUNING TESTS --------
+
+@pytest.fixture
+def unblocked_db(django_db_blocker):
+    """Fixture allowing connections to the throwaway SQLite files these tests open, outside the test database."""
+    with django_db_blocker.unblock():
+        yield
+
+def open_sqlite(path, **environ):
+    """Open a Django connection to the SQLite file at ``path`` with the settings ``environ`` produces."""
+    database = connections.configure_settings({'default': database_settings(environ, sqlite_path=path)})['default']
+    connection = connections['default'].__class__(database, alias='tuned')
+    connection.ensure_connection()
+    return connection
+
+def test_sqlite_connections_run_the_tuning_pragmas(tmp_path, unblocked_db):
+    """Test that every new SQLite connection is switched to WAL with the configured pragmas."""
+    assert sqlite_init_command({}) == (
+        'PRAGMA busy_timeout=5000;PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL;'
+        'PRAGMA cache_size=-64000;PRAGMA mmap_size=268435456;'
+    )
+    connection = open_sqlite(tmp_path / 'db.sqlite3', SQLITE_CACHE_SIZE='-2000', SQLITE_BUSY_TIMEOUT='250')
+    with connection.cursor() as cursor:
+        pragmas = {pragma: cursor.execute(f'PRAGMA {pragma}').fetchone()[0] for pragma in ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'busy_timeout')}
+    connection.close()
+    assert pragmas == {'journal_mode': 'wal', 'synchronous': 1, 'cache_size': -2000, 'mmap_size': 268435456, 'busy_timeout': 250}
+    with pytest.raises(ImproperlyConfigured):
+        sqlite_init_command({'SQLITE_JOURNAL_MODE': 'wal; DROP TABLE app_record'})
+
+def read_during_bulk_write(path, **environ):
+    """Count rows from a second connection while a bulk insert holds its transaction open in a thread."""
+    writer = open_sqlite(path, **environ)
+    with writer.cursor() as cursor:
+        cursor.execute('CREATE TABLE entry (id INTEGER PRIMARY KEY, text TEXT)')
+        cursor.execute('INSERT INTO entry (text) VALUES (?)', ['committed'])
+    written, release = threading.Event(), threading.Event()
+
+    def bulk_write():
+        with writer.cursor() as cursor:
+            cursor.execute('BEGIN IMMEDIATE')
+            # Much more data than the page cache holds, so it spills to disk before the commit.
+            cursor.executemany('INSERT INTO entry (text) VALUES (?)', [['x' * 500]] * 5000)
+            written.set()
+            release.wait(5)
+            cursor.execute('COMMIT')
+
+    writer.inc_thread_sharing()
+    thread = threading.Thread(target=bulk_write)
+    thread.start()
+    try:
+        assert written.wait(5)
+        reader = open_sqlite(path, **environ)
+        try:
+            with reader.cursor() as cursor:
+                return cursor.execute('SELECT COUNT(*) FROM entry').fetchone()[0]
+        finally:
+            reader.close()
+    finally:
+        release.set()
+        thread.join()
+        writer.dec_thread_sharing()
+        writer.close()
+
+def test_readers_are_not_blocked_by_a_bulk_write(tmp_path, unblocked_db):
+    """Test that in WAL mode a reader sees the last committed data while a bulk write is in progress.
+
+    With the rollback journal the same read fails, because the writer holds the
+    database's exclusive lock as soon as its changes no longer fit in the cache.
+    """
+    small_cache = {'SQLITE_CACHE_SIZE': '50', 'SQLITE_BUSY_TIMEOUT': '100'}
+    assert read_during_bulk_write(tmp_path / 'wal.sqlite3', **small_cache) == 1
+    with pytest.raises(OperationalError, match='locked'):
+        read_during_bulk_write(tmp_path / 'journal.sqlite3', SQLITE_JOURNAL_MODE='DELETE', **small_cache)
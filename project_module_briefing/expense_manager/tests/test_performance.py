@@ -0,0 +1,146 @@
+import time
+import pytest
+from django.test import Client
+from django.urls import reverse
+from app.models import Category, Record
+from app.purge import purge_user_records
+from app.summary import rebuild_rollups
+from benchmarks.setup import seed_records
+
+pytestmark = [pytest.mark.django_db, pytest.mark.performance]
+
+SIZES = (10, 1_000, 100_000)
+
+# Most queries each view may run, whatever the number of records: a budget that
+# only holds for small users means a query per record (an N+1) crept back in.
+QUERY_BUDGETS = {
+    # The record forms read the exchange rates once per request, while the cache is cold.
+    'records_get': 7,
+    'records_post': 16,
+    'edit_get': 5,
+    'edit_post': 23,
+    'delete_post': 13,
+    'purge_post': 15,
+    # One rollup update per category the selection spans: the seeded users have 10 plus uncategorized.
+    'bulk_update_post': 28,
+    'bulk_delete_post': 28,
+}
+
+# Slowest acceptable response at each size, in seconds. They are several times
+# the times measured on a laptop, to leave room for slower CI machines.
+LATENCY_CEILINGS = {
+    'records_get': {10: 0.25, 1_000: 0.25, 100_000: 0.5},
+    'records_post': {10: 0.25, 1_000: 0.25, 100_000: 0.5},
+    'edit_get': {10: 0.25, 1_000: 0.25, 100_000: 0.25},
+    'edit_post': {10: 0.25, 1_000: 0.25, 100_000: 0.5},
+    'delete_post': {10: 0.25, 1_000: 0.25, 100_000: 0.5},
+    'purge_post': {10: 0.25, 1_000: 0.25, 100_000: 5.0},
+    'bulk_update_post': {10: 0.25, 1_000: 0.25, 100_000: 0.5},
+    'bulk_delete_post': {10: 0.25, 1_000: 0.25, 100_000: 0.5},
+}
+
+# -------- FIXTURES --------
+
+@pytest.fixture(scope='module')
+def seeded_users(django_db_setup, django_db_blocker):
+    """Fixture creating, once for the module, a user for each size with that many records and their rollups.
+
+    The tests run in transactions that are rolled back, so views that write
+    leave the seeded records as they were for the next test.
+    """
+    from django.contrib.auth.models import User
+    with django_db_blocker.unblock():
+        users = {}
+        for size in SIZES:
+            users[size] = User.objects.create_user(username=f'perf{size}', password='testpassword')
+            seed_records(users[size], size)
+            rebuild_rollups(users[size])
+    yield users
+    with django_db_blocker.unblock():
+        for user in users.values():
+            purge_user_records(user)
+            user.delete()
+
+@pytest.fixture(params=SIZES, ids=lambda size: f'{size}_records')
+def seeded_user(request, seeded_users):
+    return seeded_users[request.param]
+
+@pytest.fixture
+def client(seeded_user):
+    client = Client()
+    client.force_login(seeded_user)
+    return client
+
+@pytest.fixture
+def record(seeded_user):
+    """The user's latest categorized record."""
+    return Record.objects.filter(user=seeded_user, category__isnull=False).latest('id')
+
+@pytest.fixture
+def within_budget(seeded_user, django_assert_max_num_queries):
+    """Run a request under its query budget and latency ceiling for the seeded user's size."""
+    size = Record.objects.filter(user=seeded_user).count()
+
+    def run(name, request):
+        with django_assert_max_num_queries(QUERY_BUDGETS[name]):
+            start = time.perf_counter()
+            response = request()
+            elapsed = time.perf_counter() - start
+        assert elapsed < LATENCY_CEILINGS[name][size], f'{name} took {elapsed:.3f}s with {size} records'
+        return response
+    return run
+
+# -------- VIEW BUDGETS --------
+
+def test_records_page_budget(client, within_budget):
+    """Test the records table page, summary and category dropdown."""
+    response = within_budget('records_get', lambda: client.get(reverse('records') + '?sort=-date'))
+    assert response.status_code == 200
+    assert len(response.context['object_list']) == min(50, Record.objects.filter(user=response.context['user']).count())
+
+def test_create_record_budget(client, seeded_user, within_budget):
+    """Test creating a record with a new category, which updates the rollups and search index."""
+    data = {'type': 'Expense', 'date': '2024-02-01', 'item': 'Lunch', 'volume': '1', 'cost': '9', 'category': '', 'new_category': 'Meals'}
+    response = within_budget('records_post', lambda: client.post(reverse('records'), data))
+    assert response.status_code == 302
+    assert Category.objects.filter(user=seeded_user, name='Meals').exists()
+
+def test_edit_record_page_budget(client, record, within_budget):
+    response = within_budget('edit_get', lambda: client.get(reverse('edit_record', args=[record.pk])))
+    assert response.status_code == 200
+
+def test_edit_record_budget(client, record, within_budget):
+    """Test moving a record to a new category, including the orphaned category cleanup."""
+    data = {'type': 'Income', 'date': '2024-02-01', 'item': 'Refund', 'volume': '1', 'cost': '3', 'category': '', 'new_category': 'Refunds'}
+    response = within_budget('edit_post', lambda: client.post(reverse('edit_record', args=[record.pk]), data))
+    assert response.status_code == 302
+    record.refresh_from_db()
+    assert record.category.name == 'Refunds'
+
+def test_delete_record_budget(client, record, within_budget):
+    """Test deleting a record, including the orphaned category cleanup."""
+    response = within_budget('delete_post', lambda: client.post(reverse('delete_record', args=[record.pk])))
+    assert response.status_code == 302
+    assert not Record.objects.filter(pk=record.pk).exists()
+
+def test_purge_budget(client, seeded_user, within_budget):
+    """Test purging every record and category of the user with set-based deletes."""
+    response = within_budget('purge_post', lambda: client.post(reverse('purge_records')))
+    assert response.status_code == 302
+    assert not Record.objects.filter(user=seeded_user).exists()
+
+def test_bulk_update_budget(client, seeded_user, within_budget):
+    """Test moving up to 300 records to a category in one request."""
+    ids = list(Record.objects.filter(user=seeded_user).values_list('id', flat=True)[:300])
+    category = Category.objects.filter(user=seeded_user).first()
+    data = {'records': ids, 'action': 'update', 'type': 'Income', 'category': category.pk}
+    response = within_budget('bulk_update_post', lambda: client.post(reverse('bulk_records'), data))
+    assert response.status_code == 302
+    assert Record.objects.filter(pk__in=ids, category=category, type='Income').count() == len(ids)
+
+def test_bulk_delete_budget(client, seeded_user, within_budget):
+    """Test deleting up to 300 records in one request, including the orphaned category cleanup."""
+    ids = list(Record.objects.filter(user=seeded_user).values_list('id', flat=True)[:300])
+    response = within_budget('bulk_delete_post', lambda: client.post(reverse('bulk_records'), {'records': ids, 'action': 'delete'}))
+    assert response.status_code == 302
+    assert not Record.objects.filter(pk__in=ids).exists()
@@ -0,0 +1,154 @@
+import re
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from app.models import Record, Category
+from app.pagination import SORT_FIELDS
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(connection.vendor != "sqlite", reason="query plans are checked against SQLite"),
+]
+
+APP_TABLES = ("app_record", "app_category", "app_userbalance", "app_categoryrollup")
+FULL_SCAN = re.compile(r"\bSCAN (%s)\b" % "|".join(APP_TABLES))
+
+# -------- FIXTURES --------
+
+@pytest.fixture
+def user(django_user_model):
+    """Fixture to create a user for testing."""
+    return django_user_model.objects.create_user(username='testuser', password='testpassword')
+
+@pytest.fixture
+def client(user):
+    """Fixture to create an authenticated client for testing."""
+    client = Client()
+    client.force_login(user)
+    return client
+
+@pytest.fixture
+def records(user, django_user_model):
+    """Fixture to create records for the user and for someone else, with and without categories."""
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    for owner in (user, other_user):
+        food = Category.objects.create(user=owner, name='Food')
+        for i in range(30):
+            Record.objects.create(user=owner, type='Expense' if i % 3 else 'Income', date=f'2024-01-{i % 28 + 1:02d}', item=f'Item {i}', volume='1', cost=i, category=food if i % 2 else None)
+    return Record.objects.filter(user=user).order_by('id')
+
+# -------- HELPERS --------
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return "\n".join(row[-1] for row in cursor.fetchall())
+
+def page_queries(captured):
+    return [query['sql'] for query in captured if query['sql'].startswith('SELECT') and 'FROM "app_record"' in query['sql'] and 'LIMIT' in query['sql']]
+
+def assert_no_full_scans(captured):
+    """Explain every statement a request ran against the app tables and fail on any full table scan."""
+    checked = 0
+    for query in captured:
+        sql = query['sql']
+        if not sql.startswith(('SELECT', 'UPDATE', 'DELETE')) or not any(f'"{table}"' in sql for table in APP_TABLES):
+            continue
+        plan = query_plan(sql)
+        assert not FULL_SCAN.search(plan), f"Full table scan in:\n{sql}\n{plan}"
+        checked += 1
+    assert checked, "No app queries were captured"
+
+# -------- VIEW QUERY PLANS --------
+
+@pytest.mark.parametrize('sort_param', [prefix + field for field in SORT_FIELDS for prefix in ('', '-')])
+def test_records_page_queries_use_indexes(client, records, settings, sort_param):
+    """Test that the first and a later page of the records table, for every sort option, avoid table scans."""
+    settings.RECORDS_PAGE_SIZE = 10
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(reverse('records') + f'?sort={sort_param}')
+        client.get(reverse('records') + f"?sort={sort_param}&after={response.context['page'].next_cursor}")
+    assert_no_full_scans(captured)
+    if 'category__name' not in sort_param:
+        # Sorting on the record's own columns should walk an index instead of sorting the user's rows.
+        for sql in page_queries(captured):
+            assert 'TEMP B-TREE FOR ORDER BY' not in query_plan(sql), sql
+
+def test_create_record_queries_use_indexes(client, records):
+    """Test that creating a record with a new category avoids table scans."""
+    data = {'type': 'Expense', 'date': '2024-02-01', 'item': 'Lunch', 'volume': '1', 'cost': '9', 'category': '', 'new_category': 'Meals'}
+    with CaptureQueriesContext(connection) as captured:
+        response = client.post(reverse('records'), data)
+    assert response.status_code == 302
+    assert_no_full_scans(captured)
+
+def test_edit_record_queries_use_indexes(client, user, records):
+    """Test that editing a record, including the orphaned category check, avoids table scans."""
+    record = records.filter(category__isnull=False).first()
+    data = {'type': 'Income', 'date': '2024-02-01', 'item': 'Refund', 'volume': '1', 'cost': '3', 'category': '', 'new_category': 'Refunds'}
+    with CaptureQueriesContext(connection) as captured:
+        client.get(reverse('edit_record', args=[record.pk]))
+        response = client.post(reverse('edit_record', args=[record.pk]), data)
+    assert response.status_code == 302
+    assert_no_full_scans(captured)
+
+def test_delete_record_queries_use_indexes(client, records):
+    """Test that deleting a record, including the orphaned category check, avoids table scans."""
+    record = records.filter(category__isnull=False).first()
+    with CaptureQueriesContext(connection) as captured:
+        client.get(reverse('delete_record', args=[record.pk]))
+        response = client.post(reverse('delete_record', args=[record.pk]))
+    assert response.status_code == 302
+    assert_no_full_scans(captured)
+
+def test_purge_queries_use_indexes(client, user, records):
+    """Test that purging a user's records and categories avoids table scans."""
+    with CaptureQueriesContext(connection) as captured:
+        client.get(reverse('purge_records'))
+        response = client.post(reverse('purge_records'))
+    assert response.status_code == 302
+    assert_no_full_scans(captured)
+    assert Record.objects.filter(user__username='otheruser').count() == 30
+
+@pytest.mark.parametrize('sort_param', ['id', '-date', 'cost'])
+def test_export_queries_use_indexes(client, records, sort_param, read_stream):
+    """Test that streaming an export walks the user's records through an index, like the records table does."""
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(reverse('export_records') + f'?sort={sort_param}')
+        read_stream(response)
+    assert_no_full_scans(captured)
+    for query in captured:
+        if 'FROM "app_record"' in query['sql']:
+            assert 'TEMP B-TREE FOR ORDER BY' not in query_plan(query['sql']), query['sql']
+
+def test_category_names_are_unique_per_user(user, django_user_model):
+    """Test that a user cannot end up with two categories of the same name, while other users can reuse it."""
+    from django.db import IntegrityError, transaction
+    other_user = django_user_model.objects.create_user(username='otheruser', password='testpassword')
+    Category.objects.create(user=user, name='Food')
+    Category.objects.create(user=other_user, name='Food')
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Category.objects.create(user=user, name='food')
+    category, created = Category.objects.get_or_create(user=user, name='Food')
+    assert not created
+
+def test_report_query_reads_only_the_covering_index(user, records):
+    """Test that a date-ranged report is answered from the covering index without reading the table rows."""
+    from app.reports import spending_report
+    with CaptureQueriesContext(connection) as captured:
+        spending_report(user, 'month', start='2024-01-01', end='2024-01-31')
+    report_sql = next(query['sql'] for query in captured if 'FROM "app_record"' in query['sql'])
+    plan = query_plan(report_sql)
+    assert 'USING COVERING INDEX record_user_report_idx' in plan, plan
+
+def test_search_queries_use_the_full_text_index(client, records):
+    """Test that searching starts from the full-text index rather than scanning the user's records."""
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(reverse('records') + '?q=item')
+    assert len(response.context['object_list']) == 30
+    assert_no_full_scans(captured)
+    search_sql = next(query['sql'] for query in captured if 'app_record_search' in query['sql'])
+    plan = query_plan(search_sql)
+    assert 'VIRTUAL TABLE' in plan and 'INTEGER PRIMARY KEY' in plan, plan